@@ -1,6 +1,9 @@
 import logging
+from collections import defaultdict
 
-from django.db.models import F
+from django.db import connections, router
+from django.db.models import AutoField, F, Model
+from django.db.models.signals import post_save
 
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
@@ -28,7 +31,7 @@ class Buffer(Service, metaclass=BufferMount):
     keep up with the updates.
     """
 
-    __all__ = ("get", "incr", "process", "process_pending", "validate")
+    __all__ = ("get", "incr", "process", "process_batch", "process_pending", "validate")
 
     def get(self, model, columns, filters):
         """
@@ -102,3 +105,161 @@ class Buffer(Service, metaclass=BufferMount):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, model, rows):
+        """
+        Flush many buffered increments for the same model at once.
+
+        >>> process_batch(Group, [
+        ...     ({'times_seen': 3}, {'id': 1}, {'last_seen': now}),
+        ...     ({'times_seen': 1}, {'id': 2}, {'last_seen': now}),
+        ... ])
+
+        `rows` are ``(columns, filters, extra)`` tuples, as they would be
+        passed to `process`. On Postgres, rows with the same columns, filters
+        and extra keys are written with a single ``UPDATE ... FROM (VALUES
+        ...)`` statement. Rows that match no existing row go through `process`
+        so they are created. Groups are the exception: as in `process`, a
+        missing group is ignored. Other databases fall back to one `process`
+        call per row.
+        """
+        using = router.db_for_write(model)
+        if connections[using].vendor != "postgresql":
+            for columns, filters, extra in rows:
+                Buffer.process(self, model, columns, filters, extra)
+            return
+
+        batches = defaultdict(dict)
+        for columns, filters, extra in rows:
+            extra = extra or {}
+            shape = (tuple(sorted(columns)), tuple(sorted(filters)), tuple(sorted(extra)))
+            key = tuple(_prep_filter_value(model, name, filters[name]) for name in shape[1])
+
+            # Merge duplicates up front, joining the same row twice in one
+            # UPDATE would only apply one of them.
+            existing = batches[shape].get(key)
+            if existing is not None:
+                columns = {c: existing[0][c] + v for c, v in columns.items()}
+                extra = {**existing[2], **extra}
+            batches[shape][key] = (columns, filters, extra)
+
+        for shape, batch in batches.items():
+            column_names, _, extra_names = shape
+            if not column_names and not extra_names:
+                # Nothing to update, only signals to send.
+                for columns, filters, extra in batch.values():
+                    Buffer.process(self, model, columns, filters, extra)
+                continue
+
+            self._process_batch(model, using, shape, batch)
+
+    def _process_batch(self, model, using, shape, batch):
+        from sentry.models import Group
+
+        column_names, filter_names, extra_names = shape
+        connection = connections[using]
+        qn = connection.ops.quote_name
+        meta = model._meta
+
+        filter_fields = [_get_filter_field(model, name) for name in filter_names]
+        column_fields = [meta.get_field(name) for name in column_names]
+        extra_fields = [meta.get_field(name) for name in extra_names]
+        value_fields = filter_fields + column_fields + extra_fields
+        aliases = [f"c{i}" for i in range(len(value_fields))]
+        filter_aliases = aliases[: len(filter_fields)]
+        column_aliases = aliases[len(filter_fields) : len(filter_fields) + len(column_fields)]
+        extra_aliases = aliases[len(filter_fields) + len(column_fields) :]
+
+        assignments = [
+            f"{qn(field.column)} = t.{qn(field.column)} + v.{alias}"
+            for field, alias in zip(column_fields, column_aliases)
+        ] + [f"{qn(field.column)} = v.{alias}" for field, alias in zip(extra_fields, extra_aliases)]
+
+        # HACK: same score computation as `ScoreClause`, see `process`.
+        if model is Group and "times_seen" in column_names and "last_seen" in extra_names:
+            times_seen = column_aliases[column_names.index("times_seen")]
+            last_seen = extra_aliases[extra_names.index("last_seen")]
+            assignments.append(
+                f"{qn(meta.get_field('score').column)} = "
+                f"log(t.{qn(meta.get_field('times_seen').column)} + v.{times_seen}) * 600"
+                f" + extract(epoch from v.{last_seen})::int"
+            )
+
+        row_sql = "({})".format(
+            ", ".join(f"%s::{_get_cast_type(field, connection)}" for field in value_fields)
+        )
+        # Rows in a consistent order, so concurrent flushes lock them in the
+        # same order rather than deadlocking.
+        rows = [batch[key] for key in sorted(batch)]
+        params = []
+        for columns, filters, extra in rows:
+            values = (
+                [filters[name] for name in filter_names]
+                + [columns[name] for name in column_names]
+                + [extra[name] for name in extra_names]
+            )
+            for field, value in zip(value_fields, values):
+                if isinstance(value, Model):
+                    value = value.pk
+                params.append(field.get_db_prep_save(value, connection))
+
+        where = " AND ".join(
+            f"t.{qn(field.column)} = v.{alias}"
+            for field, alias in zip(filter_fields, filter_aliases)
+        )
+        returning = ", ".join(
+            [f"t.{qn(meta.pk.column)}"] + [f"t.{qn(field.column)}" for field in filter_fields]
+        )
+        sql = (
+            f"UPDATE {qn(meta.db_table)} AS t SET {', '.join(assignments)} "
+            f"FROM (VALUES {', '.join([row_sql] * len(rows))}) AS v ({', '.join(aliases)}) "
+            f"WHERE {where} RETURNING {returning}"
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            updated = {tuple(row[1:]): row[0] for row in cursor.fetchall()}
+
+        if model is Group and updated:
+            # Keep the group cache up to date like `group.update` does in
+            # `process`.
+            for group in Group.objects.using(using).filter(pk__in=list(updated.values())):
+                post_save.send(sender=Group, instance=group, created=False)
+
+        for key, (columns, filters, extra) in batch.items():
+            if key not in updated and model is not Group:
+                # No existing row, let `process` create it. This also sends
+                # the signal.
+                Buffer.process(self, model, columns, filters, extra)
+                continue
+
+            buffer_incr_complete.send_robust(
+                model=model,
+                columns=columns,
+                filters=filters,
+                extra=extra,
+                created=False,
+                sender=model,
+            )
+
+
+def _get_filter_field(model, name):
+    if name == "pk":
+        return model._meta.pk
+    return model._meta.get_field(name)
+
+
+def _get_cast_type(field, connection):
+    # Serial types can't be used in casts, use the type a foreign key to the
+    # field would have instead (see `FlexibleForeignKey.db_type`).
+    if isinstance(field, AutoField):
+        if hasattr(field, "get_related_db_type"):
+            return field.get_related_db_type(connection)
+        return field.rel_db_type(connection)
+    return field.db_type(connection)
+
+
+def _prep_filter_value(model, name, value):
+    if isinstance(value, Model):
+        value = value.pk
+    return _get_filter_field(model, name).to_python(value)
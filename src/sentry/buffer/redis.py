@@ -1,5 +1,6 @@
 import pickle
 import threading
+from collections import defaultdict
 from datetime import datetime
 from time import time
 
@@ -7,6 +8,7 @@ from django.db import models
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 
+from sentry import options
 from sentry.buffer import Buffer
 from sentry.exceptions import InvalidConfiguration
 from sentry.tasks.process_buffer import process_incr, process_pending
@@ -14,7 +16,9 @@ from sentry.utils import json, metrics
 from sentry.utils.compat import crc32
 from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
-from sentry.utils.redis import get_cluster_from_options
+from sentry.utils.redis import get_cluster_from_options, load_script
+
+pop_pending = load_script("buffer/pop_pending.lua")
 
 _local_buffers = None
 _local_buffers_lock = threading.Lock()
@@ -51,12 +55,19 @@ class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    # In drain mode, stop popping chunks from the pending sets after this many
+    # seconds (split evenly between hosts) so a single task does not run
+    # forever under constant load.
+    drain_deadline = 30
+
+    def __init__(self, pending_partitions=1, incr_batch_size=2, drain_chunk_size=500, **options):
         self.cluster, options = get_cluster_from_options("SENTRY_BUFFER_OPTIONS", options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
+        self.drain_chunk_size = drain_chunk_size
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
+        assert self.drain_chunk_size > 0
 
     def validate(self):
         try:
@@ -223,6 +234,10 @@ class RedisBuffer(Buffer):
             # super fast and is fine to do redundantly.
 
         pending_key = self._make_pending_key(partition)
+        if options.get("buffer.redis.drain-pending"):
+            self._drain_pending(pending_key)
+            return
+
         client = self.cluster.get_routing_client()
         lock_key = self._make_lock_key(pending_key)
         # prevent a stampede due to celerybeat + periodic task
@@ -255,13 +270,48 @@ class RedisBuffer(Buffer):
         finally:
             client.delete(lock_key)
 
-    def process(self, key=None, batch_keys=None):
+    def _drain_pending(self, pending_key):
+        """
+        Drain the pending set on every host in chunks of `drain_chunk_size`
+        keys. Chunks are popped atomically, so no lock is required and any
+        number of workers can drain concurrently. Each chunk becomes one
+        `process_incr` task that is processed with `pipelined=True`.
+
+        Every host gets an equal share of `drain_deadline`, so that a host
+        that keeps refilling can not starve the others.
+        """
+        keycount = 0
+        host_deadline = self.drain_deadline / len(self.cluster.hosts)
+
+        for host_id in self.cluster.hosts:
+            client = self.cluster.get_local_client(host_id)
+            deadline = time() + host_deadline
+            while time() < deadline:
+                keys = pop_pending(client, [pending_key], [self.drain_chunk_size])
+                if not keys:
+                    break
+
+                keycount += len(keys)
+                process_incr.apply_async(
+                    kwargs={"batch_keys": [key.decode("utf-8") for key in keys], "pipelined": True}
+                )
+
+                if len(keys) < self.drain_chunk_size:
+                    break
+
+        metrics.timing("buffer.pending-size", keycount)
+
+    def process(self, key=None, batch_keys=None, pipelined=False):
         assert not (key is None and batch_keys is None)
         assert not (key is not None and batch_keys is not None)
 
         if key is not None:
             batch_keys = [key]
 
+        if pipelined:
+            self._process_pipelined_incr(batch_keys)
+            return
+
         for key in batch_keys:
             self._process_single_incr(key)
 
@@ -288,42 +338,98 @@ class RedisBuffer(Buffer):
             pipe.delete(key)
             values = pipe.execute()[0]
 
-            # XXX(python3): In python2 this isn't as important since redis will
-            # return string tyes (be it, byte strings), but in py3 we get bytes
-            # back, and really we just want to deal with keys as strings.
-            values = {force_text(k): v for k, v in values.items()}
-
-            if not values:
-                metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
-                self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+            payload = self._load_payload(key, values)
+            if payload is None:
                 return
 
-            # XXX(py3): Note that ``import_string`` explicitly wants a str in
-            # python2, so we'll decode (for python3) and then translate back to
-            # a byte string (in python2) for import_string.
-            model = import_string(str(values.pop("m").decode("utf-8")))
-
-            if values["f"].startswith(b"{"):
-                filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
-            else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop("f"))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in values.items():
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith(b"["):
-                        extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
-            self._process(model, incr_values, filters, extra_values, signal_only)
+            self._process(*payload)
         finally:
             client.delete(lock_key)
+
+    def _process_pipelined_incr(self, keys):
+        """
+        Process keys popped by `_drain_pending`. The hashes for all keys on a
+        host are fetched and deleted in one transaction, so no per-key lock is
+        needed: concurrent increments either land in the fetched hash or in a
+        new one that is picked up by the next drain. The resulting updates are
+        flushed with one `process_batch` call per model.
+        """
+        router = self.cluster.get_router()
+        keys_by_host = defaultdict(list)
+        for key in keys:
+            keys_by_host[router.get_host_for_key(key)].append(key)
+
+        rows_by_model = defaultdict(list)
+        for host_id, host_keys in keys_by_host.items():
+            with self.cluster.get_local_client(host_id).pipeline() as pipe:
+                for key in host_keys:
+                    pipe.hgetall(key)
+                    pipe.delete(key)
+                results = pipe.execute()
+
+            for key, values in zip(host_keys, results[::2]):
+                # The hashes are already deleted, don't let one bad key drop
+                # the rest of the batch.
+                try:
+                    payload = self._load_payload(key, values)
+                    if payload is None:
+                        continue
+
+                    model, columns, filters, extra, signal_only = payload
+                    if signal_only:
+                        self._process(model, columns, filters, extra, signal_only)
+                    else:
+                        rows_by_model[model].append((columns, filters, extra))
+                except Exception:
+                    self.logger.exception("buffer.process-failed", extra={"redis_key": key})
+
+        for model, rows in rows_by_model.items():
+            try:
+                self.process_batch(model, rows)
+            except Exception:
+                self.logger.exception(
+                    "buffer.process-batch-failed", extra={"model": model.__name__}
+                )
+
+    def _load_payload(self, key, values):
+        """
+        Turn the raw hash of a buffered key into the arguments of `_process`,
+        or `None` if the hash was empty.
+        """
+        # XXX(python3): In python2 this isn't as important since redis will
+        # return string tyes (be it, byte strings), but in py3 we get bytes
+        # back, and really we just want to deal with keys as strings.
+        values = {force_text(k): v for k, v in values.items()}
+
+        if not values:
+            metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
+            self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+            return None
+
+        # XXX(py3): Note that ``import_string`` explicitly wants a str in
+        # python2, so we'll decode (for python3) and then translate back to
+        # a byte string (in python2) for import_string.
+        model = import_string(str(values.pop("m").decode("utf-8")))
+
+        if values["f"].startswith(b"{"):
+            filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
+        else:
+            # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+            filters = pickle.loads(values.pop("f"))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in values.items():
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                if v.startswith(b"["):
+                    extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
+                else:
+                    # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+                    extra_values[k[2:]] = pickle.loads(v)
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return model, incr_values, filters, extra_values, signal_only
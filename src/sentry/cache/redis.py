@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 from sentry.utils import json
 from sentry.utils.redis import get_cluster_from_options, redis_clusters
 
@@ -18,9 +20,7 @@ class CommonRedisCache(BaseCache):
 
     def set(self, key, value, timeout, version=None, raw=False):
         key = self.make_key(key, version=version)
-        v = json.dumps(value) if not raw else value
-        if len(v) > self.max_size:
-            raise ValueTooLarge(f"Cache key too large: {key!r} {len(v)!r}")
+        v = self._encode(key, value, raw)
         if timeout:
             self.client.setex(key, int(timeout), v)
         else:
@@ -28,6 +28,33 @@ class CommonRedisCache(BaseCache):
 
         self._mark_transaction("set")
 
+    def set_many(self, items, timeout, version=None, raw=False):
+        values = {}
+        for key, value in items.items():
+            key = self.make_key(key, version=version)
+            values[key] = self._encode(key, value, raw)
+
+        with self._pipeline() as pipeline:
+            for key, v in values.items():
+                if timeout:
+                    pipeline.setex(key, int(timeout), v)
+                else:
+                    pipeline.set(key, v)
+
+        self._mark_transaction("set")
+
+    def _encode(self, key, value, raw):
+        v = json.dumps(value) if not raw else value
+        if len(v) > self.max_size:
+            raise ValueTooLarge(f"Cache key too large: {key!r} {len(v)!r}")
+        return v
+
+    @contextmanager
+    def _pipeline(self):
+        with self.client.pipeline(transaction=False) as pipeline:
+            yield pipeline
+            pipeline.execute()
+
     def delete(self, key, version=None):
         key = self.make_key(key, version=version)
         self.client.delete(key)
@@ -51,6 +78,11 @@ class RbCache(CommonRedisCache):
         client = cluster.get_routing_client()
         CommonRedisCache.__init__(self, client, **options)
 
+    def _pipeline(self):
+        # The routing client fans commands issued in a map out to all hosts
+        # and waits for them when the block exits.
+        return self.client.map()
+
 
 # Confusing legacy name for RbCache.  We don't actually have a pure redis cache
 RedisCache = RbCache
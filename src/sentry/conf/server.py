@@ -1556,10 +1556,32 @@ SENTRY_SNUBA = os.environ.get("SNUBA", "http://127.0.0.1:1218")
 SENTRY_SNUBA_TIMEOUT = 30
 SENTRY_SNUBA_CACHE_TTL_SECONDS = 60
 
+# Buckets of discover timeseries queries are complete, and cached if the
+# `discover.timeseries-cache` option is set, once they are older than this many
+# seconds. Cached buckets are kept for `SENTRY_DISCOVER_TIMESERIES_CACHE_TTL`
+# seconds after they were first cached, however often they are extended.
+SENTRY_DISCOVER_TIMESERIES_CACHE_DELAY = 300
+SENTRY_DISCOVER_TIMESERIES_CACHE_TTL = 3600
+
+# Dedicated Snuba connection pools by referrer prefix, so that e.g. slow export
+# queries can't take all connections of other queries. Maps a referrer prefix
+# to the size of its pool, e.g. {"data_export": 4}, which caps the queries of
+# that prefix in flight: further queries wait for a free connection. The
+# longest matching prefix wins, other referrers use the default pool.
+SENTRY_SNUBA_REFERRER_POOLS = {}
+
 # Node storage backend
 SENTRY_NODESTORE = "sentry.nodestore.django.DjangoNodeStorage"
 SENTRY_NODESTORE_OPTIONS = {}
 
+# Trained zstd dictionaries for nodestore payloads, as a mapping of event
+# platform to dictionary file path. See sentry.nodestore.compression.
+SENTRY_NODESTORE_ZSTD_DICTIONARIES = {}
+
+# Size in bytes of the per-process LRU cache of decoded nodestore payloads
+# that sits in front of the "nodedata" cache. 0 disables it.
+SENTRY_NODESTORE_LRU_CACHE_SIZE = 0
+
 # Tag storage backend
 SENTRY_TAGSTORE = os.environ.get("SENTRY_TAGSTORE", "sentry.tagstore.snuba.SnubaTagStorage")
 SENTRY_TAGSTORE_OPTIONS = {}
@@ -1604,6 +1626,9 @@ SENTRY_METRICS_DISALLOW_BAD_TAGS = IS_DEV
 SENTRY_METRICS_INDEXER = "sentry.sentry_metrics.indexer.postgres.postgres_v2.PostgresIndexer"
 SENTRY_METRICS_INDEXER_OPTIONS = {}
 SENTRY_METRICS_INDEXER_CACHE_TTL = 3600 * 2
+# Number of string <-> id mappings kept in a per-process LRU cache in front of
+# the indexer's memcached cache. 0 disables it.
+SENTRY_METRICS_INDEXER_LOCAL_CACHE_SIZE = 0
 SENTRY_METRICS_INDEXER_TRANSACTIONS_SAMPLE_RATE = 0.1
 
 SENTRY_METRICS_INDEXER_SPANNER_OPTIONS = {}
@@ -2809,6 +2834,10 @@ SENTRY_GROUPING_AUTO_UPDATE_ENABLED = False
 # How long is the migration phase for grouping updates?
 SENTRY_GROUPING_UPDATE_MIGRATION_PHASE = 30 * 24 * 3600  # 30 days
 
+# Number of parsed enhancements and fingerprinting rules kept per process,
+# keyed by a hash of their config. 0 disables the cache.
+SENTRY_GROUPING_RULES_CACHE_SIZE = 1000
+
 SENTRY_USE_UWSGI = True
 
 # When copying attachments for to-be-reprocessed events into processing store,
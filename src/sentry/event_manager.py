@@ -1154,6 +1154,7 @@ def _tsdb_record_all_metrics(jobs: Sequence[Job]) -> None:
 
     # XXX: validate whether anybody actually uses those metrics
 
+    incr_requests = []
     for job in jobs:
         incrs = []
         frequencies = []
@@ -1193,7 +1194,7 @@ def _tsdb_record_all_metrics(jobs: Sequence[Job]) -> None:
             records.append((tsdb.models.users_affected_by_project, project_id, (user.tag_value,)))
 
         if incrs:
-            tsdb.incr_multi(incrs, timestamp=event.datetime, environment_id=environment.id)
+            incr_requests.append((incrs, event.datetime, environment.id))
 
         if records:
             tsdb.record_multi(records, timestamp=event.datetime, environment_id=environment.id)
@@ -1201,6 +1202,9 @@ def _tsdb_record_all_metrics(jobs: Sequence[Job]) -> None:
         if frequencies:
             tsdb.record_frequency_multi(frequencies, timestamp=event.datetime)
 
+    if incr_requests:
+        tsdb.incr_many(incr_requests)
+
 
 @metrics.wraps("save_event.nodestore_save_many")
 def _nodestore_save_many(jobs: Sequence[Job]) -> None:
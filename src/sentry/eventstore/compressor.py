@@ -3,7 +3,8 @@ Eventstore compressor is responsible for pulling out repeating data across
 events such that they can be stored only once. For example SDK modules list, or
 debug_meta.
 
-This is not used in production yet, we are still collecting metrics there.
+Nodestore uses this when the ``nodestore.dedup-subtrees`` option is enabled,
+storing each deduplicated sub-document once under its checksum.
 """
 
 import hashlib
@@ -12,8 +13,15 @@ from sentry.utils import json
 
 _INTERFACES = {}
 
+_MISSING = object()
+
 
 def _deduplicate_interface(*keys):
+    """
+    Register an interface for the given keys. Keys may be dotted paths such as
+    ``contexts.os`` to address nested sub-trees.
+    """
+
     def inner(f):
         for k in keys:
             _INTERFACES[k] = f
@@ -27,15 +35,21 @@ def _deduplicate_interface(*keys):
 class DebugMeta:
     _DEDUP_FIELDS = ("debug_id", "code_id", "code_file", "debug_file")
 
+    MIN_SIZE = 0
+
     @staticmethod
     def encode(data):
         dedup = {}
 
-        if data:
-            for image in data.get("images") or []:
-                image = image or {}
+        if data and data.get("images"):
+            images = []
+            for image in data["images"]:
+                image = dict(image or {})
                 for name in DebugMeta._DEDUP_FIELDS:
                     dedup.setdefault(name, []).append(image.pop(name, None))
+                images.append(image)
+
+            data = dict(data, images=images)
 
         return dedup, data
 
@@ -51,19 +65,77 @@ class DebugMeta:
         return data
 
 
+@_deduplicate_interface("sdk", "contexts.os", "contexts.device", "request.headers")
+class Subtree:
+    """
+    Deduplicates a whole sub-tree of the event. Small sub-trees are left inline
+    since they are cheaper to store than to look up.
+    """
+
+    MIN_SIZE = 128
+
+    @staticmethod
+    def encode(data):
+        return data, None
+
+    @staticmethod
+    def decode(dedup, data):
+        return dedup
+
+
+def _get_path(data, path):
+    for segment in path:
+        if not isinstance(data, dict) or segment not in data:
+            return _MISSING
+        data = data[segment]
+
+    return data
+
+
+def _without_path(data, path):
+    # Copy every container along the path instead of mutating it, the caller
+    # still holds on to the original event.
+    data = dict(data)
+    head, *rest = path
+    if rest:
+        data[head] = _without_path(data[head], rest)
+    else:
+        del data[head]
+
+    return data
+
+
+def _set_path(data, path, value):
+    for segment in path[:-1]:
+        data = data.setdefault(segment, {})
+
+    data[path[-1]] = value
+
+
 def deduplicate(data):
+    """
+    Pull out deduplicated sub-documents from `data`. Returns the remaining
+    event payload and a mapping of checksum to sub-document. `data` is not
+    mutated.
+    """
     patchsets = []
     extra_keys = {}
 
     for key, interface in _INTERFACES.items():
-        if key not in data:
+        path = key.split(".")
+        value = _get_path(data, path)
+        if value is _MISSING:
             continue
 
-        to_deduplicate, to_inline = interface.encode(data.pop(key))
+        to_deduplicate, to_inline = interface.encode(value)
         to_deduplicate_serialized = json.dumps(to_deduplicate, sort_keys=True).encode("utf8")
+        if len(to_deduplicate_serialized) < interface.MIN_SIZE:
+            continue
+
         checksum = hashlib.md5(to_deduplicate_serialized).hexdigest()
         extra_keys[checksum] = to_deduplicate
         patchsets.append([key, checksum, to_inline])
+        data = _without_path(data, path)
 
     if patchsets:
         data["__nodestore_patchsets"] = patchsets
@@ -71,19 +143,29 @@ def deduplicate(data):
     return data, extra_keys
 
 
+def get_checksums(data):
+    """
+    Return the checksums of all sub-documents `data` refers to.
+    """
+    return [checksum for _, checksum, _ in data.get("__nodestore_patchsets") or ()]
+
+
 def assemble(data, get_extra_keys):
+    """
+    Reverse of `deduplicate`. Sub-documents that `get_extra_keys` cannot find
+    (for instance because they expired) are left out of the result.
+    """
     if not data.get("__nodestore_patchsets"):
         return data
 
-    checksums = []
-    for key, checksum, inlined in data["__nodestore_patchsets"]:
-        checksums.append(checksum)
-
-    deduplicated_interfaces = get_extra_keys(checksums)
+    deduplicated_interfaces = get_extra_keys(get_checksums(data))
 
     for key, checksum, inlined in data["__nodestore_patchsets"]:
-        deduplicated = deduplicated_interfaces[checksum]
-        data[key] = _INTERFACES[key].decode(deduplicated, inlined)
+        deduplicated = deduplicated_interfaces.get(checksum)
+        if deduplicated is None:
+            continue
+
+        _set_path(data, key.split("."), _INTERFACES[key].decode(deduplicated, inlined))
 
     del data["__nodestore_patchsets"]
     return data
@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import Any, Optional
+from typing import Any, List, Optional, Sequence
 
 import sentry_sdk
 
@@ -40,6 +40,23 @@ class EventProcessingStore:
             self.inner.set(key, event, self.timeout)
             return key
 
+    def store_many(self, events: Sequence[Event], unprocessed: bool = False) -> List[str]:
+        """
+        Stores many events at once, using a single round trip where the
+        storage supports it. Returns the keys in the order of `events`.
+        """
+        with sentry_sdk.start_span(op="eventstore.processing.store_many"):
+            keys = []
+            items = {}
+            for event in events:
+                key = cache_key_for_event(event)
+                if unprocessed:
+                    key = self.__get_unprocessed_key(key)
+                keys.append(key)
+                items[key] = event
+            self.inner.set_many(items, self.timeout)
+            return keys
+
     def get(self, key: str, unprocessed: bool = False) -> Optional[Event]:
         with sentry_sdk.start_span(op="eventstore.processing.get"):
             if unprocessed:
@@ -8,6 +8,7 @@ from sentry.grouping.strategies.base import DEFAULT_GROUPING_ENHANCEMENTS_BASE,
 from sentry.grouping.strategies.configurations import CONFIGURATIONS
 from sentry.grouping.utils import (
     expand_title_template,
+    get_cached_rules,
     hash_from_values,
     is_default_fingerprint_var,
     resolve_fingerprint_values,
@@ -78,16 +79,22 @@ class GroupingConfigLoader:
         cache_prefix = self.cache_prefix
         cache_prefix += f"{LATEST_VERSION}:"
         cache_key = cache_prefix + md5_text(f"{enhancements_base}|{enhancements}").hexdigest()
-        rv = cache.get(cache_key)
-        if rv is not None:
+
+        def load():
+            rv = cache.get(cache_key)
+            if rv is not None:
+                return rv
+
+            try:
+                rv = Enhancements.from_config_string(
+                    enhancements, bases=[enhancements_base]
+                ).dumps()
+            except InvalidEnhancerConfig:
+                rv = get_default_enhancements()
+            cache.set(cache_key, rv)
             return rv
 
-        try:
-            rv = Enhancements.from_config_string(enhancements, bases=[enhancements_base]).dumps()
-        except InvalidEnhancerConfig:
-            rv = get_default_enhancements()
-        cache.set(cache_key, rv)
-        return rv
+        return get_cached_rules("enhancements_config", cache_key, load)
 
     def _get_config_id(self, project):
         raise NotImplementedError
@@ -187,17 +194,22 @@ def get_fingerprinting_config_for_project(project):
     from sentry.utils.cache import cache
     from sentry.utils.hashlib import md5_text
 
-    cache_key = "fingerprinting-rules:" + md5_text(rules).hexdigest()
-    rv = cache.get(cache_key)
-    if rv is not None:
-        return FingerprintingRules.from_json(rv)
+    config_hash = md5_text(rules).hexdigest()
+    cache_key = "fingerprinting-rules:" + config_hash
 
-    try:
-        rv = FingerprintingRules.from_config_string(rules)
-    except InvalidFingerprintingConfig:
-        rv = FingerprintingRules([])
-    cache.set(cache_key, rv.to_json())
-    return rv
+    def load():
+        rv = cache.get(cache_key)
+        if rv is not None:
+            return FingerprintingRules.from_json(rv)
+
+        try:
+            rv = FingerprintingRules.from_config_string(rules)
+        except InvalidFingerprintingConfig:
+            rv = FingerprintingRules([])
+        cache.set(cache_key, rv.to_json())
+        return rv
+
+    return get_cached_rules("fingerprinting", config_hash, load)
 
 
 def apply_server_fingerprinting(event, config, allow_custom_title=True):
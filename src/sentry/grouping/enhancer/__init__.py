@@ -1,6 +1,7 @@
 import base64
 import os
 import zlib
+from collections import defaultdict
 
 import msgpack
 from parsimonious.exceptions import ParseError
@@ -124,10 +125,11 @@ class Enhancements:
         cache = {}
 
         match_frames = [create_match_frame(frame, platform) for frame in frames]
+        frame_index = _build_frame_index(match_frames)
 
         for rule in self._modifier_rules:
             for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
+                match_frames, platform, exception_data, cache, frame_index
             ):
                 action.apply_modifications_to_frame(frames, match_frames, idx, rule=rule)
 
@@ -136,13 +138,14 @@ class Enhancements:
         cache = {}
 
         match_frames = [create_match_frame(frame, platform) for frame in frames]
+        frame_index = _build_frame_index(match_frames)
 
         stacktrace_state = StacktraceState()
         # Apply direct frame actions and update the stack state alongside
         for rule in self._updater_rules:
 
             for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
+                match_frames, platform, exception_data, cache, frame_index
             ):
                 action.update_frame_components_contributions(components, frames, idx, rule=rule)
                 action.modify_stacktrace_state(stacktrace_state, rule)
@@ -273,6 +276,19 @@ class Enhancements:
         return EnhancmentsVisitor(bases, id).visit(tree)
 
 
+def _build_frame_index(match_frames):
+    """Index frames by their exact function and module, the fields no action
+    can change.  Indices are kept in ascending order, so rules still see
+    matching frames in stack order.
+    """
+    rv = defaultdict(list)
+    for idx, match_frame in enumerate(match_frames):
+        rv["function", match_frame["function"]].append(idx)
+        if match_frame["module"] is not None:
+            rv["module", match_frame["module"]].append(idx)
+    return rv
+
+
 class Rule:
     def __init__(self, matchers, actions):
         self.matchers = matchers
@@ -312,13 +328,39 @@ class Rule:
             matchers[matcher.key] = matcher.pattern
         return {"match": matchers, "actions": [str(x) for x in self.actions]}
 
-    def get_matching_frame_actions(self, frames, platform, exception_data=None, cache=None):
+    @property
+    def index_key(self):
+        """A ``(field, value)`` pair that every frame matched by this rule has,
+        used to look up candidate frames in a frame index.  `None` if the rule
+        has no exact function or module matcher.
+        """
+        for matcher in self._other_matchers:
+            if isinstance(matcher, FrameMatch):
+                value = matcher.exact_value
+                if value is not None:
+                    return matcher.field, value
+        return None
+
+    def get_matching_frame_actions(
+        self, frames, platform, exception_data=None, cache=None, frame_index=None
+    ):
         """Given a frame returns all the matching actions based on this rule.
         If the rule does not match `None` is returned.
+
+        If a `frame_index` (see ``_build_frame_index``) is given, only frames
+        that can satisfy the rule's exact matcher are checked.
         """
         if not self.matchers:
             return []
 
+        candidates = range(len(frames))
+        if frame_index is not None:
+            index_key = self.index_key
+            if index_key is not None:
+                candidates = frame_index.get(index_key)
+                if not candidates:
+                    return []
+
         # 1 - Check if exception matchers match
         for m in self._exception_matchers:
             if not m.matches_frame(frames, None, platform, exception_data, cache):
@@ -327,7 +369,7 @@ class Rule:
         rv = []
 
         # 2 - Check if frame matchers match
-        for idx, frame in enumerate(frames):
+        for idx in candidates:
             if all(
                 m.matches_frame(frames, idx, platform, exception_data, cache)
                 for m in self._other_matchers
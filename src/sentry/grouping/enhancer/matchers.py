@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Optional
 
 from sentry.grouping.utils import get_rule_bool
@@ -26,6 +27,13 @@ SHORT_MATCH_KEYS = {v: k for k, v in MATCH_KEYS.items()}
 
 assert len(SHORT_MATCH_KEYS) == len(MATCH_KEYS)  # assert short key names are not reused
 
+# Glob results are additionally memoized process-wide, since the same
+# function names and paths show up in event after event.
+GLOB_CACHE_SIZE = 10000
+
+# Patterns without any of these characters can only match their literal value.
+_GLOB_SPECIAL_CHARS = frozenset(b"*?[]{}\\")
+
 FAMILIES = {"native": "N", "javascript": "J", "all": "a"}
 REVERSE_FAMILIES = {v: k for k, v in FAMILIES.items()}
 
@@ -118,6 +126,11 @@ class FrameMatch(Match):
     # Global registry of matchers
     instances = {}
 
+    # Whether ``Enhancements`` can look up the frames this matcher applies to
+    # by exact value (see ``exact_value``). Only true for fields that rules
+    # can not modify.
+    indexable = False
+
     @classmethod
     def from_key(cls, key, pattern, negated):
 
@@ -165,6 +178,17 @@ class FrameMatch(Match):
             self.pattern.split() != [self.pattern] and '"%s"' % self.pattern or self.pattern,
         )
 
+    @property
+    def exact_value(self):
+        """The only value this matcher matches, if it is a literal and indexable."""
+        if (
+            self.indexable
+            and not self.negated
+            and not _GLOB_SPECIAL_CHARS.intersection(self._encoded_pattern)
+        ):
+            return self._encoded_pattern
+        return None
+
     def matches_frame(self, frames, idx, platform, exception_data, cache):
         match_frame = frames[idx]
         rv = self._positive_frame_match(match_frame, platform, exception_data, cache)
@@ -186,6 +210,7 @@ class FrameMatch(Match):
         return ("!" if self.negated else "") + MATCH_KEYS[self.key] + arg
 
 
+@lru_cache(maxsize=GLOB_CACHE_SIZE)
 def path_like_match(pattern, value):
     """Stand-alone function for use with ``cached``"""
     if glob_match(value, pattern, ignorecase=False, doublestar=True, path_normalize=True):
@@ -198,6 +223,12 @@ def path_like_match(pattern, value):
     return False
 
 
+@lru_cache(maxsize=GLOB_CACHE_SIZE)
+def cached_glob_match(value, pattern):
+    """``glob_match`` with default options, memoized process-wide."""
+    return glob_match(value, pattern)
+
+
 class PathLikeMatch(FrameMatch):
     def __init__(self, key, pattern, negated=False):
         super().__init__(key, pattern.lower(), negated)
@@ -243,9 +274,13 @@ class InAppMatch(FrameMatch):
 
 
 class FunctionMatch(FrameMatch):
+
+    field = "function"
+    indexable = True
+
     def _positive_frame_match(self, match_frame, platform, exception_data, cache):
 
-        return cached(cache, glob_match, match_frame["function"], self._encoded_pattern)
+        return cached(cache, cached_glob_match, match_frame["function"], self._encoded_pattern)
 
 
 class FrameFieldMatch(FrameMatch):
@@ -254,12 +289,13 @@ class FrameFieldMatch(FrameMatch):
         if field is None:
             return False
 
-        return cached(cache, glob_match, field, self._encoded_pattern)
+        return cached(cache, cached_glob_match, field, self._encoded_pattern)
 
 
 class ModuleMatch(FrameFieldMatch):
 
     field = "module"
+    indexable = True
 
 
 class CategoryMatch(FrameFieldMatch):
@@ -277,7 +313,7 @@ class ExceptionFieldMatch(FrameMatch):
 
     def _positive_frame_match(self, frame_data, platform, exception_data, cache):
         field = get_path(exception_data, *self.field_path) or "<unknown>"
-        return cached(cache, glob_match, field, self._encoded_pattern)
+        return cached(cache, cached_glob_match, field, self._encoded_pattern)
 
 
 class ExceptionTypeMatch(ExceptionFieldMatch):
@@ -20,7 +20,9 @@ from sentry import projectoptions
 from sentry.eventstore.models import Event
 from sentry.grouping.component import GroupingComponent
 from sentry.grouping.enhancer import Enhancements
+from sentry.grouping.utils import get_cached_rules
 from sentry.interfaces.base import Interface
+from sentry.utils.hashlib import md5_text
 
 STRATEGIES: Dict[str, "Strategy[Any]"] = {}
 
@@ -297,7 +299,11 @@ class StrategyConfiguration:
         if enhancements is None:
             enhancements_instance = Enhancements([])
         else:
-            enhancements_instance = Enhancements.loads(enhancements)
+            enhancements_instance = get_cached_rules(
+                "enhancements",
+                md5_text(enhancements).hexdigest(),
+                lambda: Enhancements.loads(enhancements),
+            )
         self.enhancements = enhancements_instance
 
     def __repr__(self) -> str:
@@ -1,14 +1,55 @@
 import re
+from functools import lru_cache
 from hashlib import md5
 
+from django.conf import settings
 from django.utils.encoding import force_bytes
 
 from sentry.stacktraces.processing import get_crash_frame_from_event_data
+from sentry.utils import metrics
+from sentry.utils.lru import LRUCache
 from sentry.utils.safe import get_path
 
 _fingerprint_var_re = re.compile(r"\{\{\s*(\S+)\s*\}\}")
 
 
+@lru_cache(maxsize=1)
+def get_rules_cache():
+    """
+    The process-wide cache of parsed grouping rules, holding up to
+    ``SENTRY_GROUPING_RULES_CACHE_SIZE`` entries (disabled if 0). Rules in it
+    are shared between threads and must not be mutated.
+    """
+    max_size = settings.SENTRY_GROUPING_RULES_CACHE_SIZE
+    if not max_size:
+        return None
+
+    return LRUCache(max_weight=max_size)
+
+
+def get_cached_rules(kind, config_hash, load):
+    """
+    Returns the rules of type `kind` for the config with the given hash,
+    calling `load` to parse them on a miss. Since entries are keyed by a hash
+    of the config, changing a project option simply yields a new key and the
+    stale entry ages out.
+    """
+    cache = get_rules_cache()
+    if cache is None:
+        return load()
+
+    key = (kind, config_hash)
+    rv = cache.get(key)
+    if rv is not None:
+        metrics.incr("grouping.rules_cache", tags={"kind": kind, "result": "hit"})
+        return rv
+
+    metrics.incr("grouping.rules_cache", tags={"kind": kind, "result": "miss"})
+    rv = load()
+    cache.set(key, rv)
+    return rv
+
+
 def parse_fingerprint_var(value):
     match = _fingerprint_var_re.match(value)
     if match is not None and match.end() == len(value):
@@ -6,6 +6,7 @@ from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from typing import (
     Any,
     Callable,
+    List,
     Mapping,
     MutableMapping,
     MutableSequence,
@@ -17,15 +18,15 @@ from typing import (
     Union,
 )
 
-import msgpack
 import sentry_sdk
 from django.conf import settings
 from django.core.cache import cache
 
-from sentry import eventstore, features
+from sentry import eventstore, features, options
 from sentry.attachments import CachedAttachment, attachment_cache
 from sentry.event_manager import save_attachment
 from sentry.eventstore.processing import event_processing_store
+from sentry.ingest.message_decoder import PARSED_PAYLOAD_KEY, MessageDecoder, decode_message
 from sentry.ingest.types import ConsumerType
 from sentry.ingest.userreport import Conflict, save_userreport
 from sentry.killswitches import killswitch_matches_context
@@ -55,28 +56,47 @@ class AsyncResult(NamedTuple):  # TODO: Use Generic[T] with 3.7+
 
 Message = Any
 
+# An event that was loaded for batch processing: its deduplication key along
+# with the result of `_load_event`.
+_LoadedEvent = Tuple[str, Tuple[Any, Callable[..., None]]]
+
 
 class IngestConsumerWorker(AbstractBatchWorker):
-    def __init__(self, process_event_executor: Optional[ThreadPoolExecutor] = None) -> None:
+    def __init__(
+        self,
+        process_event_executor: Optional[ThreadPoolExecutor] = None,
+        decoder: Optional[MessageDecoder] = None,
+    ) -> None:
         self.__process_event_executor = process_event_executor
+        self.__decoder = decoder
         if self.__process_event_executor is None:
             self.__process_event = process_event
+            self.__process_event_batch = process_event_batch
         else:
             self.__process_event = functools.partial(
                 process_event_async, self.__process_event_executor
             )
+            self.__process_event_batch = functools.partial(
+                process_event_batch_async, self.__process_event_executor
+            )
 
     def process_message(self, message) -> Message:
-        message = msgpack.unpackb(message.value(), use_list=False)
-        return message
+        if self.__decoder is not None:
+            # Decoded for the whole batch at once in `flush_batch`.
+            return message.value()
+        return decode_message(message.value())
 
     def flush_batch(self, batch):
         mark_scope_as_unsafe()
         with metrics.timer("ingest_consumer.flush_batch"):
+            if self.__decoder is not None:
+                with metrics.timer("ingest_consumer.decode_batch"):
+                    batch = self.__decoder.decode(batch)
             return self._flush_batch(batch)
 
     def _flush_batch(self, batch: Sequence[Message]):
         attachment_chunks = []
+        batch_events = options.get("store.ingest-consumer-batch-events")
 
         # Processing functions may be either synchronous or asynchronous.
         # Functions that return an ``AsyncResult`` may perform a combination of
@@ -101,7 +121,14 @@ class IngestConsumerWorker(AbstractBatchWorker):
                 message_type = message["type"]
                 projects_to_fetch.add(message["project_id"])
 
-                if message_type == "event":
+                if message_type == "event" and batch_events:
+                    # Consecutive events are processed as one batch, which
+                    # keeps them in order with the other messages.
+                    if other_messages and other_messages[-1][0] is self.__process_event_batch:
+                        other_messages[-1][1].append(message)
+                    else:
+                        other_messages.append((self.__process_event_batch, [message]))
+                elif message_type == "event":
                     other_messages.append((self.__process_event, message))
                 elif message_type == "attachment_chunk":
                     attachment_chunks.append(message)
@@ -151,6 +178,8 @@ class IngestConsumerWorker(AbstractBatchWorker):
     def shutdown(self):
         if self.__process_event_executor is not None:
             self.__process_event_executor.shutdown()
+        if self.__decoder is not None:
+            self.__decoder.close()
 
 
 def trace_func(**span_kwargs):
@@ -178,15 +207,23 @@ def _do_process_event(message: Message, projects: Mapping[int, Project]) -> None
     callback(_store_event(data))
 
 
+def _get_deduplication_key(message: Message) -> str:
+    return f"ev:{int(message['project_id'])}:{message['event_id']}"
+
+
 def _load_event(
-    message: Message, projects: Mapping[int, Project]
-) -> Optional[Tuple[Any, Callable[[str], None]]]:
+    message: Message, projects: Mapping[int, Project], check_duplicate: bool = True
+) -> Optional[Tuple[Any, Callable[..., None]]]:
     """
     Perform some initial filtering and deserialize the message payload. If the
     event should be stored, the deserialized payload is returned along with a
     function that can be called with the event's storage key to resume
     processing after the event has been persisted and is available to be read by
     other processing components.
+
+    Callers that already checked the message for duplicates pass
+    ``check_duplicate=False``, and may call the returned function with
+    ``mark_processed=False`` to mark the event as processed themselves.
     """
     payload = message["payload"]
     start_time = float(message["start_time"])
@@ -215,8 +252,8 @@ def _load_event(
     # This code has been ripped from the old python store endpoint. We're
     # keeping it around because it does provide some protection against
     # reprocessing good events if a single consumer is in a restart loop.
-    deduplication_key = f"ev:{project_id}:{event_id}"
-    if cache.get(deduplication_key) is not None:
+    deduplication_key = _get_deduplication_key(message)
+    if check_duplicate and cache.get(deduplication_key) is not None:
         logger.warning(
             "pre-process-forwarder detected a duplicated event" " with id:%s for project:%s.",
             event_id,
@@ -247,7 +284,9 @@ def _load_event(
     # serializing it again.
     # XXX: Do not use CanonicalKeyDict here. This may break preprocess_event
     # which assumes that data passed in is a raw dictionary.
-    data = json.loads(payload)
+    data = message.get(PARSED_PAYLOAD_KEY)
+    if data is None:
+        data = json.loads(payload)
 
     if project_id == settings.SENTRY_PROJECT:
         metrics.incr(
@@ -267,7 +306,7 @@ def _load_event(
     ):
         return
 
-    def dispatch_task(cache_key: str) -> None:
+    def dispatch_task(cache_key: str, mark_processed: bool = True) -> None:
         if attachments:
             with sentry_sdk.start_span(op="ingest_consumer.set_attachment_cache"):
                 attachment_objects = [
@@ -304,7 +343,8 @@ def _load_event(
                 )
 
         # remember for an 1 hour that we saved this event (deduplication protection)
-        cache.set(deduplication_key, "", CACHE_TIMEOUT)
+        if mark_processed:
+            cache.set(deduplication_key, "", CACHE_TIMEOUT)
 
         # emit event_accepted once everything is done
         event_accepted.send_robust(ip=remote_addr, data=data, project=project, sender=process_event)
@@ -336,6 +376,77 @@ def process_event_async(
     )
 
 
+@trace_func(name="ingest_consumer.process_event_batch")
+def process_event_batch(messages: Sequence[Message], projects: Mapping[int, Project]) -> None:
+    """
+    Process many event messages at once. This does the same as calling
+    `process_event` for every message, in order, but checks for duplicates,
+    writes the events to the processing store and marks them as processed
+    with one round trip each for the whole batch.
+    """
+    loaded = _load_event_batch(messages, projects)
+    if loaded:
+        _dispatch_event_batch(loaded, _store_event_batch(loaded))
+
+
+def process_event_batch_async(
+    executor: ThreadPoolExecutor, messages: Sequence[Message], projects: Mapping[int, Project]
+) -> Optional["AsyncResult[List[str]]"]:
+    loaded = _load_event_batch(messages, projects)
+    if not loaded:
+        return None
+
+    return AsyncResult(
+        executor.submit(_store_event_batch, loaded),
+        lambda future: _dispatch_event_batch(loaded, future.result()),
+    )
+
+
+def _load_event_batch(
+    messages: Sequence[Message], projects: Mapping[int, Project]
+) -> List[_LoadedEvent]:
+    metrics.timing("ingest_consumer.process_event_batch.size", len(messages))
+
+    with metrics.timer("ingest_consumer.process_event_batch.check_duplicates"):
+        processed = cache.get_many([_get_deduplication_key(message) for message in messages])
+
+    loaded = []
+    with metrics.timer("ingest_consumer.process_event_batch.load"):
+        for message in messages:
+            deduplication_key = _get_deduplication_key(message)
+            if deduplication_key in processed:
+                logger.warning(
+                    "pre-process-forwarder detected a duplicated event"
+                    " with id:%s for project:%s.",
+                    message["event_id"],
+                    message["project_id"],
+                )
+                continue
+
+            result = _load_event(message, projects, check_duplicate=False)
+            if result is not None:
+                loaded.append((deduplication_key, result))
+
+            # The same event may be in the batch twice.
+            processed[deduplication_key] = ""
+
+    return loaded
+
+
+def _store_event_batch(loaded: Sequence[_LoadedEvent]) -> List[str]:
+    with metrics.timer("ingest_consumer.process_event_batch.store"):
+        return event_processing_store.store_many([data for _, (data, _) in loaded])
+
+
+def _dispatch_event_batch(loaded: Sequence[_LoadedEvent], cache_keys: Sequence[str]) -> None:
+    with metrics.timer("ingest_consumer.process_event_batch.dispatch"):
+        for (_, (_, callback)), cache_key in zip(loaded, cache_keys):
+            callback(cache_key, mark_processed=False)
+
+    with metrics.timer("ingest_consumer.process_event_batch.mark_processed"):
+        cache.set_many({deduplication_key: "" for deduplication_key, _ in loaded}, CACHE_TIMEOUT)
+
+
 @trace_func(name="ingest_consumer.process_attachment_chunk")
 @metrics.wraps("ingest_consumer.process_attachment_chunk")
 def process_attachment_chunk(message, projects):
@@ -424,14 +535,22 @@ def process_userreport(message, projects) -> None:
 
 
 def get_ingest_consumer(
-    consumer_types, once=False, executor: Optional[ThreadPoolExecutor] = None, **options
+    consumer_types,
+    once=False,
+    executor: Optional[ThreadPoolExecutor] = None,
+    decode_processes: Optional[int] = None,
+    **options,
 ):
     """
     Handles events coming via a kafka queue.
 
     The events should have already been processed (normalized... ) upstream (by Relay).
+
+    With `decode_processes`, messages (including event payloads) are decoded
+    in a pool of that many processes, see `MessageDecoder`.
     """
     topic_names = {ConsumerType.get_topic_name(consumer_type) for consumer_type in consumer_types}
+    decoder = MessageDecoder(decode_processes) if decode_processes else None
     return create_batching_kafka_consumer(
-        topic_names=topic_names, worker=IngestConsumerWorker(executor), **options
+        topic_names=topic_names, worker=IngestConsumerWorker(executor, decoder), **options
     )
@@ -72,6 +72,35 @@ class ProjectOptionManager(OptionManager["Project"]):
             result[instance_map[obj.project_id]] = obj.value
         return result
 
+    def prefetch_all_values(self, project_ids: Sequence[int]) -> None:
+        """
+        Loads the options of many projects into the local cache with one cache
+        and at most one database round trip, so that `get_all_values` does not
+        fetch them project by project.
+        """
+        cache_keys = {
+            self._make_key(project_id): project_id
+            for project_id in project_ids
+            if self._make_key(project_id) not in self._option_cache
+        }
+        if not cache_keys:
+            return
+
+        cached = cache.get_many(list(cache_keys))
+        self._option_cache.update(cached)
+
+        missing = [project_id for key, project_id in cache_keys.items() if key not in cached]
+        if not missing:
+            return
+
+        results: dict[int, dict[str, Value]] = {project_id: {} for project_id in missing}
+        for option in self.filter(project_id__in=missing):
+            results[option.project_id][option.key] = option.value
+
+        values = {self._make_key(project_id): result for project_id, result in results.items()}
+        cache.set_many(values)
+        self._option_cache.update(values)
+
     def get_value(
         self,
         project: Project,
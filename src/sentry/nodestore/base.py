@@ -1,10 +1,21 @@
+import logging
+import struct
+import time
+from copy import deepcopy
+from datetime import timedelta
+from functools import lru_cache
 from threading import local
 
 import sentry_sdk
+from django.conf import settings
 from django.core.cache import InvalidCacheBackendError, caches
 
-from sentry.utils import json
+from sentry import options
+from sentry.nodestore import compression
+from sentry.utils import json, metrics
 from sentry.utils.cache import memoize
+from sentry.utils.concurrent import SingleFlight
+from sentry.utils.lru import LRUCache
 from sentry.utils.services import Service
 
 # Cache an instance of the encoder we want to use
@@ -22,6 +33,53 @@ json_dumps = json.JSONEncoder(
 
 json_loads = json._default_decoder.decode
 
+logger = logging.getLogger(__name__)
+
+# Framed subkey format. The payload starts with a magic marker (which can never
+# be the first byte of a JSON document or a pickle), followed by the number of
+# subkeys and an offset table of ``(key length, payload offset, payload
+# length)`` entries, each entry followed by its ASCII key. The default subkey
+# (`None`) is stored under the empty key. Decoding only has to walk the table
+# and parse the one payload that was asked for.
+FRAMED_MAGIC = b"\x00nsf"
+_FRAME_HEADER = struct.Struct("<I")
+_FRAME_ENTRY = struct.Struct("<HII")
+
+# Deduplicated sub-documents (see `sentry.eventstore.compressor`) are stored
+# under their checksum with this prefix. They are never deleted explicitly.
+# Instead, each process rewrites a sub-document at most once per refresh
+# interval (or sooner for an event with a longer TTL), with the TTL of the
+# event extended by that interval (or, for backends that clean up by age, a
+# timestamp that far in the future), so it outlives every event that
+# references it.
+SUBDOCUMENT_KEY_PREFIX = "dedup:"
+SUBDOCUMENT_REFRESH_INTERVAL = timedelta(hours=1)
+_MAX_WRITTEN_SUBDOCUMENTS = 10000
+
+# Process-wide map of sub-document checksum to the time it was last written
+# and the time it expires at (`None` if it does not expire).
+_written_subdocuments = {}
+
+# Concurrent `get` calls for the same id within this process share one fetch.
+# Only used together with the LRU tier, the fetch is shared the same way: as
+# the encoded payload, which every caller decodes into its own copy.
+_single_flight = SingleFlight()
+
+
+@lru_cache(maxsize=1)
+def get_lru_cache():
+    """
+    The process-wide LRU tier in front of the nodestore cache, bounded to
+    ``SENTRY_NODESTORE_LRU_CACHE_SIZE`` bytes (disabled if 0). Payloads are
+    kept JSON encoded, so that every hit decodes a copy the caller owns, and
+    are weighed by the size of the encoding.
+    """
+    max_size = settings.SENTRY_NODESTORE_LRU_CACHE_SIZE
+    if not max_size:
+        return None
+
+    return LRUCache(max_weight=max_size, weigh=len)
+
 
 class NodeStorage(local, Service):
     """
@@ -89,28 +147,64 @@ class NodeStorage(local, Service):
             self.delete(id)
 
     def _decode(self, value, subkey):
-        if value is None:
+        if not value:
             return None
 
-        lines_iter = iter(value.splitlines())
-        try:
-            if subkey is not None:
-                # Those keys should be statically known identifiers in the app, such as
-                # "unprocessed_event". There is really no reason to allow anything but
-                # ASCII here.
-                subkey = subkey.encode("ascii")
+        value = compression.decompress(value)
 
-                next(lines_iter)
+        # Those keys should be statically known identifiers in the app, such as
+        # "unprocessed_event". There is really no reason to allow anything but
+        # ASCII here.
+        if subkey is not None:
+            subkey = subkey.encode("ascii")
 
-                for line in lines_iter:
-                    if line.strip() == subkey:
-                        break
+        if value.startswith(FRAMED_MAGIC):
+            return self._decode_framed(value, subkey)
 
-                    next(lines_iter)
+        return self._decode_lines(value, subkey)
 
-            return json_loads(next(lines_iter))
-        except StopIteration:
-            return None
+    def _decode_framed(self, value, subkey):
+        view = memoryview(value)
+        wanted = subkey or b""
+
+        (count,) = _FRAME_HEADER.unpack_from(view, len(FRAMED_MAGIC))
+        pos = len(FRAMED_MAGIC) + _FRAME_HEADER.size
+        for _ in range(count):
+            key_length, offset, length = _FRAME_ENTRY.unpack_from(view, pos)
+            pos += _FRAME_ENTRY.size
+            if view[pos : pos + key_length] == wanted:
+                return json_loads(str(view[offset : offset + length], "utf8"))
+            pos += key_length
+
+        return None
+
+    def _decode_lines(self, value, subkey):
+        """
+        Decode the legacy newline-separated format written by `_encode` when
+        framing is disabled: ``main\nkey1\nvalue1\nkey2\nvalue2``.
+        """
+        view = memoryview(value)
+        end = value.find(b"\n")
+        if end == -1:
+            end = len(value)
+
+        if subkey is None:
+            return json_loads(str(view[:end], "utf8"))
+
+        while end < len(value):
+            key_start = end + 1
+            key_end = value.find(b"\n", key_start)
+            if key_end == -1:
+                return None
+
+            end = value.find(b"\n", key_end + 1)
+            if end == -1:
+                end = len(value)
+
+            if value[key_start:key_end].strip() == subkey:
+                return json_loads(str(view[key_end + 1 : end], "utf8"))
+
+        return None
 
     def _get_bytes(self, id):
         """
@@ -127,25 +221,59 @@ class NodeStorage(local, Service):
         with sentry_sdk.start_span(op="nodestore.get") as span:
             span.set_tag("node_id", id)
             if subkey is None:
-                item_from_cache = self._get_cache_item(id)
-                if item_from_cache:
-                    span.set_tag("origin", "from_cache")
-                    span.set_tag("found", bool(item_from_cache))
-                    return item_from_cache
+                lru_cache = get_lru_cache()
+                if lru_cache is not None:
+                    item_from_lru = lru_cache.get(id)
+                    if item_from_lru is not None:
+                        span.set_tag("origin", "from_lru")
+                        span.set_tag("found", True)
+                        return json_loads(item_from_lru)
 
-            span.set_tag("subkey", str(subkey))
-            bytes_data = self._get_bytes(id)
-            rv = self._decode(bytes_data, subkey=subkey)
-            if subkey is None:
-                # set cache item only after we know decoding did not fail
-                self._set_cache_item(id, rv)
+                    return self._get_shared(id, span)
 
-            span.set_tag("result", "from_service")
-            if bytes_data:
-                span.set_tag("bytes.size", len(bytes_data))
-            span.set_tag("found", bool(rv))
+            return self._get(id, subkey, span)
+
+    def _get_shared(self, id, span):
+        future, leader = _single_flight.join(id)
+        if not leader:
+            span.set_tag("origin", "from_single_flight")
+            encoded = future.result()
+            return json_loads(encoded) if encoded is not None else None
 
+        try:
+            rv = self._get(id, None, span)
+            encoded = self._set_lru_item(id, rv)
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(encoded)
             return rv
+        finally:
+            _single_flight.leave(id)
+
+    def _get(self, id, subkey, span):
+        if subkey is None:
+            item_from_cache = self._get_cache_item(id)
+            if item_from_cache:
+                span.set_tag("origin", "from_cache")
+                span.set_tag("found", bool(item_from_cache))
+                return item_from_cache
+
+        span.set_tag("subkey", str(subkey))
+        bytes_data = self._get_bytes(id)
+        rv = self._decode(bytes_data, subkey=subkey)
+        if subkey is None:
+            rv = self._assemble_subdocuments({id: rv})[id]
+            # set cache item only after we know decoding did not fail
+            self._set_cache_item(id, rv)
+
+        span.set_tag("result", "from_service")
+        if bytes_data:
+            span.set_tag("bytes.size", len(bytes_data))
+        span.set_tag("found", bool(rv))
+
+        return rv
 
     def _get_bytes_multi(self, id_list):
         """
@@ -179,12 +307,13 @@ class NodeStorage(local, Service):
             else:
                 uncached_ids = id_list
 
-            items = {
-                id: self._decode(value, subkey=subkey)
-                for id, value in self._get_bytes_multi(uncached_ids).items()
-            }
+            bytes_items = self._get_bytes_multi(uncached_ids)
+            items = {id: self._decode(value, subkey=subkey) for id, value in bytes_items.items()}
             if subkey is None:
+                items = self._assemble_subdocuments(items)
                 self._set_cache_items(items)
+                for id, data in items.items():
+                    self._set_lru_item(id, data)
                 items.update(cache_items)
 
             span.set_tag("result", "from_service")
@@ -200,7 +329,22 @@ class NodeStorage(local, Service):
 
         >>> _encode({"unprocessed": {}, None: {"stacktrace": {}}})
         b'{"stacktrace": {}}\nunprocessed\n{}'
+
+        If the ``nodestore.compression`` option is set, the result is
+        compressed with that codec, see `sentry.nodestore.compression`.
         """
+        codec_name = options.get("nodestore.compression")
+        if codec_name:
+            main = data.get(None)
+            platform = main.get("platform") if isinstance(main, dict) else None
+            return compression.compress(self._encode_uncompressed(data), codec_name, platform)
+
+        return self._encode_uncompressed(data)
+
+    def _encode_uncompressed(self, data):
+        if options.get("nodestore.framed-subkeys"):
+            return self._encode_framed(data)
+
         lines = [json_dumps(data.pop(None)).encode("utf8")]
         for key, value in data.items():
             lines.append(key.encode("ascii"))
@@ -208,6 +352,28 @@ class NodeStorage(local, Service):
 
         return b"\n".join(lines)
 
+    def _encode_framed(self, data):
+        """
+        Encode data dict into the framed subkey format, see `FRAMED_MAGIC`.
+        """
+        entries = [(b"", json_dumps(data.pop(None)).encode("utf8"))]
+        for key, value in data.items():
+            entries.append((key.encode("ascii"), json_dumps(value).encode("utf8")))
+
+        offset = (
+            len(FRAMED_MAGIC)
+            + _FRAME_HEADER.size
+            + sum(_FRAME_ENTRY.size + len(key) for key, _ in entries)
+        )
+        chunks = [FRAMED_MAGIC, _FRAME_HEADER.pack(len(entries))]
+        for key, payload in entries:
+            chunks.append(_FRAME_ENTRY.pack(len(key), offset, len(payload)))
+            chunks.append(key)
+            offset += len(payload)
+
+        chunks.extend(payload for _, payload in entries)
+        return b"".join(chunks)
+
     def _set_bytes(self, id, data, ttl=None):
         """
         >>> nodestore.set('key1', b"{'foo': 'bar'}")
@@ -241,10 +407,115 @@ class NodeStorage(local, Service):
             span.set_tag("node_id", id)
             span.set_data("subkeys_count", len(data))
             cache_item = data.get(None)
+            if options.get("nodestore.dedup-subtrees") and isinstance(cache_item, dict):
+                from sentry.eventstore.compressor import deduplicate
+
+                data[None], subdocuments = deduplicate(cache_item)
+                # sub-documents are written first so that readers never see
+                # a reference to a sub-document that does not exist yet
+                self._set_subdocuments(subdocuments, ttl=ttl)
             bytes_data = self._encode(data)
             self._set_bytes(id, bytes_data, ttl=ttl)
             # set cache only after encoding and write to nodestore has succeeded
             self._set_cache_item(id, cache_item)
+            lru_cache = get_lru_cache()
+            if lru_cache is not None:
+                # The written payload is still owned (and possibly mutated) by
+                # the caller, so drop the stale entry instead of sharing it.
+                lru_cache.delete(id)
+
+    def _get_default_ttl(self):
+        """
+        The TTL used by the backend when none is passed to `set`, if any.
+        """
+        return None
+
+    def _set_subdocuments(self, subdocuments, ttl=None):
+        ttl = ttl or self._get_default_ttl()
+        now = time.monotonic()
+        # The sub-documents have to live at least as long as the payload.
+        expires_at = None
+        if ttl is not None:
+            expires_at = now + ttl.total_seconds()
+            ttl += SUBDOCUMENT_REFRESH_INTERVAL
+
+        refresh_interval = SUBDOCUMENT_REFRESH_INTERVAL.total_seconds()
+        if len(_written_subdocuments) > _MAX_WRITTEN_SUBDOCUMENTS:
+            _written_subdocuments.clear()
+
+        written = 0
+        for checksum, value in subdocuments.items():
+            if checksum in _written_subdocuments:
+                written_at, written_expires_at = _written_subdocuments[checksum]
+                if now - written_at < refresh_interval and (
+                    written_expires_at is None
+                    or (expires_at is not None and written_expires_at >= expires_at)
+                ):
+                    continue
+
+            self._set_bytes(
+                SUBDOCUMENT_KEY_PREFIX + checksum, self._encode({None: value}), ttl=ttl
+            )
+            _written_subdocuments[checksum] = (
+                now,
+                None if ttl is None else now + ttl.total_seconds(),
+            )
+            written += 1
+
+        metrics.incr("nodestore.subdocuments.written", amount=written)
+        metrics.incr("nodestore.subdocuments.skipped", amount=len(subdocuments) - written)
+
+    def _assemble_subdocuments(self, items):
+        """
+        Rebuild payloads that had sub-documents deduplicated out of them. The
+        sub-documents for all items are fetched in one batch.
+        """
+        from sentry.eventstore.compressor import assemble, get_checksums
+
+        checksums = {
+            checksum
+            for data in items.values()
+            if isinstance(data, dict)
+            for checksum in get_checksums(data)
+        }
+        if not checksums:
+            return items
+
+        subdocuments = {}
+        prefix_length = len(SUBDOCUMENT_KEY_PREFIX)
+        for id, value in self._get_bytes_multi(
+            [SUBDOCUMENT_KEY_PREFIX + checksum for checksum in checksums]
+        ).items():
+            if value is not None:
+                subdocuments[id[prefix_length:]] = self._decode(value, subkey=None)
+
+        missing = checksums - subdocuments.keys()
+        if missing:
+            metrics.incr("nodestore.subdocuments.missing", amount=len(missing))
+            logger.warning(
+                "nodestore.subdocuments.missing",
+                extra={
+                    "node_ids": [
+                        id
+                        for id, data in items.items()
+                        if isinstance(data, dict) and missing.intersection(get_checksums(data))
+                    ],
+                    "checksums": sorted(missing),
+                },
+            )
+
+        def get_subdocuments(checksums):
+            # Every payload gets its own copy, callers are free to mutate them.
+            return {
+                checksum: deepcopy(subdocuments[checksum])
+                for checksum in checksums
+                if checksum in subdocuments
+            }
+
+        return {
+            id: assemble(data, get_subdocuments) if isinstance(data, dict) else data
+            for id, data in items.items()
+        }
 
     def cleanup(self, cutoff_timestamp):
         raise NotImplementedError
@@ -257,9 +528,18 @@ class NodeStorage(local, Service):
             return self.cache.get(id)
 
     def _get_cache_items(self, id_list):
-        if self.cache:
-            return self.cache.get_many(id_list)
-        return {}
+        lru_cache = get_lru_cache()
+        rv = {}
+        if lru_cache is not None:
+            rv = {id: json_loads(value) for id, value in lru_cache.get_many(id_list).items()}
+
+        if self.cache and len(rv) < len(id_list):
+            items_from_cache = self.cache.get_many([id for id in id_list if id not in rv])
+            for id, data in items_from_cache.items():
+                self._set_lru_item(id, data)
+            rv.update(items_from_cache)
+
+        return rv
 
     def _set_cache_item(self, id, data):
         if self.cache and data:
@@ -269,13 +549,34 @@ class NodeStorage(local, Service):
         if self.cache:
             self.cache.set_many(items)
 
+    def _set_lru_item(self, id, data):
+        """
+        Adds the payload to the LRU tier, if enabled. Returns its encoding
+        (`None` if the payload is `None`), which does not change when the
+        caller mutates the payload.
+        """
+        lru_cache = get_lru_cache()
+        if lru_cache is None or data is None:
+            return None
+
+        encoded = json_dumps(data)
+        if data:
+            lru_cache.set(id, encoded)
+        return encoded
+
     def _delete_cache_item(self, id):
         if self.cache:
             self.cache.delete(id)
+        lru_cache = get_lru_cache()
+        if lru_cache is not None:
+            lru_cache.delete(id)
 
     def _delete_cache_items(self, id_list):
         if self.cache:
             self.cache.delete_many([id for id in id_list])
+        lru_cache = get_lru_cache()
+        if lru_cache is not None:
+            lru_cache.delete_many(id_list)
 
     @memoize
     def cache(self):
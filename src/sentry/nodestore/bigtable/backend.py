@@ -67,6 +67,9 @@ class BigtableNodeStorage(NodeStorage):
     def _set_bytes(self, id, data, ttl=None):
         self.store.set(id, data, ttl)
 
+    def _get_default_ttl(self):
+        return self.store.default_ttl
+
     def delete(self, id):
         if self.skip_deletes:
             return
@@ -0,0 +1,133 @@
+"""
+Compression of nodestore payloads.
+
+Payloads compressed by nodestore itself start with a small header that
+records which codec (and, for zstd, which trained dictionary) was used to
+write them, so the codec can be changed at any time without breaking reads of
+existing blobs. Payloads without the header are returned unchanged, which
+keeps blobs written before compression was enabled (or compressed by the
+backend itself) readable.
+
+Dictionaries are configured per event platform through
+``SENTRY_NODESTORE_ZSTD_DICTIONARIES``, a mapping of platform to the path of a
+dictionary file. Dictionaries are also looked up by their id when reading, so
+a dictionary must stay configured for as long as blobs written with it exist.
+Retired dictionaries can be kept under a key that is not a platform name. New
+dictionaries can be trained with `train_dictionary`.
+"""
+
+import struct
+from copy import deepcopy
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+import zstandard
+from django.conf import settings
+
+from sentry.utils.codecs import Codec, ZlibCodec, ZstdCodec
+
+HEADER_MAGIC = b"\x00nsz"
+
+# codec id, zstd dictionary id (0 if no dictionary was used)
+_HEADER = struct.Struct("<BI")
+
+DEFAULT_DICTIONARY_SIZE = 112 * 1024
+
+_codecs_by_id: Dict[int, Codec[bytes, bytes]] = {}
+_codec_ids_by_name: Dict[str, int] = {}
+
+
+def register_codec(name: str, codec_id: int, codec: Codec[bytes, bytes]) -> None:
+    """
+    Register a codec under a name (used in the ``nodestore.compression``
+    option) and a codec id (stored in the header). Codec ids must never be
+    reused for a different codec.
+    """
+    if codec_id in _codecs_by_id:
+        raise ValueError(f"Codec id {codec_id} is already registered")
+
+    _codecs_by_id[codec_id] = codec
+    _codec_ids_by_name[name] = codec_id
+
+
+register_codec("zlib", 1, ZlibCodec())
+register_codec("zstd", 2, ZstdCodec())
+
+
+@lru_cache(maxsize=1)
+def _get_dictionaries() -> Tuple[Mapping[str, ZstdCodec], Mapping[int, ZstdCodec]]:
+    by_platform = {}
+    by_id = {}
+
+    for platform, path in settings.SENTRY_NODESTORE_ZSTD_DICTIONARIES.items():
+        with open(path, "rb") as f:
+            codec = ZstdCodec(dictionary=f.read())
+        by_platform[platform] = codec
+        by_id[codec.dictionary_id] = codec
+
+    return by_platform, by_id
+
+
+def compress(value: bytes, codec_name: str, platform: Optional[str] = None) -> bytes:
+    """
+    Compress `value` with the codec registered as `codec_name`. If the codec
+    is zstd and a dictionary is configured for `platform`, the dictionary is
+    used.
+    """
+    codec_id = _codec_ids_by_name[codec_name]
+    codec = _codecs_by_id[codec_id]
+    dictionary_id = 0
+
+    if codec_name == "zstd" and platform is not None:
+        dictionary_codec = _get_dictionaries()[0].get(platform)
+        if dictionary_codec is not None:
+            codec = dictionary_codec
+            dictionary_id = dictionary_codec.dictionary_id
+
+    return HEADER_MAGIC + _HEADER.pack(codec_id, dictionary_id) + codec.encode(value)
+
+
+def decompress(value: bytes) -> bytes:
+    """
+    Decompress a payload written by `compress`. Payloads without a header are
+    returned as-is.
+    """
+    if not value.startswith(HEADER_MAGIC):
+        return value
+
+    codec_id, dictionary_id = _HEADER.unpack_from(value, len(HEADER_MAGIC))
+    payload = memoryview(value)[len(HEADER_MAGIC) + _HEADER.size :]
+
+    codec: Codec[bytes, bytes]
+    if dictionary_id:
+        try:
+            codec = _get_dictionaries()[1][dictionary_id]
+        except KeyError:
+            raise ValueError(f"Unknown zstd dictionary id {dictionary_id}")
+    else:
+        try:
+            codec = _codecs_by_id[codec_id]
+        except KeyError:
+            raise ValueError(f"Unknown nodestore codec id {codec_id}")
+
+    return codec.decode(payload)
+
+
+def train_dictionary(
+    samples: Iterable[Mapping[str, Any]], dict_size: int = DEFAULT_DICTIONARY_SIZE
+) -> bytes:
+    """
+    Train a zstd dictionary from a sample of event payloads, typically all of
+    the same platform. The samples are passed through the eventstore
+    compressor first so the dictionary is trained on what repeats across
+    events after deduplication.
+    """
+    from sentry.eventstore.compressor import deduplicate
+    from sentry.nodestore.base import json_dumps
+
+    encoded = []
+    for sample in samples:
+        data, _ = deduplicate(deepcopy(dict(sample)))
+        encoded.append(json_dumps(data).encode("utf8"))
+
+    return zstandard.train_dictionary(dict_size, encoded).as_bytes()
@@ -5,7 +5,13 @@ import pickle
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
-from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.base import (
+    FRAMED_MAGIC,
+    SUBDOCUMENT_KEY_PREFIX,
+    SUBDOCUMENT_REFRESH_INTERVAL,
+    NodeStorage,
+)
+from sentry.nodestore.compression import HEADER_MAGIC
 from sentry.utils.strings import compress, decompress
 
 from .models import Node
@@ -23,7 +29,7 @@ class DjangoNodeStorage(NodeStorage):
             return None
 
         try:
-            if value.startswith(b"{"):
+            if value.startswith((b"{", FRAMED_MAGIC, HEADER_MAGIC)):
                 return NodeStorage._decode(self, value, subkey=subkey)
 
             if subkey is None:
@@ -49,7 +55,12 @@ class DjangoNodeStorage(NodeStorage):
         self._delete_cache_items(id_list)
 
     def _set_bytes(self, id, data, ttl=None):
-        create_or_update(Node, id=id, values={"data": compress(data), "timestamp": timezone.now()})
+        timestamp = timezone.now()
+        if id.startswith(SUBDOCUMENT_KEY_PREFIX):
+            # `cleanup` goes by age, so sub-documents have to stay around for
+            # the refresh interval after the last event that may reference them.
+            timestamp += SUBDOCUMENT_REFRESH_INTERVAL
+        create_or_update(Node, id=id, values={"data": compress(data), "timestamp": timestamp})
 
     def cleanup(self, cutoff_timestamp):
         from sentry.db.deletion import BulkDeleteQuery
@@ -267,6 +267,14 @@ register("snuba.search.max-total-chunk-time-seconds", default=30.0)
 register("snuba.search.hits-sample-size", default=100)
 register("snuba.track-outcomes-sample-rate", default=0.0)
 
+# Send identical Snuba queries that run at the same time only once, both within
+# a process and across processes, and share the result.
+register("snuba.query-coalescing", default=False, flags=FLAG_PRIORITIZE_DISK)
+
+# Cache the complete buckets of discover timeseries queries, so that only new
+# buckets are queried when the same query is repeated over a later time range.
+register("discover.timeseries-cache", default=False, flags=FLAG_PRIORITIZE_DISK)
+
 # The percentage of tagkeys that we want to cache. Set to 1.0 in order to cache everything, <=0.0 to stop caching
 register("snuba.tagstore.cache-tagkeys-rate", default=0.0, flags=FLAG_PRIORITIZE_DISK)
 
@@ -328,6 +336,24 @@ register("outcomes.tsdb-in-consumer-sample-rate", default=0.0)  # unused
 register("nodedata.cache-sample-rate", default=0.0, flags=FLAG_PRIORITIZE_DISK)
 register("nodedata.cache-on-save", default=False, flags=FLAG_PRIORITIZE_DISK)
 
+# Write nodestore subkeys in the framed format (offset table + payloads) instead
+# of newline-separated JSON. Readers understand both formats, so this can be
+# enabled once all readers are deployed.
+register("nodestore.framed-subkeys", default=False, flags=FLAG_PRIORITIZE_DISK)
+
+# Codec used to compress nodestore payloads before they are handed to the
+# backend ("zlib" or "zstd"), see sentry.nodestore.compression. Blobs record
+# their codec, so this can be changed at any time.
+register("nodestore.compression", default=None, flags=FLAG_PRIORITIZE_DISK)
+
+# Store large repeated parts of events (debug images, sdk, os/device contexts,
+# request headers) once per content hash, see sentry.eventstore.compressor.
+register("nodestore.dedup-subtrees", default=False, flags=FLAG_PRIORITIZE_DISK)
+
+# Drain pending RedisBuffer keys in atomically popped chunks and process each
+# chunk with one Redis pipeline per host, instead of taking a global lock.
+register("buffer.redis.drain-pending", default=False, flags=FLAG_PRIORITIZE_DISK)
+
 # Use nodestore for eventstore.get_events
 register("eventstore.use-nodestore", default=False, flags=FLAG_PRIORITIZE_DISK)
 
@@ -442,6 +468,15 @@ register("symbolicate-event.low-priority.metrics.submission-rate", default=0.0)
 # special save_event task for transactions avoiding the preprocess.
 register("store.save-transactions-ingest-consumer-rate", default=0.0)
 
+# Process the events of a batch in the ingest consumer together: check for
+# duplicates, write to the processing store and mark them as processed with one
+# round trip each, rather than one per event.
+register("store.ingest-consumer-batch-events", default=False, flags=FLAG_PRIORITIZE_DISK)
+
+# Apply RedisTSDB counter increments with one Lua script call per Redis host
+# instead of a HINCRBY and EXPIREAT per hash.
+register("tsdb.redis.incr-script", default=False, flags=FLAG_PRIORITIZE_DISK)
+
 # Drop delete_old_primary_hash messages for a particular project.
 register("reprocessing2.drop-delete-old-primary-hash", default=[])
 
@@ -518,6 +553,11 @@ register("api.deprecation.brownout-duration", default="PT1M")
 # values or not
 register("sentry-metrics.performance.index-tag-values", default=True)
 
+# Write new strings of the Postgres string indexer with one
+# INSERT ... ON CONFLICT DO NOTHING RETURNING instead of bulk_create plus a
+# re-read of all rows.
+register("sentry-metrics.indexer.postgres.insert-returning", default=False)
+
 # Global and per-organization limits on the writes to the string indexer's DB.
 #
 # Format is a list of dictionaries of format {
@@ -1,13 +1,31 @@
+import logging
+import os
+import threading
 import time
 from abc import ABC, abstractmethod
 from collections import defaultdict
-from typing import Collection, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+from typing import (
+    Collection,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 import rb
 
 from sentry.utils import metrics, redis
+from sentry.utils.concurrent import register_shutdown
 from sentry.utils.services import Service
 
+logger = logging.getLogger(__name__)
+
 Hash = int
 Timestamp = int
 
@@ -151,6 +169,23 @@ class CardinalityLimiter(Service):
         raise NotImplementedError()
 
 
+class _LocalWindow:
+    """
+    What a process knows about the set of a quota window, see
+    `RedisCardinalityLimiter(local_sync_interval=...)`.
+    """
+
+    __slots__ = ("seen", "count", "synced_at", "expires_at")
+
+    def __init__(self, synced_at: float, expires_at: float) -> None:
+        # Hashes known to be in the set.
+        self.seen: Set[Hash] = set()
+        # Estimated cardinality of the set.
+        self.count = 0.0
+        self.synced_at = synced_at
+        self.expires_at = expires_at
+
+
 class RedisCardinalityLimiter(CardinalityLimiter):
     """
     The Redis cardinality limiter stores a key per unit hash, and adds the unit
@@ -218,6 +253,8 @@ class RedisCardinalityLimiter(CardinalityLimiter):
         num_shards: int = 3,
         num_physical_shards: int = 3,
         metric_tags: Optional[Mapping[str, str]] = None,
+        local_sync_interval: Optional[int] = None,
+        local_error_margin: float = 0.1,
     ) -> None:
         """
         :param cluster: Name of the redis cluster to use, to be configured with
@@ -230,6 +267,17 @@ class RedisCardinalityLimiter(CardinalityLimiter):
             Redis. The ratio `cluster_num_physical_shards / cluster_num_shards`
             is a sampling rate, the lower it is, the less precise accounting
             will be.
+        :param local_sync_interval: If set, the limiter keeps what it learned
+            about each quota window in memory and answers checks from it,
+            reading from Redis at most every `local_sync_interval` seconds per
+            window. Writes to Redis are batched and sent at the same interval
+            by a background thread, and when the process exits (or `close` is
+            called).
+        :param local_error_margin: With `local_sync_interval`, checks still go
+            to Redis once a window is estimated to be within this fraction of
+            its limit. Since other processes only see writes once they are
+            sent, every process can over-admit up to this fraction of the
+            limit.
         """
         is_redis_cluster, client, _ = redis.get_dynamic_cluster_from_options(
             "", {"cluster": cluster}
@@ -243,8 +291,27 @@ class RedisCardinalityLimiter(CardinalityLimiter):
         self.num_shards = num_shards
         self.num_physical_shards = num_physical_shards
         self.metric_tags = metric_tags or {}
+
+        assert 0 <= local_error_margin < 1
+        self.local_sync_interval = local_sync_interval
+        self.local_error_margin = local_error_margin
+        # (prefix, quota, oldest time bucket) -> window
+        self._local_windows: Dict[Tuple[str, Quota, int], _LocalWindow] = {}
+        self._pending_unit_keys: Dict[str, int] = {}
+        self._pending_set_keys: MutableMapping[str, Set[int]] = defaultdict(set)
+        self._pending_set_keys_ttl: Dict[str, int] = {}
+        self._flushed_at = 0.0
+        self._reset_after_fork()
+        # Threads do not survive forking, and the lock may have been held by
+        # the flusher of the parent. Writes inherited from the parent may be
+        # sent twice, which is harmless since they are idempotent.
+        os.register_at_fork(after_in_child=self._reset_after_fork)
         super().__init__()
 
+    def _reset_after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+
     @staticmethod
     def _get_timeseries_key(request: RequestedQuota, hash: Hash) -> str:
         return f"cardinality:timeseries:{request.prefix}-{hash}"
@@ -271,6 +338,12 @@ class RedisCardinalityLimiter(CardinalityLimiter):
     def _get_set_cardinality_sample_factor(self) -> float:
         return self.num_shards / self.num_physical_shards
 
+    def _get_local_window_key(
+        self, request: RequestedQuota, timestamp: Timestamp
+    ) -> Tuple[str, Quota, int]:
+        oldest_time_bucket = list(request.quota.iter_window(timestamp))[-1]
+        return request.prefix, request.quota, oldest_time_bucket
+
     def check_within_quotas(
         self, requests: Sequence[RequestedQuota], timestamp: Optional[Timestamp] = None
     ) -> Tuple[Timestamp, Sequence[GrantedQuota]]:
@@ -279,6 +352,60 @@ class RedisCardinalityLimiter(CardinalityLimiter):
         else:
             timestamp = int(timestamp)
 
+        if self.local_sync_interval is None:
+            return timestamp, self._check_within_quotas(requests, timestamp)
+
+        now = time.time()
+        local_grants = [self._check_locally(request, timestamp, now) for request in requests]
+        remote_requests = [
+            request for request, grant in zip(requests, local_grants) if grant is None
+        ]
+
+        metrics.incr(
+            "ratelimits.cardinality.local_checks",
+            amount=len(requests) - len(remote_requests),
+            tags=self.metric_tags,
+        )
+
+        if not remote_requests:
+            return timestamp, local_grants
+
+        # Make sure what was already granted is counted in Redis.
+        self._flush_local_writes(now)
+
+        remote_grants = iter(self._check_within_quotas(remote_requests, timestamp, now))
+        return timestamp, [
+            grant if grant is not None else next(remote_grants) for grant in local_grants
+        ]
+
+    def _check_locally(
+        self, request: RequestedQuota, timestamp: Timestamp, now: float
+    ) -> Optional[GrantedQuota]:
+        """
+        Grant all of the request if the limit is clearly not reached, without
+        asking Redis. Returns `None` if Redis has to be asked.
+        """
+        assert self.local_sync_interval is not None
+
+        window = self._local_windows.get(self._get_local_window_key(request, timestamp))
+        if window is None or now - window.synced_at >= self.local_sync_interval:
+            return None
+
+        new_hashes = set(request.unit_hashes) - window.seen
+        headroom = request.quota.limit * (1 - self.local_error_margin) - window.count
+        if len(new_hashes) > headroom:
+            return None
+
+        return GrantedQuota(
+            request=request, granted_unit_hashes=list(request.unit_hashes), reached_quota=None
+        )
+
+    def _check_within_quotas(
+        self,
+        requests: Sequence[RequestedQuota],
+        timestamp: Timestamp,
+        now: Optional[float] = None,
+    ) -> Sequence[GrantedQuota]:
         unit_keys_to_get: List[str] = []
         set_keys_to_count: List[str] = []
 
@@ -292,7 +419,7 @@ class RedisCardinalityLimiter(CardinalityLimiter):
             # If there are no keys to fetch (i.e. there are no quotas to
             # enforce), we can save the redis call entirely and just grant all
             # quotas immediately.
-            return timestamp, [
+            return [
                 GrantedQuota(
                     request=request, granted_unit_hashes=request.unit_hashes, reached_quota=None
                 )
@@ -353,7 +480,23 @@ class RedisCardinalityLimiter(CardinalityLimiter):
                 )
             )
 
-        return timestamp, grants
+            if now is not None:
+                window_key = self._get_local_window_key(request, timestamp)
+                with self._lock:
+                    previous_window = self._local_windows.get(window_key)
+                    window = self._local_windows[window_key] = _LocalWindow(
+                        synced_at=now, expires_at=now + request.quota.window_seconds
+                    )
+                    if previous_window is not None:
+                        window.seen = previous_window.seen
+                    window.seen.update(
+                        hash
+                        for hash in request.unit_hashes
+                        if unit_keys[self._get_timeseries_key(request, hash)]
+                    )
+                    window.count = cardinality_sample_factor * set_count
+
+        return grants
 
     def use_quotas(
         self,
@@ -380,6 +523,72 @@ class RedisCardinalityLimiter(CardinalityLimiter):
             # enforce), we can save the redis call entirely.
             return
 
+        if self.local_sync_interval is None:
+            self.backend.run_use_quotas(unit_keys_to_set, set_keys_to_add, set_keys_ttl)
+            return
+
+        with self._lock:
+            for grant in grants:
+                window = self._local_windows.get(
+                    self._get_local_window_key(grant.request, timestamp)
+                )
+                if window is not None:
+                    new_hashes = set(grant.granted_unit_hashes) - window.seen
+                    window.seen.update(new_hashes)
+                    window.count += len(new_hashes)
+
+            self._ensure_flusher()
+            self._pending_unit_keys.update(unit_keys_to_set)
+            for key, hashes in set_keys_to_add.items():
+                self._pending_set_keys[key].update(hashes)
+            self._pending_set_keys_ttl.update(set_keys_ttl)
+
+        now = time.time()
+        if now - self._flushed_at >= self.local_sync_interval:
+            self._flush_local_writes(now)
+
+    def close(self) -> None:
+        """
+        Send all pending writes to Redis, see `local_sync_interval`.
+        """
+        self._flush_local_writes(time.time())
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None:
+            # Indexer consumers run the limiter in multiprocessing workers,
+            # register the close in every process that has pending writes.
+            register_shutdown(self.close)
+            self._flusher = threading.Thread(
+                target=self._run_flusher, name="cardinality-limiter-flush", daemon=True
+            )
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while self.local_sync_interval is not None:
+            time.sleep(self.local_sync_interval)
+            try:
+                self._flush_local_writes(time.time())
+            except Exception:
+                logger.exception("ratelimits.cardinality.flush_failed")
+
+    def _flush_local_writes(self, now: float) -> None:
+        with self._lock:
+            self._flushed_at = now
+
+            for window_key, window in list(self._local_windows.items()):
+                if window.expires_at <= now:
+                    del self._local_windows[window_key]
+
+            if not self._pending_unit_keys and not self._pending_set_keys:
+                return
+
+            unit_keys_to_set = self._pending_unit_keys
+            set_keys_to_add = self._pending_set_keys
+            set_keys_ttl = self._pending_set_keys_ttl
+            self._pending_unit_keys = {}
+            self._pending_set_keys = defaultdict(set)
+            self._pending_set_keys_ttl = {}
+
         self.backend.run_use_quotas(unit_keys_to_set, set_keys_to_add, set_keys_ttl)
 
 
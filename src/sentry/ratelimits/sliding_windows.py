@@ -9,7 +9,9 @@ the window gradually resets in steps of `granularity` seconds.
 Additionally this rate-limiter is not coupled to per-project/organization
 scopes, and can apply multiple sliding windows at once. On the flipside it is
 not strongly consistent and depending on usage it is very easy to over-spend
-quota, as checking quota and spending quota are two separate steps.
+quota, as checking quota and spending quota are two separate steps. The
+`atomic` option of the Redis backend makes `check_and_use_quotas` a single
+step per prefix.
 
 Example
 =======
@@ -78,12 +80,14 @@ When using the quotas, the keys change as follows:
 from collections import defaultdict
 from dataclasses import dataclass
 from time import time
-from typing import Any, Iterator, MutableMapping, Optional, Sequence, Tuple
+from typing import Any, Iterator, List, MutableMapping, Optional, Sequence, Tuple
 
 from sentry.exceptions import InvalidConfiguration
 from sentry.utils import redis
 from sentry.utils.services import Service
 
+sliding_windows_script = redis.load_script("ratelimits/sliding_windows.lua")
+
 
 @dataclass(frozen=True)
 class Quota:
@@ -275,8 +279,17 @@ class SlidingWindowRateLimiter(Service):
 
 class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
     def __init__(self, **options: Any) -> None:
+        """
+        :param cluster: The Redis cluster to use.
+        :param atomic: Check and use quotas in a single Lua script call per
+            prefix in `check_and_use_quotas`, so that concurrent requests can
+            not over-spend quota. Keys of a prefix are put in the same Redis
+            Cluster hash slot for this, so toggling this option starts all
+            quotas from 0.
+        """
         cluster_key = options.get("cluster", "default")
         self.client = redis.redis_clusters.get(cluster_key)
+        self.atomic = options.get("atomic", False)
         super().__init__(**options)
 
     def validate(self) -> None:
@@ -297,6 +310,11 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
             # would have to take control of sharding itself.
             raise ValueError("Explicit sharding not allowed in RequestedQuota.prefix")
 
+        if self.atomic:
+            # All keys of a prefix have to be in the same hash slot to be
+            # used by the same script.
+            prefix = f"{{{prefix}}}"
+
         return f"sliding-window-rate-limit:{prefix}:{window}:{granularity}:{granule}"
 
     def _build_redis_key(self, request: RequestedQuota, quota: Quota, granule: int) -> str:
@@ -428,3 +446,104 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
                 pipeline.expire(key, keys_ttl[key])
 
             pipeline.execute()
+
+    def check_and_use_quotas(
+        self, requests: Sequence[RequestedQuota], timestamp: Optional[Timestamp] = None
+    ) -> Sequence[GrantedQuota]:
+        if not self.atomic:
+            return super().check_and_use_quotas(requests, timestamp)
+
+        if timestamp is None:
+            timestamp = int(time())
+        else:
+            timestamp = int(timestamp)
+
+        # Quotas of different prefixes are on different Redis nodes, so each
+        # request is checked against one of its prefixes after the other,
+        # requesting only what was granted for the previous one. Every stage
+        # makes one script call per prefix for all requests.
+        stages = []
+        for request in requests:
+            assert request.quotas
+
+            quotas_by_prefix: MutableMapping[str, List[int]] = {}
+            for idx, quota in enumerate(request.quotas):
+                quotas_by_prefix.setdefault(quota.prefix_override or request.prefix, []).append(idx)
+            stages.append(list(quotas_by_prefix.items()))
+
+        granted = [request.requested for request in requests]
+        reached = [[False] * len(request.quotas) for request in requests]
+        # (request index, quota indices, amount used)
+        used: List[Tuple[int, List[int], int]] = []
+
+        for stage in range(max((len(request_stages) for request_stages in stages), default=0)):
+            # prefix -> [(request index, quota indices)]
+            calls: MutableMapping[str, List[Tuple[int, List[int]]]] = defaultdict(list)
+            for request_idx, request_stages in enumerate(stages):
+                if stage < len(request_stages):
+                    prefix, quota_indices = request_stages[stage]
+                    calls[prefix].append((request_idx, quota_indices))
+
+            for entries in calls.values():
+                results = self._run_check_and_use(
+                    [
+                        (requests[idx], granted[idx], [requests[idx].quotas[q] for q in quotas])
+                        for idx, quotas in entries
+                    ],
+                    timestamp,
+                )
+                for (request_idx, quota_indices), result in zip(entries, results):
+                    granted[request_idx] = int(result[0])
+                    for quota_idx, quota_reached in zip(quota_indices, result[1:]):
+                        if int(quota_reached):
+                            reached[request_idx][quota_idx] = True
+                    used.append((request_idx, quota_indices, granted[request_idx]))
+
+        # Give back what was used for earlier prefixes if a later one granted
+        # less.
+        refunds: MutableMapping[str, int] = defaultdict(int)
+        for request_idx, quota_indices, amount in used:
+            if amount > granted[request_idx]:
+                request = requests[request_idx]
+                for quota_idx in quota_indices:
+                    quota = request.quotas[quota_idx]
+                    granule = next(quota.iter_window(timestamp))
+                    key = self._build_redis_key(request=request, quota=quota, granule=granule)
+                    refunds[key] += amount - granted[request_idx]
+
+        for key, amount in refunds.items():
+            self.client.decrby(key, amount)
+
+        return [
+            GrantedQuota(
+                prefix=request.prefix,
+                granted=granted[request_idx],
+                reached_quotas=[
+                    quota
+                    for quota, quota_reached in zip(request.quotas, reached[request_idx])
+                    if quota_reached
+                ],
+            )
+            for request_idx, request in enumerate(requests)
+        ]
+
+    def _run_check_and_use(
+        self,
+        entries: Sequence[Tuple[RequestedQuota, int, Sequence[Quota]]],
+        timestamp: Timestamp,
+    ) -> Sequence[Sequence[int]]:
+        # key -> index into KEYS (1-based, as in Lua)
+        keys: MutableMapping[str, int] = {}
+        args: List[int] = [len(entries)]
+
+        for request, requested, quotas in entries:
+            args.extend((requested, len(quotas)))
+            for quota in quotas:
+                granules = [
+                    self._build_redis_key(request=request, quota=quota, granule=granule)
+                    for granule in quota.iter_window(timestamp)
+                ]
+                args.extend((quota.limit, quota.window_seconds, len(granules)))
+                args.extend(keys.setdefault(key, len(keys) + 1) for key in granules)
+
+        return sliding_windows_script(self.client, list(keys), args)
@@ -1,16 +1,20 @@
 import logging
 import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone
 from typing import (
     Any,
     Callable,
     Dict,
+    Generator,
     List,
     Literal,
     Mapping,
     MutableMapping,
     Optional,
     Sequence,
+    Tuple,
     TypedDict,
     Union,
 )
@@ -33,7 +37,7 @@ from sentry.ingest.inbound_filters import (
 )
 from sentry.ingest.transaction_clusterer.rules import get_sorted_rules
 from sentry.interfaces.security import DEFAULT_DISALLOWED_SOURCES
-from sentry.models import Project, ProjectKey
+from sentry.models import Organization, Project, ProjectKey
 from sentry.relay.config.metric_extraction import get_metric_conditional_tagging_rules
 from sentry.relay.utils import to_camel_case_name
 from sentry.utils import metrics
@@ -55,13 +59,52 @@ EXTRACT_ABNORMAL_MECHANISM_VERSION = 2
 
 logger = logging.getLogger(__name__)
 
+# Organization-level results shared between the configs computed within
+# `share_organization_results`, or None outside of it.
+_organization_results: ContextVar[Optional[Dict[Tuple[Any, ...], Any]]] = ContextVar(
+    "relay_config_organization_results", default=None
+)
+
+
+@contextmanager
+def share_organization_results() -> Generator[None, None, None]:
+    """
+    Computes organization-level parts of project configs (feature flags and
+    event retention) only once per organization for all configs built in
+    this context. Use it when building the configs of many projects at once,
+    e.g. when an organization is invalidated.
+    """
+    token = _organization_results.set({})
+    try:
+        yield
+    finally:
+        _organization_results.reset(token)
+
+
+def _get_organization_result(organization: Organization, name: str, func: Callable[[], Any]) -> Any:
+    results = _organization_results.get()
+    if results is None:
+        return func()
+
+    key = (organization.id, name)
+    if key not in results:
+        results[key] = func()
+    return results[key]
+
+
+def _has_organization_feature(feature: str, organization: Organization) -> bool:
+    has_feature: bool = _get_organization_result(
+        organization, feature, lambda: features.has(feature, organization)
+    )
+    return has_feature
+
 
 def get_exposed_features(project: Project) -> Sequence[str]:
 
     active_features = []
     for feature in EXPOSABLE_FEATURES:
         if feature.startswith("organizations:"):
-            has_feature = features.has(feature, project.organization)
+            has_feature = _has_organization_feature(feature, project.organization)
         elif feature.startswith("projects:"):
             has_feature = features.has(feature, project)
         else:
@@ -159,8 +202,8 @@ def get_project_config(
 
 
 def get_dynamic_sampling_config(project: Project) -> Optional[Mapping[str, Any]]:
-    if features.has("organizations:dynamic-sampling", project.organization) and options.get(
-        "dynamic-sampling:enabled-biases"
+    if options.get("dynamic-sampling:enabled-biases") and _has_organization_feature(
+        "organizations:dynamic-sampling", project.organization
     ):
         # For compatibility reasons we want to return an empty list of old rules. This has been done in order to make
         # old Relays use empty configs which will result in them forwarding sampling decisions to upstream Relays.
@@ -186,7 +229,9 @@ class TransactionNameRule(TypedDict):
 
 
 def get_transaction_names_config(project: Project) -> Optional[Sequence[TransactionNameRule]]:
-    if not features.has("organizations:transaction-name-normalize", project.organization):
+    if not _has_organization_feature(
+        "organizations:transaction-name-normalize", project.organization
+    ):
         return None
 
     cluster_rules = get_sorted_rules(project)
@@ -308,12 +353,12 @@ def _get_project_config(
             config, "metricConditionalTagging", get_metric_conditional_tagging_rules, project
         )
 
-    if features.has("organizations:metrics-extraction", project.organization):
+    if _has_organization_feature("organizations:metrics-extraction", project.organization):
         config["sessionMetrics"] = {
             "version": EXTRACT_ABNORMAL_MECHANISM_VERSION
             if _should_extract_abnormal_mechanism(project)
             else EXTRACT_METRICS_VERSION,
-            "drop": features.has(
+            "drop": _has_organization_feature(
                 "organizations:release-health-drop-sessions", project.organization
             ),
         }
@@ -324,7 +369,11 @@ def _get_project_config(
     with Hub.current.start_span(op="get_grouping_config_dict_for_project"):
         config["groupingConfig"] = get_grouping_config_dict_for_project(project)
     with Hub.current.start_span(op="get_event_retention"):
-        config["eventRetention"] = quotas.get_event_retention(project.organization)
+        config["eventRetention"] = _get_organization_result(
+            project.organization,
+            "event_retention",
+            lambda: quotas.get_event_retention(project.organization),
+        )
     with Hub.current.start_span(op="get_all_quotas"):
         config["quotas"] = get_quotas(project, keys=project_keys)
 
@@ -542,7 +591,7 @@ class TransactionMetricsSettings(TypedDict):
 
 
 def _should_extract_transaction_metrics(project: Project) -> bool:
-    return features.has(
+    return _has_organization_feature(
         "organizations:transaction-metrics-extraction", project.organization
     ) and not killswitches.killswitch_matches_context(
         "relay.drop-transaction-metrics", {"project_id": project.id}
@@ -2,7 +2,14 @@ from sentry.utils.services import Service
 
 
 class ProjectConfigCache(Service):
-    __all__ = ("set_many", "delete_many", "get")
+    __all__ = (
+        "set_many",
+        "delete_many",
+        "get",
+        "exists_many",
+        "get_revision",
+        "get_changed_since",
+    )
 
     def __init__(self, **options):
         pass
@@ -15,3 +22,26 @@ class ProjectConfigCache(Service):
 
     def get(self, public_key):
         raise NotImplementedError()
+
+    def exists_many(self, public_keys):
+        """
+        Returns the set of `public_keys` that have a config in the cache.
+        """
+        return {public_key for public_key in public_keys if self.get(public_key) is not None}
+
+    def get_revision(self):
+        """
+        Returns the current revision of the cache, which increases whenever a
+        config changes, or `None` if the backend does not track changes.
+        """
+        return None
+
+    def get_changed_since(self, revision):
+        """
+        Returns a tuple of the current revision and the public keys whose
+        configs changed (were set to a different value or deleted) after
+        `revision`, or `None` if that can not be answered because the backend
+        does not track changes or `revision` is too old. Callers should then
+        fetch all their keys again and continue from `get_revision()`.
+        """
+        return None
@@ -4,15 +4,37 @@ import zstandard
 
 from sentry.relay.projectconfig_cache.base import ProjectConfigCache
 from sentry.utils import json, metrics, redis
-from sentry.utils.redis import validate_dynamic_cluster
+from sentry.utils.lru import LRUCache
+from sentry.utils.redis import load_script, validate_dynamic_cluster
 
 REDIS_CACHE_TIMEOUT = 3600  # 1 hr
 COMPRESSION_LEVEL = 3  # 3 is the default level of compression
 
+# Keys of the change log, all in the same slot. See `record_changes.lua`.
+REVISION_KEY = "relayconfig-changes:{revision}"
+CHANGES_KEY = "relayconfig-changes:{revision}:keys"
+TRIMMED_KEY = "relayconfig-changes:{revision}:trimmed"
+
+record_changes = load_script("relay/record_changes.lua")
+
 logger = logging.getLogger(__name__)
 
 
 class RedisProjectConfigCache(ProjectConfigCache):
+    """
+    Stores project configs as zstd compressed JSON.
+
+    Options besides the clusters:
+
+    - ``local_cache_size``: size in bytes of a per-process cache of decoded
+      configs (disabled if 0). A config is still read from Redis on every
+      `get`, but only decompressed and parsed if it differs from the one
+      cached. Configs returned from it are shared and must not be mutated.
+    - ``changes_retained``: number of changed public keys to remember for
+      `get_changed_since` (disabled if 0). With it, `set_many` only rewrites
+      configs that changed, and refreshes the expiry of the others.
+    """
+
     def __init__(self, **options):
         cluster_key = options.get("cluster", "default")
         self.cluster = redis.redis_clusters.get(cluster_key)
@@ -20,6 +42,10 @@ class RedisProjectConfigCache(ProjectConfigCache):
         read_cluster_key = options.get("read_cluster", cluster_key)
         self.cluster_read = redis.redis_clusters.get(read_cluster_key)
 
+        local_cache_size = options.get("local_cache_size", 0)
+        self.local_cache = LRUCache(max_weight=local_cache_size) if local_cache_size else None
+        self.changes_retained = options.get("changes_retained", 0)
+
         super().__init__(**options)
 
     def validate(self):
@@ -31,19 +57,55 @@ class RedisProjectConfigCache(ProjectConfigCache):
     def set_many(self, configs):
         metrics.incr("relay.projectconfig_cache.write", amount=len(configs), tags={"action": "set"})
 
-        # Note: Those are multiple pipelines, one per cluster node
-        p = self.cluster.pipeline()
+        compressed_configs = {}
         for public_key, config in configs.items():
             serialized = json.dumps(config).encode()
             compressed = zstandard.compress(serialized, level=COMPRESSION_LEVEL)
             metrics.timing("relay.projectconfig_cache.uncompressed_size", len(serialized))
             metrics.timing("relay.projectconfig_cache.size", len(compressed))
+            compressed_configs[public_key] = compressed
 
-            p.setex(self.__get_redis_key(public_key), REDIS_CACHE_TIMEOUT, compressed)
+        changed = compressed_configs.keys()
+        if self.changes_retained:
+            changed = self.__get_changed(compressed_configs)
+
+        # Note: Those are multiple pipelines, one per cluster node
+        p = self.cluster.pipeline()
+        for public_key, compressed in compressed_configs.items():
+            if public_key in changed:
+                p.setex(self.__get_redis_key(public_key), REDIS_CACHE_TIMEOUT, compressed)
+            else:
+                p.expire(self.__get_redis_key(public_key), REDIS_CACHE_TIMEOUT)
 
         p.execute()
 
+        if self.changes_retained and changed:
+            self.__record_changes(changed)
+
+    def __get_changed(self, compressed_configs):
+        with self.cluster.pipeline() as p:
+            for public_key in compressed_configs:
+                p.get(self.__get_redis_key(public_key))
+            current = p.execute()
+
+        changed = set()
+        for (public_key, compressed), value in zip(compressed_configs.items(), current):
+            if isinstance(value, str):
+                value = value.encode()
+            if value != compressed:
+                changed.add(public_key)
+        return changed
+
+    def __record_changes(self, public_keys):
+        record_changes(
+            self.cluster,
+            [REVISION_KEY, CHANGES_KEY, TRIMMED_KEY],
+            [self.changes_retained, *public_keys],
+        )
+
     def delete_many(self, public_keys):
+        public_keys = list(public_keys)
+
         # Note: Those are multiple pipelines, one per cluster node
         with self.cluster.pipeline() as p:
             for public_key in public_keys:
@@ -54,13 +116,62 @@ class RedisProjectConfigCache(ProjectConfigCache):
             "relay.projectconfig_cache.write", amount=sum(return_values), tags={"action": "delete"}
         )
 
+        if self.changes_retained:
+            deleted = [key for key, deleted in zip(public_keys, return_values) if deleted]
+            if deleted:
+                self.__record_changes(deleted)
+
     def get(self, public_key):
         rv = self.cluster_read.get(self.__get_redis_key(public_key))
-        if rv is not None:
-            try:
-                rv = zstandard.decompress(rv).decode()
-            except (TypeError, zstandard.ZstdError):
-                # assume raw json
-                pass
-            return json.loads(rv)
-        return None
+        if rv is None:
+            return None
+
+        if self.local_cache is not None:
+            cached = self.local_cache.get(public_key)
+            if cached is not None and cached[0] == rv:
+                return cached[1]
+
+        raw = rv
+        try:
+            rv = zstandard.decompress(rv).decode()
+        except (TypeError, zstandard.ZstdError):
+            # assume raw json
+            pass
+        config = json.loads(rv)
+
+        if self.local_cache is not None:
+            self.local_cache.set(public_key, (raw, config), weight=len(raw))
+
+        return config
+
+    def exists_many(self, public_keys):
+        public_keys = list(public_keys)
+
+        # Note: Those are multiple pipelines, one per cluster node
+        with self.cluster_read.pipeline() as p:
+            for public_key in public_keys:
+                p.exists(self.__get_redis_key(public_key))
+            return_values = p.execute()
+
+        return {public_key for public_key, exists in zip(public_keys, return_values) if exists}
+
+    def get_revision(self):
+        if not self.changes_retained:
+            return None
+
+        return int(self.cluster_read.get(REVISION_KEY) or 0)
+
+    def get_changed_since(self, revision):
+        if not self.changes_retained:
+            return None
+
+        with self.cluster_read.pipeline() as p:
+            p.get(REVISION_KEY)
+            p.get(TRIMMED_KEY)
+            p.zrangebyscore(CHANGES_KEY, f"({revision}", "+inf")
+            current, trimmed, changed = p.execute()
+
+        if trimmed is not None and revision < int(float(trimmed)):
+            return None
+
+        return int(current or 0), changed
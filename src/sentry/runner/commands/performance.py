@@ -71,3 +71,79 @@ def detect(filename, detector_class, verbose):
                     click.echo(problem)
 
             click.echo("\n")
+
+
+@performance.command()
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option(
+    "-n", "--iterations", default=10, show_default=True, help="How often to run the corpus."
+)
+@click.option(
+    "-a", "--allocations", is_flag=True, help="Also measure peak memory allocated (slower)."
+)
+@click.option("-o", "--output", type=click.Path(), help="Write results as JSON to this file.")
+@click.option(
+    "-c",
+    "--compare",
+    type=click.Path(exists=True),
+    help="Compare against results previously written with --output.",
+)
+@configuration
+def bench(paths, iterations, allocations, output, compare):
+    """
+    Benchmarks performance problem detection on a corpus of transactions,
+    using default detector settings with every detector. Paths are JSON event
+    data files, or directories containing them.
+
+    Reports per detector latency per transaction (p50/p99), and how many
+    problems were found per run over the corpus. To compare two revisions,
+    run with --output on one and with --compare on the other.
+    """
+    import os
+
+    from sentry.utils.performance_issues.benchmark import benchmark_detectors, compare_results
+
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                filenames.extend(
+                    os.path.join(root, name) for name in sorted(files) if name.endswith(".json")
+                )
+        else:
+            filenames.append(path)
+
+    events = []
+    for filename in filenames:
+        with open(filename) as file:
+            events.append(json.loads(file.read()))
+
+    click.echo(
+        f"Running {len(events)} {pluralize(len(events), 'transaction,transactions')} "
+        f"{iterations} {pluralize(iterations, 'time,times')}"
+    )
+    results = benchmark_detectors(events, iterations=iterations, allocations=allocations)
+
+    changes = None
+    if compare:
+        with open(compare) as file:
+            changes = compare_results(json.loads(file.read()), results)
+
+    metrics = ["p50_ms", "p99_ms", "problems"]
+    if allocations:
+        metrics.append("peak_alloc_kb")
+
+    click.echo("{:<36}".format("detector") + "".join(f"{m:>24}" for m in metrics))
+    for name, values in results.items():
+        line = f"{name:<36}"
+        for metric in metrics:
+            cell = f"{values.get(metric, 0):.2f}"
+            if changes is not None:
+                change = changes[name].get(metric)
+                cell += f" ({change:+.1f}%)" if change is not None else " (n/a)"
+            line += f"{cell:>24}"
+        click.echo(line)
+
+    if output:
+        with open(output, "w") as file:
+            file.write(json.dumps(results))
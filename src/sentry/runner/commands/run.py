@@ -557,6 +557,12 @@ def batching_kafka_options(
     default=None,
     help="Thread pool size (only utilitized for message types that support concurrent processing)",
 )
+@click.option(
+    "--decode-processes",
+    type=int,
+    default=None,
+    help="Decode messages and event payloads in a pool of this many processes.",
+)
 @configuration
 def ingest_consumer(consumer_types, all_consumer_types, **options):
     """
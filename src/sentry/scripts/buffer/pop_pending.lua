@@ -0,0 +1,14 @@
+-- Atomically remove and return up to `count` of the oldest members of a
+-- pending buffer sorted set.
+assert(#KEYS == 1, "provide exactly one pending key")
+assert(#ARGV == 1, "provide a count")
+
+local key = KEYS[1]
+local count = tonumber(ARGV[1])
+
+local members = redis.call("ZRANGE", key, 0, count - 1)
+if #members > 0 then
+    redis.call("ZREMRANGEBYRANK", key, 0, #members - 1)
+end
+
+return members
@@ -0,0 +1,76 @@
+-- Atomically check and use sliding window quotas, see
+-- `RedisSlidingWindowRateLimiter.check_and_use_quotas`.
+--
+-- All keys belong to quotas of the same prefix, and are thus on the same
+-- Redis node.
+--
+-- Input:
+-- keys:
+--  the counters of all granules of all quotas
+-- args:
+--  number of requests, followed by each request:
+--    requested amount, number of quotas, followed by each quota:
+--      limit, ttl seconds, number of granules, followed by the index (into
+--      KEYS) of each granule, starting with the current one
+--
+-- Output:
+-- for each request: {granted, reached_1, ..., reached_n} where reached_i is 1
+-- if the i-th quota of the request was reached and 0 otherwise.
+local counters = {}
+
+local function get_counter(idx)
+    local value = counters[idx]
+    if value == nil then
+        value = tonumber(redis.call("GET", KEYS[idx]) or 0)
+        counters[idx] = value
+    end
+    return value
+end
+
+local results = {}
+local pos = 2
+
+for request = 1, tonumber(ARGV[1]) do
+    local granted = tonumber(ARGV[pos])
+    local num_quotas = tonumber(ARGV[pos + 1])
+    pos = pos + 2
+
+    local result = {0}
+    local current_keys = {}
+    local ttls = {}
+
+    for quota = 1, num_quotas do
+        local limit = tonumber(ARGV[pos])
+        ttls[quota] = ARGV[pos + 1]
+        local num_granules = tonumber(ARGV[pos + 2])
+        pos = pos + 3
+
+        current_keys[quota] = tonumber(ARGV[pos])
+        local used = 0
+        for _ = 1, num_granules do
+            used = used + get_counter(tonumber(ARGV[pos]))
+            pos = pos + 1
+        end
+
+        local remaining = math.max(0, limit - used)
+        if remaining < granted then
+            granted = remaining
+            result[quota + 1] = 1
+        else
+            result[quota + 1] = 0
+        end
+    end
+
+    if granted > 0 then
+        for quota = 1, num_quotas do
+            local idx = current_keys[quota]
+            counters[idx] = redis.call("INCRBY", KEYS[idx], granted)
+            redis.call("EXPIRE", KEYS[idx], ttls[quota])
+        end
+    end
+
+    result[1] = granted
+    results[request] = result
+end
+
+return results
@@ -0,0 +1,23 @@
+-- Record that project configs changed, see
+-- `RedisProjectConfigCache.get_changed_since`.
+--
+-- KEYS: the revision counter, the sorted set of changed public keys scored by
+-- the revision they last changed in, and the revision up to which changes
+-- have been trimmed from that set.
+-- ARGV: the number of changes to keep, followed by the changed public keys.
+--
+-- Returns the new revision.
+local revision = redis.call("INCR", KEYS[1])
+
+for i = 2, #ARGV do
+    redis.call("ZADD", KEYS[2], revision, ARGV[i])
+end
+
+local excess = redis.call("ZCARD", KEYS[2]) - tonumber(ARGV[1])
+if excess > 0 then
+    local last_trimmed = redis.call("ZRANGE", KEYS[2], excess - 1, excess - 1, "WITHSCORES")
+    redis.call("SET", KEYS[3], last_trimmed[2])
+    redis.call("ZREMRANGEBYRANK", KEYS[2], 0, excess - 1)
+end
+
+return revision
@@ -0,0 +1,18 @@
+-- Apply counter increments to many hashes in one call.
+--
+-- KEYS: the hashes to increment.
+-- ARGV: for every key, in the same order: the timestamp it expires at, the
+-- number of fields to increment, and that many field, amount pairs.
+local argv_index = 1
+for _, key in ipairs(KEYS) do
+    local expiry = ARGV[argv_index]
+    local fields = tonumber(ARGV[argv_index + 1])
+    argv_index = argv_index + 2
+
+    for _ = 1, fields do
+        redis.call("HINCRBY", key, ARGV[argv_index], ARGV[argv_index + 1])
+        argv_index = argv_index + 2
+    end
+
+    redis.call("EXPIREAT", key, expiry)
+end
@@ -1,8 +1,10 @@
 import logging
 import random
+from array import array
 from collections import defaultdict
 from typing import (
     Any,
+    Dict,
     List,
     Mapping,
     MutableMapping,
@@ -65,6 +67,17 @@ def invalid_metric_tags(tags: Mapping[str, str]) -> Sequence[str]:
     return invalid_strs
 
 
+class EncodedMessage(NamedTuple):
+    """
+    The strings of a message in the string table of its batch: the metric
+    name, and the keys and values of its tags as alternating entries.
+    """
+
+    org_id: int
+    name: int
+    tags: "array[int]"
+
+
 class InboundMessage(TypedDict):
     # Note: This is only the subset of fields we access in this file.
     org_id: int
@@ -93,6 +106,13 @@ class IndexerBatch:
         self.skipped_offsets: Set[PartitionIdxOffset] = set()
         self.parsed_payloads_by_offset: MutableMapping[PartitionIdxOffset, InboundMessage] = {}
 
+        # Every distinct string of the batch is stored once, messages and orgs
+        # refer to them by their index in `strings`. See `extract_strings`.
+        self.strings: List[str] = []
+        self.__string_idxs: Dict[str, int] = {}
+        self.encoded_messages: MutableMapping[PartitionIdxOffset, EncodedMessage] = {}
+        self.__org_string_idxs: MutableMapping[int, Set[int]] = defaultdict(set)
+
         for msg in self.outer_message.payload:
             assert isinstance(msg.value, BrokerValue)
             partition_offset = PartitionIdxOffset(msg.value.partition.index, msg.value.offset)
@@ -108,6 +128,13 @@ class IndexerBatch:
                 )
                 continue
 
+    def __intern(self, string: str) -> int:
+        idx = self.__string_idxs.get(string)
+        if idx is None:
+            idx = self.__string_idxs[string] = len(self.strings)
+            self.strings.append(string)
+        return idx
+
     @metrics.wraps("process_messages.filter_messages")
     def filter_messages(self, keys_to_remove: Sequence[PartitionIdxOffset]) -> None:
         metrics.incr(
@@ -135,7 +162,12 @@ class IndexerBatch:
 
     @metrics.wraps("process_messages.extract_strings")
     def extract_strings(self) -> Mapping[int, Set[str]]:
-        org_strings = defaultdict(set)
+        """
+        Validates the messages of the batch, and returns the strings to index
+        per org. Valid messages are encoded into the batch's string table
+        (see `EncodedMessage`) for `reconstruct_messages`.
+        """
+        org_string_idxs: MutableMapping[int, Set[int]] = defaultdict(set)
 
         for partition_offset, message in self.parsed_payloads_by_offset.items():
             if partition_offset in self.skipped_offsets:
@@ -187,15 +219,28 @@ class IndexerBatch:
                 self.skipped_offsets.add(partition_offset)
                 continue
 
-            parsed_strings = {
-                metric_name,
-                *tags.keys(),
-            }
-
-            if self.__should_index_tag_values:
-                parsed_strings.update(tags.values())
-
-            org_strings[org_id].update(parsed_strings)
+            intern = self.__intern
+            name_idx = intern(metric_name)
+            tag_idxs = array("L")
+            for k, v in tags.items():
+                tag_idxs.append(intern(k))
+                tag_idxs.append(intern(v))
+            self.encoded_messages[partition_offset] = EncodedMessage(org_id, name_idx, tag_idxs)
+
+            idxs = org_string_idxs[org_id]
+            idxs.add(name_idx)
+            idxs.update(tag_idxs if self.__should_index_tag_values else tag_idxs[::2])
+
+            # Tag values are looked up in the fetch metadata even if they are
+            # not indexed.
+            all_idxs = self.__org_string_idxs[org_id]
+            all_idxs.add(name_idx)
+            all_idxs.update(tag_idxs)
+
+        strings = self.strings
+        org_strings = {
+            org_id: {strings[idx] for idx in idxs} for org_id, idxs in org_string_idxs.items()
+        }
 
         string_count = 0
         for org_set in org_strings:
@@ -210,10 +255,29 @@ class IndexerBatch:
         mapping: Mapping[int, Mapping[str, Optional[int]]],
         bulk_record_meta: Mapping[int, Mapping[str, Metadata]],
     ) -> IndexerOutputMessageBatch:
+        """
+        Rewrites the messages of the batch using the indexed ids. Has to be
+        called after `extract_strings`.
+        """
         new_messages: IndexerOutputMessageBatch = []
+        strings = self.strings
+
+        # Per org, the ids and fetch metadata of its strings by index into the
+        # string table, looked up once for all messages of the org.
+        org_ids: MutableMapping[int, Mapping[int, Optional[int]]] = {}
+        org_metadata: MutableMapping[int, Mapping[int, Metadata]] = {}
+        for org_id, idxs in self.__org_string_idxs.items():
+            org_mapping = mapping.get(org_id, {})
+            org_ids[org_id] = {
+                idx: org_mapping[strings[idx]] for idx in idxs if strings[idx] in org_mapping
+            }
+            org_meta = bulk_record_meta.get(org_id, {})
+            org_metadata[org_id] = {
+                idx: org_meta[strings[idx]] for idx in idxs if strings[idx] in org_meta
+            }
 
         for message in self.outer_message.payload:
-            used_tags: Set[str] = set()
+            used_tags: Set[int] = set()
             output_message_meta: Mapping[str, MutableMapping[str, str]] = defaultdict(dict)
             assert isinstance(message.value, BrokerValue)
             partition_offset = PartitionIdxOffset(
@@ -232,23 +296,27 @@ class IndexerBatch:
                 MutableMapping[Any, Any],
                 self.parsed_payloads_by_offset.pop(partition_offset),
             )
+            encoded = self.encoded_messages.pop(partition_offset)
 
-            metric_name = new_payload_value["name"]
-            org_id = new_payload_value["org_id"]
+            org_id = encoded.org_id
             sentry_sdk.set_tag("sentry_metrics.organization_id", org_id)
-            tags = new_payload_value.get("tags", {})
-            used_tags.add(metric_name)
+            ids = org_ids[org_id]
+            metadata_by_idx = org_metadata[org_id]
+            tag_idxs = encoded.tags
+            used_tags.add(encoded.name)
+            used_tags.update(tag_idxs)
 
-            new_tags: MutableMapping[str, int] = {}
+            new_tags: MutableMapping[str, Any] = {}
             exceeded_global_quotas = 0
             exceeded_org_quotas = 0
 
             try:
-                for k, v in tags.items():
-                    used_tags.update({k, v})
-                    new_k = mapping[org_id][k]
+                for i in range(0, len(tag_idxs), 2):
+                    k = tag_idxs[i]
+                    v = tag_idxs[i + 1]
+                    new_k = ids[k]
                     if new_k is None:
-                        metadata = bulk_record_meta[org_id].get(k)
+                        metadata = metadata_by_idx.get(k)
                         if (
                             metadata
                             and metadata.fetch_type_ext
@@ -259,11 +327,11 @@ class IndexerBatch:
                             exceeded_org_quotas += 1
                         continue
 
-                    value_to_write = v
+                    value_to_write: Any = strings[v]
                     if self.__should_index_tag_values:
-                        new_v = mapping[org_id][v]
+                        new_v = ids[v]
                         if new_v is None:
-                            metadata = bulk_record_meta[org_id].get(v)
+                            metadata = metadata_by_idx.get(v)
                             if (
                                 metadata
                                 and metadata.fetch_type_ext
@@ -278,7 +346,11 @@ class IndexerBatch:
 
                     new_tags[str(new_k)] = value_to_write
             except KeyError:
-                logger.error("process_messages.key_error", extra={"tags": tags}, exc_info=True)
+                logger.error(
+                    "process_messages.key_error",
+                    extra={"tags": new_payload_value.get("tags", {})},
+                    exc_info=True,
+                )
                 continue
 
             if exceeded_org_quotas or exceeded_global_quotas:
@@ -303,11 +375,11 @@ class IndexerBatch:
                 continue
 
             fetch_types_encountered = set()
-            for tag in used_tags:
-                if tag in bulk_record_meta[org_id]:
-                    metadata = bulk_record_meta[org_id][tag]
+            for idx in used_tags:
+                metadata = metadata_by_idx.get(idx)
+                if metadata is not None:
                     fetch_types_encountered.add(metadata.fetch_type)
-                    output_message_meta[metadata.fetch_type.value][str(metadata.id)] = tag
+                    output_message_meta[metadata.fetch_type.value][str(metadata.id)] = strings[idx]
 
             mapping_header_content = bytes(
                 "".join(sorted(t.value for t in fetch_types_encountered)), "utf-8"
@@ -319,9 +391,9 @@ class IndexerBatch:
             if not self.__should_index_tag_values:
                 new_payload_value["version"] = 2
             new_payload_value["tags"] = new_tags
-            new_payload_value["metric_id"] = numeric_metric_id = mapping[org_id][metric_name]
+            new_payload_value["metric_id"] = numeric_metric_id = ids[encoded.name]
             if numeric_metric_id is None:
-                metadata = bulk_record_meta[org_id].get(metric_name)
+                metadata = metadata_by_idx.get(encoded.name)
                 metrics.incr(
                     "sentry_metrics.indexer.process_messages.dropped_message",
                     tags={
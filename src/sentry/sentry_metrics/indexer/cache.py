@@ -1,6 +1,7 @@
 import logging
 import random
-from typing import Mapping, MutableMapping, Optional, Sequence, Set
+from functools import lru_cache
+from typing import Any, Mapping, MutableMapping, Optional, Sequence, Set, Tuple
 
 from django.conf import settings
 from django.core.cache import caches
@@ -15,12 +16,31 @@ from sentry.sentry_metrics.indexer.base import (
 )
 from sentry.utils import metrics
 from sentry.utils.hashlib import md5_text
+from sentry.utils.lru import LRUCache
 
 logger = logging.getLogger(__name__)
 
 _INDEXER_CACHE_METRIC = "sentry_metrics.indexer.memcache"
 # only used to compare to the older version of the PGIndexer
 _INDEXER_CACHE_FETCH_METRIC = "sentry_metrics.indexer.memcache.fetch"
+# which tier (local, memcache or none) answered each cache lookup
+_INDEXER_CACHE_TIER_METRIC = "sentry_metrics.indexer.cache.tier"
+
+
+@lru_cache(maxsize=1)
+def get_local_cache() -> Optional[LRUCache[Tuple[Any, ...], Any]]:
+    """
+    The process-wide tier of string -> id and id -> string mappings in front
+    of the memcached cache, holding up to
+    ``SENTRY_METRICS_INDEXER_LOCAL_CACHE_SIZE`` entries (disabled if 0).
+
+    An id is never reassigned once indexed, so entries do not expire.
+    """
+    max_size = settings.SENTRY_METRICS_INDEXER_LOCAL_CACHE_SIZE
+    if not max_size:
+        return None
+
+    return LRUCache(max_weight=max_size)
 
 
 class StringIndexerCache:
@@ -59,13 +79,63 @@ class StringIndexerCache:
 
         return formatted
 
+    def _make_local_key(self, key: str, cache_namespace: str) -> Tuple[Any, ...]:
+        return ("str", self.partition_key, cache_namespace, key)
+
+    def _make_reverse_local_key(
+        self, org_id: int, id: int, cache_namespace: str
+    ) -> Tuple[Any, ...]:
+        return ("id", self.partition_key, cache_namespace, org_id, id)
+
+    def set_local(self, key_values: Mapping[str, int], cache_namespace: str) -> None:
+        """
+        Stores mappings in the local tier only, along with their reverse
+        mappings for `reverse_get`.
+        """
+        local_cache = get_local_cache()
+        if local_cache is None:
+            return
+
+        items: MutableMapping[Tuple[Any, ...], Any] = {}
+        for key, value in key_values.items():
+            items[self._make_local_key(key, cache_namespace)] = value
+            org_id, sep, string = key.partition(":")
+            if sep and org_id.isdigit():
+                items[self._make_reverse_local_key(int(org_id), value, cache_namespace)] = string
+        local_cache.set_many(items)
+
+    def reverse_get(self, org_id: int, id: int, cache_namespace: str) -> Optional[str]:
+        """
+        Looks up the string of an id in the local tier. Only ids that this
+        process has seen are found, memcached does not store reverse mappings.
+        """
+        local_cache = get_local_cache()
+        if local_cache is None:
+            return None
+
+        result: Optional[str] = local_cache.get(
+            self._make_reverse_local_key(org_id, id, cache_namespace)
+        )
+        return result
+
     def get(self, key: str, cache_namespace: str) -> int:
-        result: int = self.cache.get(
-            self.make_cache_key(key, cache_namespace), version=self.version
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            result: int = local_cache.get(self._make_local_key(key, cache_namespace))
+            if result is not None:
+                metrics.incr(_INDEXER_CACHE_TIER_METRIC, tags={"tier": "local"})
+                return result
+
+        result = self.cache.get(self.make_cache_key(key, cache_namespace), version=self.version)
+        if result is not None:
+            self.set_local({key: result}, cache_namespace)
+        metrics.incr(
+            _INDEXER_CACHE_TIER_METRIC, tags={"tier": "memcache" if result is not None else "none"}
         )
         return result
 
     def set(self, key: str, value: int, cache_namespace: str) -> None:
+        self.set_local({key: value}, cache_namespace)
         self.cache.set(
             key=self.make_cache_key(key, cache_namespace),
             value=value,
@@ -76,23 +146,60 @@ class StringIndexerCache:
     def get_many(
         self, keys: Sequence[str], cache_namespace: str
     ) -> MutableMapping[str, Optional[int]]:
-        cache_keys = {self.make_cache_key(key, cache_namespace): key for key in keys}
-        results: Mapping[str, Optional[int]] = self.cache.get_many(
-            cache_keys.keys(), version=self.version
-        )
-        return self._format_results(keys, results, cache_namespace)
+        local_results: MutableMapping[str, Optional[int]] = {}
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            local_keys = {self._make_local_key(key, cache_namespace): key for key in keys}
+            local_results = {
+                local_keys[local_key]: value
+                for local_key, value in local_cache.get_many(local_keys).items()
+            }
+            keys = [key for key in keys if key not in local_results]
+
+        formatted = dict(local_results)
+        if keys:
+            cache_keys = {self.make_cache_key(key, cache_namespace): key for key in keys}
+            results: Mapping[str, Optional[int]] = self.cache.get_many(
+                cache_keys.keys(), version=self.version
+            )
+            formatted.update(self._format_results(keys, results, cache_namespace))
+
+        remote_hits = {
+            key: value
+            for key, value in formatted.items()
+            if value is not None and key not in local_results
+        }
+        self.set_local(remote_hits, cache_namespace)
+
+        for tier, amount in (
+            ("local", len(local_results)),
+            ("memcache", len(remote_hits)),
+            ("none", len(formatted) - len(local_results) - len(remote_hits)),
+        ):
+            metrics.incr(_INDEXER_CACHE_TIER_METRIC, tags={"tier": tier}, amount=amount)
+
+        return formatted
 
     def set_many(self, key_values: Mapping[str, int], cache_namespace: str) -> None:
+        self.set_local(key_values, cache_namespace)
         cache_key_values = {
             self.make_cache_key(k, cache_namespace): v for k, v in key_values.items()
         }
         self.cache.set_many(cache_key_values, timeout=self.randomized_ttl, version=self.version)
 
+    # Deletes only reach the local tier of this process, not of other ones.
+    # Reverse mappings are kept, they stay correct as ids are never reassigned.
     def delete(self, key: str, cache_namespace: str) -> None:
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            local_cache.delete(self._make_local_key(key, cache_namespace))
         cache_key = self.make_cache_key(key, cache_namespace)
         self.cache.delete(cache_key, version=self.version)
 
     def delete_many(self, keys: Sequence[str], cache_namespace: str) -> None:
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            local_cache.delete_many(self._make_local_key(key, cache_namespace) for key in keys)
         cache_keys = [self.make_cache_key(key, cache_namespace) for key in keys]
         self.cache.delete_many(cache_keys, version=self.version)
 
@@ -166,7 +273,15 @@ class CachingIndexer(StringIndexer):
         return id
 
     def reverse_resolve(self, use_case_id: UseCaseKey, org_id: int, id: int) -> Optional[str]:
-        return self.indexer.reverse_resolve(use_case_id, org_id, id)
+        string = self.cache.reverse_get(org_id, id, use_case_id.value)
+        if string is not None:
+            return string
+
+        string = self.indexer.reverse_resolve(use_case_id, org_id, id)
+        if string is not None:
+            self.cache.set_local({f"{org_id}:{string}": id}, use_case_id.value)
+
+        return string
 
     def resolve_shared_org(self, string: str) -> Optional[int]:
         raise NotImplementedError(
@@ -1,14 +1,17 @@
 from functools import reduce
 from operator import or_
 from time import sleep
-from typing import Any, Mapping, Optional, Sequence, Set
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Set, TypeVar
 
 import sentry_sdk
 from django.conf import settings
+from django.db import connections, router
 from django.db.models import Q
+from django.utils import timezone
 from psycopg2 import OperationalError
 from psycopg2.errorcodes import DEADLOCK_DETECTED
 
+from sentry import options
 from sentry.sentry_metrics.configuration import IndexerStorage, UseCaseKey, get_ingest_config
 from sentry.sentry_metrics.indexer.base import (
     FetchType,
@@ -31,6 +34,11 @@ _INDEXER_DB_METRIC = "sentry_metrics.indexer.postgres"
 
 _PARTITION_KEY = "pg"
 
+# Maximum number of rows per INSERT statement, each row takes 5 parameters.
+_INSERT_BATCH_SIZE = 1000
+
+T = TypeVar("T")
+
 indexer_cache = StringIndexerCache(
     **settings.SENTRY_STRING_INDEXER_CACHE_OPTIONS, partition_key=_PARTITION_KEY
 )
@@ -55,10 +63,68 @@ class PGStringIndexerV2(StringIndexer):
     def _bulk_create_with_retry(
         self, table: IndexerTable, new_records: Sequence[BaseIndexer]
     ) -> None:
+        with metrics.timer("sentry_metrics.indexer.pg_bulk_create"):
+            # We use `ignore_conflicts=True` here to avoid race conditions where metric indexer
+            # records might have be created between when we queried in `bulk_record` and the
+            # attempt to create the rows down below.
+            self._retry_on_deadlock(
+                lambda: table.objects.bulk_create(new_records, ignore_conflicts=True)
+            )
+
+    def _insert_returning(self, table: IndexerTable, keys: KeyCollection) -> List[KeyResult]:
+        """
+        Writes the keys with ``INSERT ... ON CONFLICT DO NOTHING RETURNING``,
+        and returns the ids of the rows that were created, in the same round
+        trip. Rows that already existed, e.g. because another consumer wrote
+        them in the meantime, are not returned.
+
+        Rows are inserted in a fixed order so that concurrent inserts of
+        overlapping keys lock them in the same order.
+        """
+        using = router.db_for_write(table)
+        connection = connections[using]
+        qn = connection.ops.quote_name
+        meta = table._meta
+
+        now = timezone.now()
+        fields = [
+            meta.get_field(name)
+            for name in ("organization_id", "string", "date_added", "last_seen", "retention_days")
+        ]
+        columns = ", ".join(qn(field.column) for field in fields)
+        returning = ", ".join(
+            qn(meta.get_field(name).column) for name in ("id", "organization_id", "string")
+        )
+        retention_days = meta.get_field("retention_days").get_default()
+
+        rows = sorted((int(org_id), string) for org_id, string in keys.as_tuples())
+        results = []
+        with connection.cursor() as cursor:
+            for i in range(0, len(rows), _INSERT_BATCH_SIZE):
+                chunk = rows[i : i + _INSERT_BATCH_SIZE]
+                params = []
+                for org_id, string in chunk:
+                    for field, value in zip(fields, (org_id, string, now, now, retention_days)):
+                        params.append(field.get_db_prep_save(value, connection))
+
+                cursor.execute(
+                    f"INSERT INTO {qn(meta.db_table)} ({columns}) "
+                    f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(chunk))} "
+                    f"ON CONFLICT DO NOTHING RETURNING {returning}",
+                    params,
+                )
+                results.extend(
+                    KeyResult(org_id=org_id, string=string, id=id)
+                    for id, org_id, string in cursor.fetchall()
+                )
+
+        return results
+
+    def _retry_on_deadlock(self, func: Callable[[], T]) -> T:
         """
         With multiple instances of the Postgres indexer running, we found that
         rather than direct insert conflicts we were actually observing deadlocks
-        on insert. Here we surround bulk_create with a catch for the deadlock error
+        on insert. Here we surround inserts with a catch for the deadlock error
         specifically so that we don't interrupt processing or raise an error for a
         fairly normal event.
         """
@@ -66,29 +132,24 @@ class PGStringIndexerV2(StringIndexer):
         sleep_ms = 5
         last_seen_exception: Optional[BaseException] = None
 
-        with metrics.timer("sentry_metrics.indexer.pg_bulk_create"):
-            # We use `ignore_conflicts=True` here to avoid race conditions where metric indexer
-            # records might have be created between when we queried in `bulk_record` and the
-            # attempt to create the rows down below.
-            while retry_count + 1 < settings.SENTRY_POSTGRES_INDEXER_RETRY_COUNT:
-                try:
-                    table.objects.bulk_create(new_records, ignore_conflicts=True)
-                    return
-                except OperationalError as e:
-                    sentry_sdk.capture_message(
-                        f"retryable deadlock exception encountered; pgcode={e.pgcode}, pgerror={e.pgerror}"
-                    )
-                    if e.pgcode == DEADLOCK_DETECTED:
-                        metrics.incr("sentry_metrics.indexer.pg_bulk_create.deadlocked")
-                        retry_count += 1
-                        sleep(sleep_ms / 1000 * (2**retry_count))
-                        last_seen_exception = e
-                    else:
-                        raise e
-            # If we haven't returned after successful bulk create, we should re-raise the last
-            # seen exception
-            assert isinstance(last_seen_exception, BaseException)
-            raise last_seen_exception
+        while retry_count + 1 < settings.SENTRY_POSTGRES_INDEXER_RETRY_COUNT:
+            try:
+                return func()
+            except OperationalError as e:
+                sentry_sdk.capture_message(
+                    f"retryable deadlock exception encountered; pgcode={e.pgcode}, pgerror={e.pgerror}"
+                )
+                if e.pgcode == DEADLOCK_DETECTED:
+                    metrics.incr("sentry_metrics.indexer.pg_bulk_create.deadlocked")
+                    retry_count += 1
+                    sleep(sleep_ms / 1000 * (2**retry_count))
+                    last_seen_exception = e
+                else:
+                    raise e
+        # If we haven't returned after a successful insert, we should re-raise the last
+        # seen exception
+        assert isinstance(last_seen_exception, BaseException)
+        raise last_seen_exception
 
     def bulk_record(
         self, use_case_id: UseCaseKey, org_strings: Mapping[int, Set[str]]
@@ -140,24 +201,36 @@ class PGStringIndexerV2(StringIndexer):
             if filtered_db_write_keys.size == 0:
                 return db_read_key_results.merge(rate_limited_key_results)
 
-            new_records = []
-            for write_pair in filtered_db_write_keys.as_tuples():
-                organization_id, string = write_pair
-                new_records.append(
-                    self._table(use_case_id)(organization_id=int(organization_id), string=string)
-                )
+            table = self._table(use_case_id)
+            if options.get("sentry-metrics.indexer.postgres.insert-returning"):
+                with metrics.timer("sentry_metrics.indexer.pg_insert_returning"):
+                    created = self._retry_on_deadlock(
+                        lambda: self._insert_returning(table, filtered_db_write_keys)
+                    )
+            else:
+                new_records = []
+                for write_pair in filtered_db_write_keys.as_tuples():
+                    organization_id, string = write_pair
+                    new_records.append(table(organization_id=int(organization_id), string=string))
 
-            with metrics.timer("sentry_metrics.indexer.pg_bulk_create"):
-                self._bulk_create_with_retry(self._table(use_case_id), new_records)
+                with metrics.timer("sentry_metrics.indexer.pg_bulk_create"):
+                    self._bulk_create_with_retry(table, new_records)
+                created = []
 
         db_write_key_results = KeyResults()
-        db_write_key_results.add_key_results(
-            [
-                KeyResult(org_id=db_obj.organization_id, string=db_obj.string, id=db_obj.id)
-                for db_obj in self._get_db_records(use_case_id, filtered_db_write_keys)
-            ],
-            fetch_type=FetchType.FIRST_SEEN,
-        )
+        db_write_key_results.add_key_results(created, fetch_type=FetchType.FIRST_SEEN)
+
+        # Only rows that we did not get back from the insert have to be read,
+        # with the insert-returning path those were written concurrently.
+        db_reread_keys = db_write_key_results.get_unmapped_keys(filtered_db_write_keys)
+        if db_reread_keys.size:
+            db_write_key_results.add_key_results(
+                [
+                    KeyResult(org_id=db_obj.organization_id, string=db_obj.string, id=db_obj.id)
+                    for db_obj in self._get_db_records(use_case_id, db_reread_keys)
+                ],
+                fetch_type=FetchType.FIRST_SEEN,
+            )
 
         return db_read_key_results.merge(db_write_key_results).merge(rate_limited_key_results)
 
@@ -1,17 +1,24 @@
 import logging
 import math
 import random
+import time
 from collections import namedtuple
 from copy import deepcopy
+from dataclasses import replace
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Sequence
+from hashlib import sha1
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import sentry_sdk
+from django.conf import settings
+from django.core.cache import cache
 from sentry_relay.consts import SPAN_STATUS_CODE_TO_NAME
-from snuba_sdk.conditions import Condition, Op
+from snuba_sdk import Request
+from snuba_sdk.conditions import And, Condition, Op, Or
 from snuba_sdk.function import Function
 from typing_extensions import TypedDict
 
+from sentry import options
 from sentry.discover.arithmetic import categorize_columns
 from sentry.models import Group
 from sentry.search.events.builder import (
@@ -29,7 +36,8 @@ from sentry.search.events.fields import (
 )
 from sentry.search.events.types import HistogramParams, ParamsType
 from sentry.tagstore.base import TOP_VALUES_DEFAULT_LIMIT
-from sentry.utils.dates import to_timestamp
+from sentry.utils import json, metrics
+from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.math import nice_int
 from sentry.utils.snuba import (
     Dataset,
@@ -95,6 +103,17 @@ def is_real_column(col):
     return True
 
 
+def get_bucket_time(row) -> int:
+    # This is needed for SnQL, and was originally done in utils.snuba.get_snuba_translators
+    if isinstance(row["time"], str):
+        # `datetime.fromisoformat` is new in Python3.7 and before Python3.11, it is not a full
+        # ISO 8601 parser. It is only the inverse function of `datetime.isoformat`, which is
+        # the format returned by snuba. This is significantly faster when compared to other
+        # parsers like `dateutil.parser.parse` and `datetime.strptime`.
+        return int(to_timestamp(datetime.fromisoformat(row["time"])))
+    return row["time"]
+
+
 def zerofill(data, start, end, rollup, orderby):
     rv = []
     start = int(to_naive_timestamp(naiveify_datetime(start)) / rollup) * rollup
@@ -102,13 +121,7 @@ def zerofill(data, start, end, rollup, orderby):
     data_by_time = {}
 
     for obj in data:
-        # This is needed for SnQL, and was originally done in utils.snuba.get_snuba_translators
-        if isinstance(obj["time"], str):
-            # `datetime.fromisoformat` is new in Python3.7 and before Python3.11, it is not a full
-            # ISO 8601 parser. It is only the inverse function of `datetime.isoformat`, which is
-            # the format returned by snuba. This is significantly faster when compared to other
-            # parsers like `dateutil.parser.parse` and `datetime.strptime`.
-            obj["time"] = int(to_timestamp(datetime.fromisoformat(obj["time"])))
+        obj["time"] = get_bucket_time(obj)
         if obj["time"] in data_by_time:
             data_by_time[obj["time"]].append(obj)
         else:
@@ -217,6 +230,188 @@ def query(
     return result
 
 
+class CachedTimeseriesQuery:
+    """
+    A timeseries query split into its complete buckets, which are read from
+    and written to the timeseries cache, and the remaining buckets, which are
+    queried from Snuba. Buckets are complete once they are older than
+    `SENTRY_DISCOVER_TIMESERIES_CACHE_DELAY`, except for the first one if
+    the query does not start on a bucket boundary.
+
+    The cache key is the query without its time range, so subsequent queries
+    over a moving time range share an entry, and the `shift` of the range,
+    which tells apart queries that are the same except for a time range
+    shifted for comparison. An entry is extended with new buckets, but expires
+    `SENTRY_DISCOVER_TIMESERIES_CACHE_TTL` seconds after it was created, so
+    that rows rewritten by Snuba replacements are eventually picked up.
+    """
+
+    def __init__(self, builder: TimeseriesQueryBuilder, now: int, shift: int = 0) -> None:
+        self.request: Optional[Request] = builder.get_snql_query()
+        self.key: Optional[str] = None
+        self.cached: Optional[Dict[str, Any]] = None
+        self.now = now
+
+        if builder.start is None or builder.end is None:
+            return
+
+        rollup = builder.granularity.granularity
+        start = int(to_naive_timestamp(naiveify_datetime(builder.start)))
+        end = int(to_naive_timestamp(naiveify_datetime(builder.end)))
+        self.start = -(-start // rollup) * rollup
+        self.end = min(now - settings.SENTRY_DISCOVER_TIMESERIES_CACHE_DELAY, end)
+        self.end -= self.end % rollup
+        if self.start >= self.end:
+            return
+
+        time_conditions = [
+            Condition(builder.column("timestamp"), Op.GTE, builder.start),
+            Condition(builder.column("timestamp"), Op.LT, builder.end),
+        ]
+        query = self.request.query
+        where = [condition for condition in query.where if condition not in time_conditions]
+        hashable = f"{shift}:{replace(self.request, query=query.set_where(where))}"
+        self.key = f"dtc:{sha1(hashable.encode('utf-8')).hexdigest()}"
+
+        cached = cache.get(self.key)
+        if cached is not None:
+            self.cached = json.loads(cached)
+            if now - self.cached["created"] >= settings.SENTRY_DISCOVER_TIMESERIES_CACHE_TTL:
+                self.cached = None
+
+        self.missing = self.get_missing_buckets()
+        # Entries that are extended keep their creation time.
+        self.created = now
+        if self.cached is not None and self.missing != [(self.start, self.end)]:
+            self.created = self.cached["created"]
+        ranges: List[Tuple[Any, Any]] = []
+        for range_start, range_end in [(start, self.start)] + self.missing + [(self.end, end)]:
+            if range_start >= range_end:
+                continue
+            if ranges and ranges[-1][1] == range_start:
+                ranges[-1] = (ranges[-1][0], range_end)
+            else:
+                ranges.append((range_start, range_end))
+
+        if not ranges:
+            self.request = None
+            return
+
+        # The first and last range keep the exact bounds of the original query.
+        bounds = [
+            [to_datetime(range_start), to_datetime(range_end)] for range_start, range_end in ranges
+        ]
+        if ranges[0][0] == start:
+            bounds[0][0] = builder.start
+        if ranges[-1][1] == end:
+            bounds[-1][1] = builder.end
+        range_conditions = [
+            [
+                Condition(builder.column("timestamp"), Op.GTE, range_start),
+                Condition(builder.column("timestamp"), Op.LT, range_end),
+            ]
+            for range_start, range_end in bounds
+        ]
+        if len(range_conditions) == 1:
+            where += range_conditions[0]
+        else:
+            where.append(Or([And(conditions) for conditions in range_conditions]))
+        self.request = replace(self.request, query=query.set_where(where))
+
+    def get_missing_buckets(self) -> List[Tuple[int, int]]:
+        """
+        Returns the ranges of complete buckets that are not cached.
+        """
+        if self.cached is None:
+            return [(self.start, self.end)]
+
+        cached_start = max(self.cached["start"], self.start)
+        cached_end = min(self.cached["end"], self.end)
+        if cached_start >= cached_end:
+            return [(self.start, self.end)]
+
+        return [(self.start, cached_start), (cached_end, self.end)]
+
+    def merge(self, result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merges the result of the query with the cached buckets, and caches the
+        complete buckets that were queried.
+        """
+        if self.key is None:
+            assert result is not None
+            return result
+
+        cached_rows = []
+        if self.cached is not None:
+            cached_rows = [
+                row
+                for row in self.cached["data"]
+                if self.start <= get_bucket_time(row) < self.end
+            ]
+
+        if result is None:
+            assert self.cached is not None
+            metrics.incr("discover.timeseries_cache", tags={"result": "hit"})
+            return {"data": cached_rows, "meta": self.cached["meta"]}
+
+        ttl = self.created + settings.SENTRY_DISCOVER_TIMESERIES_CACHE_TTL - self.now
+        if ttl > 0 and any(
+            missing_start < missing_end for missing_start, missing_end in self.missing
+        ):
+            complete_rows = cached_rows + [
+                row for row in result["data"] if self.start <= get_bucket_time(row) < self.end
+            ]
+            complete_rows.sort(key=get_bucket_time)
+            cache.set(
+                self.key,
+                json.dumps(
+                    {
+                        "created": self.created,
+                        "start": self.start,
+                        "end": self.end,
+                        "data": complete_rows,
+                        "meta": result["meta"],
+                    }
+                ),
+                ttl,
+            )
+
+        metrics.incr(
+            "discover.timeseries_cache",
+            tags={"result": "partial" if cached_rows else "miss"},
+        )
+        result["data"] = sorted(cached_rows + result["data"], key=get_bucket_time)
+        return result
+
+
+def bulk_timeseries_query(
+    builders: Sequence[TimeseriesQueryBuilder],
+    referrer: Optional[str] = None,
+    shifts: Optional[Sequence[timedelta]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Runs the queries of timeseries query builders in bulk. With the
+    `discover.timeseries-cache` option, complete buckets are cached, see
+    `CachedTimeseriesQuery`. `shifts` are the offsets by which the time
+    ranges of the queries were shifted, e.g. for comparison queries.
+    """
+    if not options.get("discover.timeseries-cache"):
+        return bulk_snql_query([builder.get_snql_query() for builder in builders], referrer)
+
+    now = int(time.time())
+    if shifts is None:
+        shifts = [timedelta()] * len(builders)
+    queries = [
+        CachedTimeseriesQuery(builder, now, int(shift.total_seconds()))
+        for builder, shift in zip(builders, shifts)
+    ]
+    requests = [query.request for query in queries if query.request is not None]
+    results = iter(bulk_snql_query(requests, referrer) if requests else [])
+    return [
+        query.merge(next(results) if query.request is not None else None) for query in queries
+    ]
+
+
 def timeseries_query(
     selected_columns: Sequence[str],
     query: str,
@@ -266,6 +461,7 @@ def timeseries_query(
             has_metrics=has_metrics,
         )
         query_list = [base_builder]
+        shifts = [timedelta()]
         if comparison_delta:
             if len(base_builder.aggregates) != 1:
                 raise InvalidSearchQuery("Only one column can be selected for comparison queries")
@@ -281,8 +477,9 @@ def timeseries_query(
                 equations=equations,
             )
             query_list.append(comparison_builder)
+            shifts.append(comparison_delta)
 
-        query_results = bulk_snql_query([query.get_snql_query() for query in query_list], referrer)
+        query_results = bulk_timeseries_query(query_list, referrer, shifts)
 
     with sentry_sdk.start_span(op="discover.discover", description="timeseries.transform_results"):
         results = []
@@ -436,10 +633,12 @@ def top_events_timeseries(
             timeseries_columns=timeseries_columns,
             equations=equations,
         )
-        result, other_result = bulk_snql_query(
-            [top_events_builder.get_snql_query(), other_events_builder.get_snql_query()],
-            referrer=referrer,
+        result, other_result = bulk_timeseries_query(
+            [top_events_builder, other_events_builder], referrer=referrer
         )
+    elif options.get("discover.timeseries-cache"):
+        (result,) = bulk_timeseries_query([top_events_builder], referrer=referrer)
+        other_result = {"data": []}
     else:
         result = top_events_builder.run_query(referrer)
         other_result = {"data": []}
@@ -16,9 +16,15 @@ def process_pending(partition=None):
     """
     Process pending buffers.
     """
-    from sentry import buffer
+    from sentry import buffer, options
     from sentry.locks import locks
 
+    if options.get("buffer.redis.drain-pending"):
+        # Draining pops chunks of the pending set atomically, so any number
+        # of workers can run it at the same time.
+        buffer.process_pending(partition=partition)
+        return
+
     if partition is None:
         lock_key = "buffer:process_pending"
     else:
@@ -122,38 +122,13 @@ def compute_configs(organization_id=None, project_id=None, public_key=None):
         # it could be possible that refrequent invalidations cause the task to take excessive time
         # to complete.
         for organization in Organization.objects.filter(id=organization_id):
-            for project in Project.objects.filter(organization_id=organization_id):
+            projects = list(Project.objects.filter(organization_id=organization_id))
+            for project in projects:
                 project.set_cached_field_value("organization", organization)
-                for key in ProjectKey.objects.filter(project_id=project.id):
-                    key.set_cached_field_value("project", project)
-                    # If we find the config in the cache it means it was active.  As such we want to
-                    # recalculate it.  If the config was not there at all, we leave it and avoid the
-                    # cost of re-computation.
-                    if projectconfig_cache.get(key.public_key) is not None:
-                        configs[key.public_key] = compute_projectkey_config(key)
-                        action = "recompute"
-                    else:
-                        action = "not-cached"
-                    metrics.incr(
-                        "relay.projectconfig_cache.invalidation.recompute",
-                        tags={"action": action, "scope": "organization"},
-                    )
+            configs = _recompute_cached_configs(projects, scope="organization")
     elif project_id:
-        for project in Project.objects.filter(id=project_id):
-            for key in ProjectKey.objects.filter(project_id=project_id):
-                key.set_cached_field_value("project", project)
-                # If we find the config in the cache it means it was active.  As such we want to
-                # recalculate it.  If the config was not there at all, we leave it and avoid the
-                # cost of re-computation.
-                if projectconfig_cache.get(key.public_key) is not None:
-                    configs[key.public_key] = compute_projectkey_config(key)
-                    action = "recompute"
-                else:
-                    action = "not-cached"
-                    metrics.incr(
-                        "relay.projectconfig_cache.invalidation.recompute",
-                        tags={"action": action, "scope": "project"},
-                    )
+        projects = list(Project.objects.filter(id=project_id))
+        configs = _recompute_cached_configs(projects, scope="project")
     elif public_key:
         try:
             key = ProjectKey.objects.get(public_key=public_key)
@@ -176,6 +151,56 @@ def compute_configs(organization_id=None, project_id=None, public_key=None):
     return configs
 
 
+def _recompute_cached_configs(projects, scope):
+    """Computes the configs of all keys of the given projects that are in the cache.
+
+    Keys are loaded with a single query, and their configs computed with
+    :func:`compute_projectkey_configs`.
+    """
+    from sentry.models import ProjectKey
+
+    projects_by_id = {project.id: project for project in projects}
+    if not projects_by_id:
+        return {}
+
+    keys = list(ProjectKey.objects.filter(project_id__in=projects_by_id))
+    cached = projectconfig_cache.exists_many([key.public_key for key in keys]) if keys else set()
+
+    cached_keys = []
+    for key in keys:
+        key.set_cached_field_value("project", projects_by_id[key.project_id])
+        # If we find the config in the cache it means it was active.  As such we want to
+        # recalculate it.  If the config was not there at all, we leave it and avoid the
+        # cost of re-computation.
+        if key.public_key in cached:
+            cached_keys.append(key)
+            action = "recompute"
+        else:
+            action = "not-cached"
+        metrics.incr(
+            "relay.projectconfig_cache.invalidation.recompute",
+            tags={"action": action, "scope": scope},
+        )
+
+    return compute_projectkey_configs(cached_keys)
+
+
+def compute_projectkey_configs(keys):
+    """Computes the configs of many project keys at once.
+
+    The options of all projects are loaded up front, and organization-level
+    parts of the configs are only computed once per organization.
+
+    :returns: A dict mapping the public keys to their configs.
+    """
+    from sentry.models import ProjectOption
+    from sentry.relay.config import share_organization_results
+
+    ProjectOption.objects.prefetch_all_values(list({key.project_id for key in keys}))
+    with share_organization_results():
+        return {key.public_key: compute_projectkey_config(key) for key in keys}
+
+
 def compute_projectkey_config(key):
     """Computes a single config for the given :class:`ProjectKey`.
 
@@ -108,6 +108,7 @@ class BaseTSDB(Service):
     __read_methods__ = frozenset(
         [
             "get_range",
+            "get_range_many",
             "get_sums",
             "get_distinct_counts_series",
             "get_distinct_counts_totals",
@@ -123,6 +124,7 @@ class BaseTSDB(Service):
         [
             "incr",
             "incr_multi",
+            "incr_many",
             "merge",
             "delete",
             "record",
@@ -342,6 +344,20 @@ class BaseTSDB(Service):
                 environment_id=environment_id,
             )
 
+    def incr_many(self, increments, count=1):
+        """
+        Apply many ``incr_multi`` calls at once, e.g. for a batch of events:
+
+        >>> incr_many([
+        ...     ([(TimeSeriesModel.project, 1), (TimeSeriesModel.group, 5)], timestamp, 1),
+        ...     ([(TimeSeriesModel.project, 1)], timestamp, None),
+        ... ])
+
+        `increments` are ``(items, timestamp, environment_id)`` tuples.
+        """
+        for items, timestamp, environment_id in increments:
+            self.incr_multi(items, timestamp, count, environment_id)
+
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         """
         Transfer all counters from the source keys to the destination key.
@@ -369,6 +385,24 @@ class BaseTSDB(Service):
         """
         raise NotImplementedError
 
+    def get_range_many(self, queries, start, end, rollup=None):
+        """
+        Read the ranges of many models, keys and environments at once:
+
+        >>> get_range_many([(TSDBModel.group, [1, 2, 3], [1]),
+        ...                 (TSDBModel.project, [1], None)],
+        ...                start=now - timedelta(days=1),
+        ...                end=now)
+
+        `queries` are ``(model, keys, environment_ids)`` tuples. Returns one
+        mapping of key => [(timestamp, count), ...] per query, like
+        ``get_range`` would.
+        """
+        return [
+            self.get_range(model, keys, start, end, rollup, environment_ids=environment_ids)
+            for model, keys, environment_ids in queries
+        ]
+
     def get_sums(
         self,
         model,
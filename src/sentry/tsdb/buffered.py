@@ -0,0 +1,192 @@
+import logging
+import os
+import threading
+from collections import defaultdict
+from functools import reduce
+from math import gcd
+
+from django.utils import timezone
+
+from sentry.tsdb.base import BaseTSDB
+from sentry.utils import metrics
+from sentry.utils.concurrent import register_shutdown
+from sentry.utils.dates import to_datetime
+from sentry.utils.imports import import_string
+
+logger = logging.getLogger(__name__)
+
+# Methods that are buffered rather than passed through to the backend.
+BUFFERED_METHODS = frozenset(["incr", "incr_multi", "incr_many"])
+
+# What to do with increments when the buffer is full.
+OVERFLOW_FLUSH = "flush"
+OVERFLOW_DROP = "drop"
+
+
+def make_method(key):
+    def method(self, *a, **kw):
+        return getattr(self.backend, key)(*a, **kw)
+
+    return method
+
+
+# See `RedisSnubaTSDBMeta`: the methods have to be applied to the class since
+# `BaseTSDB` already defines all of them.
+class BufferedTSDBMeta(type):
+    def __new__(cls, name, bases, attrs):
+        for key in (BaseTSDB.__read_methods__ | BaseTSDB.__write_methods__) - BUFFERED_METHODS:
+            attrs[key] = make_method(key)
+        return type.__new__(cls, name, bases, attrs)
+
+
+class BufferedTSDB(BaseTSDB, metaclass=BufferedTSDBMeta):
+    def __init__(
+        self,
+        backend="sentry.tsdb.redis.RedisTSDB",
+        backend_options=None,
+        flush_interval=1.0,
+        flush_size=1000,
+        max_size=10000,
+        overflow=OVERFLOW_FLUSH,
+        **options,
+    ):
+        """
+        A TSDB backend that sums up counter increments in memory and writes
+        them to another backend from a background thread, so that saving an
+        event does not wait for the write and a hot key receiving thousands
+        of increments per second is written once per flush. All other methods
+        go straight to the backend.
+
+        Increments are combined per model, key, environment and time bucket,
+        where the bucket is the largest interval that evenly divides every
+        rollup (so no increment moves to a different rollup period).
+
+        :param backend: import path of the TSDB backend to write to.
+        :param backend_options: options for the backend. Its rollups should
+            be the same as the ones of this backend.
+        :param flush_interval: seconds between flushes.
+        :param flush_size: number of buffered entries that triggers a flush
+            before the interval is up.
+        :param max_size: maximum number of buffered entries. Increments for
+            new entries beyond that are either written out by the caller
+            (``"flush"``, i.e. backpressure) or dropped (``"drop"``), as set
+            by ``overflow``.
+
+        Buffered increments are flushed when the process exits. Increments
+        that can not be written are lost, like with a non-durable cluster.
+        """
+        assert overflow in (OVERFLOW_FLUSH, OVERFLOW_DROP)
+
+        self.backend = import_string(backend)(**(backend_options or {}))
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_size = max_size
+        self.overflow = overflow
+        super().__init__(**options)
+
+        self.bucket_size = reduce(gcd, self.rollups.keys())
+
+        self.__reset()
+        # The flusher does not survive forking, and neither should the buffer
+        # or locks inherited from the parent, which may have been held by its
+        # flusher at the time.
+        os.register_at_fork(after_in_child=self.__reset)
+
+    def __reset(self):
+        self.__lock = threading.Lock()
+        self.__flush_lock = threading.Lock()
+        self.__wakeup = threading.Event()
+        # (model, key, environment_id, bucket) -> count
+        self.__buffer = defaultdict(int)
+        self.__thread = None
+
+    def __ensure_thread(self):
+        if self.__thread is None:
+            register_shutdown(self.flush_buffer)
+            self.__thread = threading.Thread(target=self.__run, name="tsdb-buffer", daemon=True)
+            self.__thread.start()
+
+    def __run(self):
+        while True:
+            self.__wakeup.wait(self.flush_interval)
+            self.__wakeup.clear()
+            try:
+                self.flush_buffer()
+            except Exception:
+                logger.exception("tsdb.buffer.flush_failed")
+
+    def incr(self, model, key, timestamp=None, count=1, environment_id=None):
+        self.incr_many([([(model, key)], timestamp, environment_id)], count)
+
+    def incr_multi(self, items, timestamp=None, count=1, environment_id=None):
+        self.incr_many([(items, timestamp, environment_id)], count)
+
+    def incr_many(self, increments, count=1):
+        self.validate_arguments(
+            [item[0] for items, _, _ in increments for item in items],
+            [environment_id for _, _, environment_id in increments],
+        )
+
+        now = timezone.now()
+        dropped = 0
+        overflow = False
+
+        with self.__lock:
+            self.__ensure_thread()
+            buffer = self.__buffer
+
+            for items, default_timestamp, environment_id in increments:
+                for item in items:
+                    if len(item) == 2:
+                        model, key = item
+                        options = {}
+                    else:
+                        model, key, options = item
+
+                    bucket = self.normalize_to_epoch(
+                        options.get("timestamp", default_timestamp or now), self.bucket_size
+                    )
+                    buffer_key = (model, key, environment_id, bucket)
+                    if buffer_key not in buffer and len(buffer) >= self.max_size:
+                        if self.overflow == OVERFLOW_DROP:
+                            dropped += 1
+                            continue
+                        overflow = True
+                    buffer[buffer_key] += options.get("count", count)
+
+            size = len(buffer)
+
+        if dropped:
+            metrics.incr("tsdb.buffer.dropped", amount=dropped)
+
+        if overflow:
+            # Apply backpressure, the caller pays for the write.
+            self.flush_buffer()
+        elif size >= self.flush_size:
+            self.__wakeup.set()
+
+    def flush_buffer(self):
+        """
+        Write all buffered increments to the backend.
+        """
+        with self.__flush_lock:
+            with self.__lock:
+                buffer = self.__buffer
+                self.__buffer = defaultdict(int)
+
+            if not buffer:
+                return
+
+            # (timestamp, environment_id) -> [(model, key, options)]
+            requests = defaultdict(list)
+            for (model, key, environment_id, bucket), count in buffer.items():
+                requests[(bucket, environment_id)].append((model, key, {"count": count}))
+
+            metrics.timing("tsdb.buffer.flush_size", len(buffer))
+            with metrics.timer("tsdb.buffer.flush"):
+                self.backend.incr_many(
+                    [
+                        (items, to_datetime(bucket), environment_id)
+                        for (bucket, environment_id), items in requests.items()
+                    ]
+                )
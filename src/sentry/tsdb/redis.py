@@ -11,10 +11,16 @@ from django.utils import timezone
 from django.utils.encoding import force_bytes
 from pkg_resources import resource_string
 
+from sentry import options as options_store
 from sentry.tsdb.base import BaseTSDB
 from sentry.utils.compat import crc32
 from sentry.utils.dates import to_datetime, to_timestamp
-from sentry.utils.redis import SentryScript, check_cluster_versions, get_cluster_from_options
+from sentry.utils.redis import (
+    SentryScript,
+    check_cluster_versions,
+    get_cluster_from_options,
+    load_script,
+)
 from sentry.utils.versioning import Version
 
 logger = logging.getLogger(__name__)
@@ -25,6 +31,8 @@ SketchParameters = namedtuple("SketchParameters", "depth width capacity")
 
 CountMinScript = SentryScript(None, resource_string("sentry", "scripts/tsdb/cmsketch.lua"))
 
+incr_multi_script = load_script("tsdb/incr_multi.lua")
+
 
 class SuppressionWrapper:
     """\
@@ -215,24 +223,37 @@ class RedisTSDB(BaseTSDB):
         ...             (TimeSeriesModel.group, 5, {"timestamp": ...})])
         """
 
-        default_timestamp = timestamp
-        default_count = count
+        self.incr_many([(items, timestamp, environment_id)], count)
 
-        self.validate_arguments([item[0] for item in items], [environment_id])
+    def incr_many(self, increments, count=1):
+        """
+        Apply many ``incr_multi`` calls at once, see ``BaseTSDB.incr_many``.
 
-        if default_timestamp is None:
-            default_timestamp = timezone.now()
+        Increments of the same hash field are combined before they are sent,
+        and with the ``tsdb.redis.incr-script`` option all increments for a
+        Redis host are applied with a single script call.
+        """
+        self.validate_arguments(
+            [item[0] for items, _, _ in increments for item in items],
+            [environment_id for _, _, environment_id in increments],
+        )
 
-        for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
-            manager = cluster.map()
-            if not durable:
-                manager = SuppressionWrapper(manager)
+        now = timezone.now()
 
-            with manager as client:
-                # (hash_key, hash_field) -> count
-                key_operations = defaultdict(lambda: 0)
-                # (hash_key) -> "max expiration encountered"
-                key_expiries = defaultdict(lambda: 0.0)
+        # (cluster, durable) -> (hash_key, hash_field) -> count
+        cluster_operations = defaultdict(lambda: defaultdict(int))
+        # (cluster, durable) -> hash_key -> "max expiration encountered"
+        cluster_expiries = defaultdict(lambda: defaultdict(float))
+
+        for items, default_timestamp, request_environment_id in increments:
+            if default_timestamp is None:
+                default_timestamp = now
+
+            for cluster_key, environment_ids in self.get_cluster_groups(
+                {None, request_environment_id}
+            ):
+                key_operations = cluster_operations[cluster_key]
+                key_expiries = cluster_expiries[cluster_key]
 
                 for rollup, max_values in self.rollups.items():
                     for item in items:
@@ -242,7 +263,7 @@ class RedisTSDB(BaseTSDB):
                         else:
                             model, key, options = item
 
-                        count = options.get("count", default_count)
+                        item_count = options.get("count", count)
                         timestamp = options.get("timestamp", default_timestamp)
 
                         expiry = self.calculate_expiry(rollup, max_values, timestamp)
@@ -255,13 +276,47 @@ class RedisTSDB(BaseTSDB):
                             if key_expiries[hash_key] < expiry:
                                 key_expiries[hash_key] = expiry
 
-                            key_operations[(hash_key, hash_field)] += count
+                            key_operations[(hash_key, hash_field)] += item_count
+
+        use_script = options_store.get("tsdb.redis.incr-script")
+        for (cluster, durable), key_operations in cluster_operations.items():
+            key_expiries = cluster_expiries[(cluster, durable)]
+
+            if use_script:
+                try:
+                    self.__incr_counters_by_host(cluster, key_operations, key_expiries)
+                except Exception:
+                    if durable:
+                        raise
+                    logger.exception("tsdb.redis.incr_many.non_durable_failure")
+                continue
+
+            manager = cluster.map()
+            if not durable:
+                manager = SuppressionWrapper(manager)
 
-                for (hash_key, hash_field), count in key_operations.items():
-                    client.hincrby(hash_key, hash_field, count)
+            with manager as client:
+                for (hash_key, hash_field), item_count in key_operations.items():
+                    client.hincrby(hash_key, hash_field, item_count)
                     if key_expiries.get(hash_key):
                         client.expireat(hash_key, key_expiries.pop(hash_key))
 
+    def __incr_counters_by_host(self, cluster, key_operations, key_expiries):
+        router = cluster.get_router()
+
+        # host -> hash_key -> [hash_field, count, ...]
+        hosts = defaultdict(lambda: defaultdict(list))
+        for (hash_key, hash_field), count in key_operations.items():
+            hosts[router.get_host_for_key(hash_key)][hash_key].extend((hash_field, count))
+
+        for host, keys in hosts.items():
+            arguments = []
+            for hash_key, fields in keys.items():
+                arguments.extend((int(key_expiries[hash_key]), len(fields) // 2))
+                arguments.extend(fields)
+
+            incr_multi_script(cluster.get_local_client(host), list(keys), arguments)
+
     def get_range(
         self,
         model,
@@ -281,35 +336,58 @@ class RedisTSDB(BaseTSDB):
         >>>          start=now - timedelta(days=1),
         >>>          end=now)
         """
-        # redis backend doesn't support multiple envs
-        if environment_ids is not None and len(environment_ids) > 1:
-            raise NotImplementedError
-        environment_id = environment_ids[0] if environment_ids else None
+        return self.get_range_many([(model, keys, environment_ids)], start, end, rollup)[0]
 
-        self.validate_arguments([model], [environment_id])
+    def get_range_many(self, queries, start, end, rollup=None):
+        """
+        Read the ranges of many models, keys and environments at once, see
+        ``BaseTSDB.get_range_many``. Counts of several environments are
+        summed up.
 
+        All fields of a hash are read with a single HMGET, and all hashes are
+        read in one fan-out to the hosts of a cluster.
+        """
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
         series = [to_datetime(item) for item in series]
+        epochs = [to_timestamp(timestamp) for timestamp in series]
+
+        # One list of counts per key, in the same order as `series`.
+        counts = [{} for _ in queries]
+
+        # cluster -> hash_key -> [(hash_field, counts of key, series index)]
+        cluster_fields = defaultdict(lambda: defaultdict(list))
+
+        for query_counts, (model, keys, environment_ids) in zip(counts, queries):
+            environment_ids = environment_ids or [None]
+            self.validate_arguments([model], environment_ids)
+
+            for key in dict.fromkeys(keys):
+                key_counts = query_counts[key] = [0] * len(series)
+                for environment_id in environment_ids:
+                    cluster, _ = self.get_cluster(environment_id)
+                    fields = cluster_fields[cluster]
+                    for idx, timestamp in enumerate(series):
+                        hash_key, hash_field = self.make_counter_key(
+                            model, rollup, timestamp, key, environment_id
+                        )
+                        fields[hash_key].append((hash_field, key_counts, idx))
 
-        results = []
-        cluster, _ = self.get_cluster(environment_id)
-        with cluster.map() as client:
-            for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id
-                    )
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(hash_key, hash_field))
+        for cluster, fields in cluster_fields.items():
+            responses = []
+            with cluster.map() as client:
+                for hash_key, hash_fields in fields.items():
+                    responses.append(
+                        (hash_fields, client.hmget(hash_key, [f for f, _, _ in hash_fields]))
                     )
 
-        results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+            for hash_fields, response in responses:
+                for (_, key_counts, idx), count in zip(hash_fields, response.value):
+                    key_counts[idx] += int(count or 0)
 
-        for key, points in results_by_key.items():
-            results_by_key[key] = sorted(points.items())
-        return dict(results_by_key)
+        return [
+            {key: list(zip(epochs, key_counts)) for key, key_counts in query_counts.items()}
+            for query_counts in counts
+        ]
 
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         environment_ids = (set(environment_ids) if environment_ids is not None else set()).union(
@@ -25,6 +25,7 @@ def dont_do_this(callargs):
 method_specifications = {
     # method: (type, function(callargs) -> set[model])
     "get_range": (READ, single_model_argument),
+    "get_range_many": (READ, lambda callargs: {model for model, _, _ in callargs["queries"]}),
     "get_sums": (READ, single_model_argument),
     "get_distinct_counts_series": (READ, single_model_argument),
     "get_distinct_counts_totals": (READ, single_model_argument),
@@ -35,6 +36,10 @@ method_specifications = {
     "get_frequency_totals": (READ, single_model_argument),
     "incr": (WRITE, single_model_argument),
     "incr_multi": (WRITE, lambda callargs: {item[0] for item in callargs["items"]}),
+    "incr_many": (
+        WRITE,
+        lambda callargs: {item[0] for items, _, _ in callargs["increments"] for item in items},
+    ),
     "merge": (WRITE, single_model_argument),
     "delete": (WRITE, multiple_model_argument),
     "record": (WRITE, single_model_argument),
@@ -1,6 +1,6 @@
 import zlib
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from typing import Generic, Optional, TypeVar
 
 import zstandard
 
@@ -87,8 +87,20 @@ class ZlibCodec(Codec[bytes, bytes]):
 
 
 class ZstdCodec(Codec[bytes, bytes]):
+    """
+    Compress/decompress bytes with zstd, optionally using a pre-trained
+    dictionary (as produced by ``zstandard.train_dictionary``).
+    """
+
+    def __init__(self, dictionary: Optional[bytes] = None) -> None:
+        self.dictionary = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+
+    @property
+    def dictionary_id(self) -> int:
+        return self.dictionary.dict_id() if self.dictionary is not None else 0
+
     def encode(self, value: bytes) -> bytes:
-        return zstandard.ZstdCompressor().compress(value)
+        return zstandard.ZstdCompressor(dict_data=self.dictionary).compress(value)
 
     def decode(self, value: bytes) -> bytes:
-        return zstandard.ZstdDecompressor().decompress(value)
+        return zstandard.ZstdDecompressor(dict_data=self.dictionary).decompress(value)
@@ -1,6 +1,8 @@
+import atexit
 import collections
 import functools
 import logging
+import multiprocessing.util
 import threading
 from concurrent.futures import Future, InvalidStateError
 from concurrent.futures._base import FINISHED, RUNNING
@@ -8,6 +10,7 @@ from contextlib import contextmanager
 from queue import Full, PriorityQueue
 from time import time
 
+from celery.signals import worker_process_shutdown
 from sentry_sdk import Hub
 
 logger = logging.getLogger(__name__)
@@ -34,6 +37,29 @@ def execute(function, daemon=True):
     return future
 
 
+def register_shutdown(function):
+    """
+    Calls ``function`` once when the current process exits. Unlike `atexit`,
+    this also covers children of `multiprocessing` and of celery's prefork
+    pool, which leave through `os._exit`. Has to be called in the process
+    that exits, as children do not run the handlers of their parent.
+    """
+    lock = threading.Lock()
+    called = False
+
+    def shutdown(**kwargs):
+        nonlocal called
+        with lock:
+            if called:
+                return
+            called = True
+        function()
+
+    atexit.register(shutdown)
+    multiprocessing.util.Finalize(None, shutdown, exitpriority=0)
+    worker_process_shutdown.connect(shutdown, weak=False)
+
+
 @functools.total_ordering
 class PriorityTask(collections.namedtuple("PriorityTask", "priority item")):
     def __eq__(self, b):
@@ -278,3 +304,49 @@ class FutureSet:
 
         if remaining == 0:
             self.__execute_callback(callback)
+
+
+class SingleFlight:
+    """\
+    Coalesces concurrent calls for the same key within a process. The first
+    caller for a key runs the function, callers that arrive while it is still
+    running wait for it and share its result (or exception).
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__futures = {}
+
+    def join(self, key):
+        """\
+        Joins the flight for a key, returns its future and whether the caller
+        leads it. The leader has to resolve the future and then `leave` the
+        flight, the others wait for the future. Use `do` unless several
+        flights have to be led at once.
+        """
+        with self.__lock:
+            future = self.__futures.get(key)
+            leader = future is None
+            if leader:
+                future = self.__futures[key] = Future()
+        return future, leader
+
+    def leave(self, key):
+        with self.__lock:
+            del self.__futures[key]
+
+    def do(self, key, function):
+        future, leader = self.join(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = function()
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self.leave(key)
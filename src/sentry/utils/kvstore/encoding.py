@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import Iterator, Optional, Sequence, Tuple
+from typing import Iterator, Mapping, Optional, Sequence, Tuple
 
 from sentry.utils.codecs import Codec, TDecoded, TEncoded
 from sentry.utils.kvstore.abstract import K, KVStorage
@@ -34,6 +34,11 @@ class KVStorageCodecWrapper(KVStorage[K, TDecoded]):
     def set(self, key: K, value: TDecoded, ttl: Optional[timedelta] = None) -> None:
         return self.store.set(key, self.value_codec.encode(value), ttl)
 
+    def set_many(self, items: Mapping[K, TDecoded], ttl: Optional[timedelta] = None) -> None:
+        return self.store.set_many(
+            {key: self.value_codec.encode(value) for key, value in items.items()}, ttl
+        )
+
     def delete(self, key: K) -> None:
         return self.store.delete(key)
 
@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Iterable, Mapping, Optional, Tuple, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    A thread-safe, in-process LRU cache bounded by the total weight of its
+    entries rather than their number. By default every entry weighs 1, pass
+    `weigh` (or a weight to `set`) to bound the cache by e.g. bytes instead.
+
+    Values are returned as-is, so they are shared between all callers and
+    should be treated as immutable.
+
+    >>> cache = LRUCache(max_weight=1024 * 1024, weigh=len)
+    >>> cache.set("key", b"value")
+    >>> cache.get("key")
+    b'value'
+    """
+
+    def __init__(self, max_weight: int, weigh: Optional[Callable[[V], int]] = None) -> None:
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[K, Tuple[V, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_many(self, keys: Iterable[K]) -> Dict[K, V]:
+        rv = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    continue
+
+                self._entries.move_to_end(key)
+                self.hits += 1
+                rv[key] = entry[0]
+
+        return rv
+
+    def set(self, key: K, value: V, weight: Optional[int] = None) -> None:
+        if weight is None:
+            weight = self.weigh(value) if self.weigh is not None else 1
+
+        with self._lock:
+            self._pop(key)
+
+            # Entries that would evict the whole cache are not worth holding.
+            if weight > self.max_weight:
+                return
+
+            self._entries[key] = (value, weight)
+            self.weight += weight
+
+            while self.weight > self.max_weight:
+                _, (_, evicted_weight) = self._entries.popitem(last=False)
+                self.weight -= evicted_weight
+                self.evictions += 1
+
+    def set_many(self, items: Mapping[K, V]) -> None:
+        for key, value in items.items():
+            self.set(key, value)
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def delete_many(self, keys: Iterable[K]) -> None:
+        with self._lock:
+            for key in keys:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def stats(self) -> Mapping[str, int]:
+        return {
+            "entries": len(self._entries),
+            "weight": self.weight,
+            "max_weight": self.max_weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _pop(self, key: K) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.weight -= entry[1]
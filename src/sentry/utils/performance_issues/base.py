@@ -6,7 +6,7 @@ import re
 from abc import ABC, abstractmethod
 from datetime import timedelta
 from enum import Enum
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
 from sentry import options
@@ -24,6 +24,7 @@ from sentry.issues.grouptype import (
 )
 from sentry.models import Organization, Project
 
+from .span_table import SpanTable
 from .types import PerformanceProblemsMap, Span
 
 
@@ -75,6 +76,10 @@ class PerformanceDetector(ABC):
 
     type: DetectorType
 
+    # Shared by all detectors running on the same transaction, set by
+    # `run_detector_on_data`.
+    span_table: Optional[SpanTable] = None
+
     def __init__(self, settings: Dict[DetectorType, Any], event: Event):
         self.settings = settings[self.settings_key]
         self._event = event
@@ -84,10 +89,12 @@ class PerformanceDetector(ABC):
     def init(self):
         raise NotImplementedError
 
-    def find_span_prefix(self, settings, span_op: str):
+    def find_span_prefix(self, settings, span_op: str, span: Optional[Span] = None):
         allowed_span_ops = settings.get("allowed_span_ops", [])
         if len(allowed_span_ops) <= 0:
             return True
+        if span is not None and self.span_table is not None:
+            return self.span_table.find_span_prefix(span, allowed_span_ops)
         return next((op for op in allowed_span_ops if span_op.startswith(op)), False)
 
     def settings_for_span(self, span: Span):
@@ -96,13 +103,21 @@ class PerformanceDetector(ABC):
         if not op or not span_id:
             return None
 
-        span_duration = get_span_duration(span)
+        span_duration = self.span_duration(span)
         for setting in self.settings:
-            op_prefix = self.find_span_prefix(setting, op)
+            op_prefix = self.find_span_prefix(setting, op, span)
             if op_prefix:
                 return op, span_id, op_prefix, span_duration, setting
         return None
 
+    def span_duration(self, span: Span) -> timedelta:
+        """`get_span_duration`, looked up in the span table if possible."""
+        if self.span_table is not None:
+            duration = self.span_table.get_duration(span)
+            if duration is not None:
+                return duration
+        return get_span_duration(span)
+
     def event(self) -> Event:
         return self._event
 
@@ -0,0 +1,130 @@
+"""
+Benchmarks performance problem detection on a corpus of transactions, see
+``sentry performance bench``.
+"""
+from __future__ import annotations
+
+import math
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Type
+
+from .base import DetectorType, PerformanceDetector
+from .performance_detection import DETECTOR_CLASSES, get_detection_settings, run_detector_on_data
+from .span_table import SpanTable
+
+# Result row for building the span table shared by all detectors.
+SPAN_TABLE = "SpanTable"
+
+# Result row for all of detection on a transaction, including the span table.
+TOTAL = "total"
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of `values`, `q` in the range [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(math.ceil(q / 100.0 * len(ordered))), 1)
+    return ordered[rank - 1]
+
+
+def benchmark_detectors(
+    events: Sequence[Mapping[str, Any]],
+    iterations: int = 1,
+    allocations: bool = False,
+    detector_classes: Sequence[Type[PerformanceDetector]] = DETECTOR_CLASSES,
+    settings: Optional[Dict[DetectorType, Any]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Runs every detector over every event `iterations` times, the same way
+    `_detect_performance_problems` does, and returns per detector:
+
+    - ``p50_ms``, ``p99_ms``: latency per transaction
+    - ``peak_alloc_kb``: p99 of the peak memory allocated per transaction
+      (only if `allocations` is set, tracing allocations slows down
+      detection considerably)
+    - ``problems``: problems found per run over the whole corpus
+    """
+    if settings is None:
+        settings = get_detection_settings()
+
+    durations: Dict[str, List[float]] = defaultdict(list)
+    peaks: Dict[str, List[float]] = defaultdict(list)
+    problems: Dict[str, int] = defaultdict(int)
+
+    if allocations:
+        tracemalloc.start()
+
+    try:
+        for _ in range(iterations):
+            for data in events:
+                event_duration = 0.0
+
+                start = _start_measurement(allocations)
+                span_table = SpanTable(data.get("spans", []))
+                event_duration += _stop_measurement(SPAN_TABLE, start, durations, peaks)
+
+                for detector_class in detector_classes:
+                    detector = detector_class(settings, data)
+                    name = detector_class.__name__
+
+                    start = _start_measurement(allocations)
+                    run_detector_on_data(detector, data, span_table)
+                    event_duration += _stop_measurement(name, start, durations, peaks)
+
+                    problems[name] += len(detector.stored_problems)
+
+                durations[TOTAL].append(event_duration)
+    finally:
+        if allocations:
+            tracemalloc.stop()
+
+    rv = {}
+    for name, values in durations.items():
+        rv[name] = {
+            "p50_ms": percentile(values, 50),
+            "p99_ms": percentile(values, 99),
+            "problems": problems[name] / iterations if iterations else 0,
+        }
+        if allocations and name in peaks:
+            rv[name]["peak_alloc_kb"] = percentile(peaks[name], 99)
+
+    if TOTAL in rv:
+        rv[TOTAL]["problems"] = sum(problems.values()) / iterations
+    return rv
+
+
+def compare_results(
+    baseline: Mapping[str, Mapping[str, float]], current: Mapping[str, Mapping[str, float]]
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Returns the relative change in percent of every metric in `current` over
+    `baseline` (e.g. results of `benchmark_detectors` on two revisions).
+    Changes are `None` where the baseline lacks the metric or it was 0.
+    """
+    rv: Dict[str, Dict[str, Optional[float]]] = {}
+    for name, metrics in current.items():
+        rv[name] = {}
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            rv[name][metric] = (value - base) / base * 100.0 if base else None
+    return rv
+
+
+def _start_measurement(allocations: bool) -> float:
+    if allocations:
+        # Also resets the peak.
+        tracemalloc.clear_traces()
+    return time.perf_counter()
+
+
+def _stop_measurement(
+    name: str, start: float, durations: Dict[str, List[float]], peaks: Dict[str, List[float]]
+) -> float:
+    duration = (time.perf_counter() - start) * 1000.0
+    durations[name].append(duration)
+    if tracemalloc.is_tracing():
+        peaks[name].append(tracemalloc.get_traced_memory()[1] / 1024.0)
+    return duration
@@ -5,7 +5,7 @@ from datetime import timedelta
 from sentry.issues.grouptype import PerformanceConsecutiveHTTPQueriesGroupType
 from sentry.models import Organization, Project
 
-from ..base import DetectorType, PerformanceDetector, fingerprint_spans, get_span_duration
+from ..base import DetectorType, PerformanceDetector, fingerprint_spans
 from ..performance_problem import PerformanceProblem
 from ..types import Span
 
@@ -38,7 +38,7 @@ class ConsecutiveHTTPSpanDetector(PerformanceDetector):
             "consecutive_count_threshold"
         )
         exceeds_span_duration_threshold = all(
-            get_span_duration(span).total_seconds() * 1000
+            self.span_duration(span).total_seconds() * 1000
             > self.settings.get("span_duration_threshold")
             for span in self.consecutive_http_spans
         )
@@ -67,7 +67,7 @@ class ConsecutiveHTTPSpanDetector(PerformanceDetector):
         "Given a list of spans, find the sum of the span durations in milliseconds"
         sum = 0
         for span in spans:
-            sum += get_span_duration(span).total_seconds() * 1000
+            sum += self.span_duration(span).total_seconds() * 1000
         return sum
 
     def _overlaps_last_span(self, span: Span) -> bool:
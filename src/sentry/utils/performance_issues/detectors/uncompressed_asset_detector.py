@@ -4,7 +4,7 @@ from sentry import features
 from sentry.issues.grouptype import PerformanceUncompressedAssetsGroupType
 from sentry.models import Organization, Project
 
-from ..base import DetectorType, PerformanceDetector, fingerprint_resource_span, get_span_duration
+from ..base import DetectorType, PerformanceDetector, fingerprint_resource_span
 from ..performance_problem import PerformanceProblem
 from ..types import Span
 
@@ -63,7 +63,7 @@ class UncompressedAssetSpanDetector(PerformanceDetector):
             return
 
         # Ignore assets under a certain duration threshold
-        if get_span_duration(span).total_seconds() * 1000 <= self.settings.get(
+        if self.span_duration(span).total_seconds() * 1000 <= self.settings.get(
             "duration_threshold"
         ):
             return
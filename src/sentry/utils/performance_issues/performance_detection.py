@@ -7,7 +7,7 @@ import re
 from abc import ABC, abstractmethod
 from collections import defaultdict, deque
 from datetime import timedelta
-from typing import Any, Dict, List, Optional, Sequence, Tuple, cast
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, cast
 
 import sentry_sdk
 from symbolic import ProguardMapper  # type: ignore
@@ -33,7 +33,6 @@ from .base import (
     PerformanceDetector,
     fingerprint_resource_span,
     fingerprint_span,
-    get_span_duration,
 )
 from .detectors import (
     ConsecutiveDBSpanDetector,
@@ -42,6 +41,7 @@ from .detectors import (
     UncompressedAssetSpanDetector,
 )
 from .performance_problem import PerformanceProblem
+from .span_table import SpanTable
 from .types import Span
 
 PERFORMANCE_GROUP_COUNT_LIMIT = 10
@@ -248,20 +248,12 @@ def _detect_performance_problems(
 
     detection_settings = get_detection_settings(project_id)
     detectors: List[PerformanceDetector] = [
-        ConsecutiveDBSpanDetector(detection_settings, data),
-        ConsecutiveHTTPSpanDetector(detection_settings, data),
-        SlowDBQueryDetector(detection_settings, data),
-        RenderBlockingAssetSpanDetector(detection_settings, data),
-        NPlusOneDBSpanDetector(detection_settings, data),
-        NPlusOneDBSpanDetectorExtended(detection_settings, data),
-        FileIOMainThreadDetector(detection_settings, data),
-        NPlusOneAPICallsDetector(detection_settings, data),
-        MNPlusOneDBSpanDetector(detection_settings, data),
-        UncompressedAssetSpanDetector(detection_settings, data),
+        detector_class(detection_settings, data) for detector_class in DETECTOR_CLASSES
     ]
 
+    span_table = SpanTable(data.get("spans", []))
     for detector in detectors:
-        run_detector_on_data(detector, data)
+        run_detector_on_data(detector, data, span_table)
 
     # Metrics reporting only for detection, not created issues.
     report_metrics_for_detectors(data, event_id, detectors, sdk_span)
@@ -302,12 +294,15 @@ def _detect_performance_problems(
     return list(unique_problems)
 
 
-def run_detector_on_data(detector, data):
+def run_detector_on_data(detector, data, span_table: Optional[SpanTable] = None):
     if not detector.is_event_eligible(data):
         return
 
-    spans = data.get("spans", [])
-    for span in spans:
+    if span_table is None:
+        span_table = SpanTable(data.get("spans", []))
+    detector.span_table = span_table
+
+    for span in span_table.spans:
         detector.visit_span(span)
 
     detector.on_complete()
@@ -506,7 +501,7 @@ class RenderBlockingAssetSpanDetector(PerformanceDetector):
         if encoded_body_size < minimum_size_bytes or encoded_body_size > self.MAX_SIZE_BYTES:
             return False
 
-        span_duration = get_span_duration(span)
+        span_duration = self.span_duration(span)
         fcp_ratio_threshold = self.settings.get("fcp_ratio_threshold")
         return span_duration / self.fcp > fcp_ratio_threshold
 
@@ -665,7 +660,7 @@ class NPlusOneDBSpanDetector(PerformanceDetector):
         # Do the spans take enough total time?
         total_duration = timedelta()
         for span in self.n_spans:
-            total_duration += get_span_duration(span)
+            total_duration += self.span_duration(span)
         if total_duration < duration_threshold:
             return
 
@@ -1111,6 +1106,21 @@ class MNPlusOneDBSpanDetector(PerformanceDetector):
             self.stored_problems[performance_problem.fingerprint] = performance_problem
 
 
+# All detectors run on every transaction, in order.
+DETECTOR_CLASSES: Sequence[Type[PerformanceDetector]] = (
+    ConsecutiveDBSpanDetector,
+    ConsecutiveHTTPSpanDetector,
+    SlowDBQueryDetector,
+    RenderBlockingAssetSpanDetector,
+    NPlusOneDBSpanDetector,
+    NPlusOneDBSpanDetectorExtended,
+    FileIOMainThreadDetector,
+    NPlusOneAPICallsDetector,
+    MNPlusOneDBSpanDetector,
+    UncompressedAssetSpanDetector,
+)
+
+
 # Reports metrics and creates spans for detection
 def report_metrics_for_detectors(
     event: Event, event_id: Optional[str], detectors: Sequence[PerformanceDetector], sdk_span: Any
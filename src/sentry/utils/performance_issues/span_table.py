@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .types import Span
+
+# Marks values of lazily computed columns that have not been computed yet.
+_MISSING = object()
+
+
+class SpanTable:
+    """
+    A column-oriented view of the spans of a transaction, built once per
+    transaction and shared by all detectors, so values derived from a span
+    that several detectors need (durations and op prefix matches) are only
+    computed once rather than once per detector.
+
+    Rows are in the same order as the spans of the event. Spans that are not
+    part of the table (e.g. the transaction's root span) are looked up as
+    `None` and callers fall back to computing the value from the span itself.
+    """
+
+    def __init__(self, spans: Sequence[Span]) -> None:
+        self.spans = spans
+
+        self.duration: List[Optional[timedelta]] = []
+        self.op_id: List[int] = []
+
+        # Distinct ops, indexed by op id.
+        self.ops: List[Optional[str]] = []
+
+        self._index_by_object: Dict[int, int] = {}
+        self._op_prefixes: Dict[Tuple[int, Tuple[str, ...]], Any] = {}
+
+        op_ids: Dict[Optional[str], int] = {}
+        for idx, span in enumerate(spans):
+            self._index_by_object[id(span)] = idx
+
+            start = span.get("start_timestamp", 0)
+            end = span.get("timestamp", 0)
+            try:
+                self.duration.append(timedelta(seconds=end) - timedelta(seconds=start))
+            except TypeError:
+                # Leave malformed spans to `get_span_duration`, which fails
+                # the same way it always has.
+                self.duration.append(None)
+
+            op = span.get("op", None)
+            op_id = op_ids.get(op)
+            if op_id is None:
+                op_id = op_ids[op] = len(self.ops)
+                self.ops.append(op)
+            self.op_id.append(op_id)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def index_of(self, span: Span) -> Optional[int]:
+        return self._index_by_object.get(id(span))
+
+    def get_duration(self, span: Span) -> Optional[timedelta]:
+        idx = self.index_of(span)
+        if idx is None:
+            return None
+        return self.duration[idx]
+
+    def find_span_prefix(self, span: Span, allowed_span_ops: Sequence[str]) -> Any:
+        """
+        Returns the first of `allowed_span_ops` the span's op starts with, or
+        `False`. Memoized per distinct op, since transactions have many spans
+        but few ops.
+        """
+        idx = self.index_of(span)
+        if idx is None:
+            return _find_span_prefix(span.get("op", None), allowed_span_ops)
+
+        key = (self.op_id[idx], tuple(allowed_span_ops))
+        rv = self._op_prefixes.get(key, _MISSING)
+        if rv is _MISSING:
+            rv = self._op_prefixes[key] = _find_span_prefix(self.ops[key[0]], allowed_span_ops)
+        return rv
+
+
+def _find_span_prefix(span_op: Optional[str], allowed_span_ops: Sequence[str]) -> Any:
+    return next((op for op in allowed_span_ops if span_op.startswith(op)), False)
@@ -2,6 +2,7 @@ import functools
 import logging
 import os
 import re
+import threading
 import time
 from collections import namedtuple
 from concurrent.futures import ThreadPoolExecutor
@@ -9,8 +10,20 @@ from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime, timedelta
 from hashlib import sha1
-from typing import Any, Callable, List, Mapping, MutableMapping, Optional, Sequence, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from urllib.parse import urlparse
+from uuid import uuid4
 
 import pytz
 import sentry_sdk
@@ -22,6 +35,7 @@ from sentry_sdk import Hub
 from snuba_sdk import Request
 from snuba_sdk.legacy import json_to_snql
 
+from sentry import options
 from sentry.models import (
     Environment,
     Group,
@@ -37,6 +51,7 @@ from sentry.snuba.dataset import Dataset
 from sentry.snuba.events import Columns
 from sentry.snuba.referrer import validate_referrer
 from sentry.utils import json, metrics
+from sentry.utils.concurrent import SingleFlight
 from sentry.utils.dates import outside_retention_with_modified_start, to_timestamp
 
 logger = logging.getLogger(__name__)
@@ -350,21 +365,88 @@ class RetrySkipTimeout(urllib3.Retry):
         )
 
 
-_snuba_pool = connection_from_url(
-    settings.SENTRY_SNUBA,
-    retries=RetrySkipTimeout(
-        total=5,
-        # Our calls to snuba frequently fail due to network issues. We want to
-        # automatically retry most requests. Some of our POSTs and all of our DELETEs
-        # do cause mutations, but we have other things in place to handle duplicate
-        # mutations.
-        allowed_methods={"GET", "POST", "DELETE"},
-    ),
-    timeout=settings.SENTRY_SNUBA_TIMEOUT,
-    maxsize=10,
-)
+def _make_snuba_pool(maxsize: int, block: bool = False) -> urllib3.HTTPConnectionPool:
+    return connection_from_url(
+        settings.SENTRY_SNUBA,
+        retries=RetrySkipTimeout(
+            total=5,
+            # Our calls to snuba frequently fail due to network issues. We want to
+            # automatically retry most requests. Some of our POSTs and all of our DELETEs
+            # do cause mutations, but we have other things in place to handle duplicate
+            # mutations.
+            allowed_methods={"GET", "POST", "DELETE"},
+        ),
+        timeout=settings.SENTRY_SNUBA_TIMEOUT,
+        maxsize=maxsize,
+        block=block,
+    )
+
+
+_snuba_pool = _make_snuba_pool(maxsize=10)
 _query_thread_pool = ThreadPoolExecutor(max_workers=10)
 
+# Connection pools and query thread pools of SENTRY_SNUBA_REFERRER_POOLS by
+# referrer prefix, created on first use.
+_referrer_pools: Dict[str, urllib3.HTTPConnectionPool] = {}
+_referrer_thread_pools: Dict[str, ThreadPoolExecutor] = {}
+_referrer_pools_lock = threading.Lock()
+
+
+def _get_referrer_prefix(referrer: Optional[str]) -> Optional[str]:
+    prefixes = [
+        prefix
+        for prefix in settings.SENTRY_SNUBA_REFERRER_POOLS
+        if referrer and referrer.startswith(prefix)
+    ]
+    return max(prefixes, key=len) if prefixes else None
+
+
+def _get_snuba_pool(referrer: Optional[str]) -> urllib3.HTTPConnectionPool:
+    """
+    Returns the connection pool for queries with the given referrer, see
+    ``SENTRY_SNUBA_REFERRER_POOLS``. Referrer pools block when all of their
+    connections are in use (for up to the Snuba timeout), so that a referrer
+    never has more queries in flight than its pool size.
+    """
+    prefix = _get_referrer_prefix(referrer)
+    if prefix is None:
+        return _snuba_pool
+
+    pool = _referrer_pools.get(prefix)
+    if pool is None:
+        with _referrer_pools_lock:
+            pool = _referrer_pools.get(prefix)
+            if pool is None:
+                pool = _referrer_pools[prefix] = _make_snuba_pool(
+                    maxsize=settings.SENTRY_SNUBA_REFERRER_POOLS[prefix], block=True
+                )
+    return pool
+
+
+def _get_query_thread_pool(referrer: Optional[str]) -> ThreadPoolExecutor:
+    """
+    Returns the thread pool that runs bulk queries with the given referrer.
+    Referrers with their own connection pool get a thread pool of the same
+    size, so they neither wait for nor take threads of other queries.
+    """
+    prefix = _get_referrer_prefix(referrer)
+    if prefix is None:
+        return _query_thread_pool
+
+    thread_pool = _referrer_thread_pools.get(prefix)
+    if thread_pool is None:
+        with _referrer_pools_lock:
+            thread_pool = _referrer_thread_pools.get(prefix)
+            if thread_pool is None:
+                thread_pool = _referrer_thread_pools[prefix] = ThreadPoolExecutor(
+                    max_workers=settings.SENTRY_SNUBA_REFERRER_POOLS[prefix]
+                )
+    return thread_pool
+
+
+def _identity(x: Any) -> Any:
+    return x
+
 
 epoch_naive = datetime(1970, 1, 1, tzinfo=None)
 
@@ -743,7 +825,7 @@ def raw_snql_query(
     if "consistent" in OVERRIDE_OPTIONS:
         request.flags.consistent = OVERRIDE_OPTIONS["consistent"]
 
-    params: SnubaQueryBody = (request, lambda x: x, lambda x: x)
+    params: SnubaQueryBody = (request, _identity, _identity)
     return _apply_cache_and_build_results([params], referrer=referrer, use_cache=use_cache)[0]
 
 
@@ -759,7 +841,7 @@ def bulk_snql_query(
     if "consistent" in OVERRIDE_OPTIONS:
         for request in requests:
             request.flags.consistent = OVERRIDE_OPTIONS["consistent"]
-    params: SnubaQuery = [(request, lambda x: x, lambda x: x) for request in requests]
+    params: SnubaQuery = [(request, _identity, _identity) for request in requests]
     return _apply_cache_and_build_results(params, referrer=referrer, use_cache=use_cache)
 
 
@@ -814,7 +896,17 @@ def _apply_cache_and_build_results(
         to_query = [(query_pos, query_params, None) for query_pos, query_params in query_param_list]
 
     if to_query:
-        query_results = _bulk_snuba_query([item[1] for item in to_query], headers)
+        if options.get("snuba.query-coalescing"):
+            query_results = _coalesced_bulk_snuba_query(
+                [item[1] for item in to_query],
+                headers,
+                [
+                    cache_key or get_cache_key(query_params[0])
+                    for _, query_params, cache_key in to_query
+                ],
+            )
+        else:
+            query_results = _bulk_snuba_query([item[1] for item in to_query], headers)
         for result, (query_pos, _, cache_key) in zip(query_results, to_query):
             if cache_key:
                 cache.set(cache_key, json.dumps(result), settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
@@ -826,6 +918,134 @@ def _apply_cache_and_build_results(
     return [result[1] for result in results]
 
 
+# Coalesces identical queries within a process, see `_coalesced_bulk_snuba_query`.
+_query_single_flight = SingleFlight()
+
+# Seconds between checks whether another process finished a query.
+_COALESCING_POLL_INTERVAL = 0.05
+
+
+def _coalesced_bulk_snuba_query(
+    snuba_param_list: Sequence[SnubaQueryBody],
+    headers: Mapping[str, str],
+    cache_keys: Sequence[str],
+) -> ResultSet:
+    """
+    Like `_bulk_snuba_query`, but queries with the same cache key as a query
+    that is already running are not sent again, they share its result.
+
+    Within a process, queries are coalesced with a `SingleFlight`. Across
+    processes, see `_query_with_leases`.
+    """
+    results: List[Any] = [None] * len(snuba_param_list)
+    led = []
+    followed = []
+    for index, cache_key in enumerate(cache_keys):
+        future, leader = _query_single_flight.join(cache_key)
+        (led if leader else followed).append((index, future))
+
+    if led:
+        try:
+            led_results = _query_with_leases(
+                [snuba_param_list[index] for index, _ in led],
+                headers,
+                [cache_keys[index] for index, _ in led],
+            )
+        except Exception as error:
+            for _, future in led:
+                future.set_exception(error)
+            raise
+        else:
+            for (index, future), result in zip(led, led_results):
+                # Callers are free to modify their results, so followers get
+                # a snapshot taken before the result is handed out.
+                future.set_result(json.dumps(result))
+                results[index] = result
+        finally:
+            for index, _ in led:
+                _query_single_flight.leave(cache_keys[index])
+
+    for index, future in followed:
+        metrics.incr("snuba.query_coalescing.coalesced", tags={"scope": "process"})
+        results[index] = json.loads(future.result())
+
+    return results
+
+
+def _query_with_leases(
+    snuba_param_list: Sequence[SnubaQueryBody],
+    headers: Mapping[str, str],
+    cache_keys: Sequence[str],
+) -> ResultSet:
+    """
+    Runs the queries for which a lease can be taken in the cache, and
+    publishes their results there for the duration of the lease. For the
+    others, waits until the process holding the lease has published the
+    result. If it fails to or takes longer than the Snuba timeout, the query
+    is run here after all.
+    """
+    timeout = settings.SENTRY_SNUBA_TIMEOUT
+    results: List[Any] = [None] * len(snuba_param_list)
+
+    leased = []
+    waiting = []
+    for index, cache_key in enumerate(cache_keys):
+        flight_id = uuid4().hex
+        if cache.add(f"{cache_key}:lease", flight_id, timeout):
+            leased.append((index, flight_id))
+        else:
+            waiting.append(index)
+
+    if leased:
+        try:
+            leased_results = _bulk_snuba_query(
+                [snuba_param_list[index] for index, _ in leased], headers
+            )
+            for (index, flight_id), result in zip(leased, leased_results):
+                results[index] = result
+                cache.set(f"{cache_keys[index]}:{flight_id}", json.dumps(result), timeout)
+        finally:
+            cache.delete_many([f"{cache_keys[index]}:lease" for index, _ in leased])
+
+    if not waiting:
+        return results
+
+    flights = {index: cache.get(f"{cache_keys[index]}:lease") for index in waiting}
+    unresolved = []
+    deadline = time.time() + timeout
+    while flights:
+        values = cache.get_many(
+            [f"{cache_keys[index]}:{flight_id}" for index, flight_id in flights.items()]
+            + [f"{cache_keys[index]}:lease" for index in flights]
+        )
+        for index, flight_id in list(flights.items()):
+            result = values.get(f"{cache_keys[index]}:{flight_id}")
+            if result is not None:
+                metrics.incr("snuba.query_coalescing.coalesced", tags={"scope": "cluster"})
+                results[index] = json.loads(result)
+                del flights[index]
+            elif flight_id is None or values.get(f"{cache_keys[index]}:lease") != flight_id:
+                # The lease was released without a result, or expired.
+                unresolved.append(index)
+                del flights[index]
+
+        if flights:
+            if time.time() >= deadline:
+                unresolved.extend(flights)
+                break
+            time.sleep(_COALESCING_POLL_INTERVAL)
+
+    if unresolved:
+        metrics.incr("snuba.query_coalescing.unresolved", amount=len(unresolved))
+        unresolved_results = _bulk_snuba_query(
+            [snuba_param_list[index] for index in unresolved], headers
+        )
+        for index, result in zip(unresolved, unresolved_results):
+            results[index] = result
+
+    return results
+
+
 def _bulk_snuba_query(
     snuba_param_list: Sequence[SnubaQueryBody],
     headers: Mapping[str, str],
@@ -855,7 +1075,7 @@ def _bulk_snuba_query(
 
         if len(snuba_param_list) > 1:
             query_results = list(
-                _query_thread_pool.map(
+                _get_query_thread_pool(query_referrer).map(
                     query_fn,
                     [
                         (params, Hub(Hub.current), headers, parent_api)
@@ -868,9 +1088,16 @@ def _bulk_snuba_query(
             query_results = [query_fn((snuba_param_list[0], Hub(Hub.current), headers, parent_api))]
 
     results = []
-    for response, _, reverse in query_results:
+    # Only hold on to one raw response body at a time, rather than to all of them
+    # until every response is decoded.
+    query_results.reverse()
+    while query_results:
+        response, _, reverse = query_results.pop()
+        status, data = response.status, response.data
+        del response
+
         try:
-            body = json.loads(response.data)
+            body = json.loads(data)
             if SNUBA_INFO:
                 if "sql" in body:
                     print(  # NOQA: only prints when an env variable is set
@@ -884,15 +1111,16 @@ def _bulk_snuba_query(
                         "{}.err: {}".format(headers.get("referer", "<unknown>"), body["error"])
                     )
         except ValueError:
-            if response.status != 200:
-                logger.exception("snuba.query.invalid-json", extra={"response.data": response.data})
+            if status != 200:
+                logger.exception("snuba.query.invalid-json", extra={"response.data": data})
                 raise SnubaError("Failed to parse snuba error response")
-            raise UnexpectedResponseError(f"Could not decode JSON response: {response.data}")
+            raise UnexpectedResponseError(f"Could not decode JSON response: {data}")
+        del data
 
-        if response.status != 200:
+        if status != 200:
             if body.get("error"):
                 error = body["error"]
-                if response.status == 429:
+                if status == 429:
                     raise RateLimitExceeded(error["message"])
                 elif error["type"] == "schema":
                     raise SchemaValidationError(error["message"])
@@ -903,10 +1131,14 @@ def _bulk_snuba_query(
                 else:
                     raise SnubaError(error["message"])
             else:
-                raise SnubaError(f"HTTP {response.status}")
-
-        # Forward and reverse translation maps from model ids to snuba keys, per column
-        body["data"] = [reverse(d) for d in body["data"]]
+                raise SnubaError(f"HTTP {status}")
+
+        # Forward and reverse translation maps from model ids to snuba keys, per column.
+        # Rows are replaced in place instead of building a second list of rows.
+        if reverse is not _identity:
+            rows = body["data"]
+            for row_index, row in enumerate(rows):
+                rows[row_index] = reverse(row)
         results.append(body)
 
     return results
@@ -964,8 +1196,12 @@ def _raw_snql_query(
 
         with thread_hub.start_span(op="snuba_snql.run", description=str(request)) as span:
             span.set_tag("snuba.referrer", referrer)
-            return _snuba_pool.urlopen(
-                "POST", f"/{request.dataset}/snql", body=body, headers=headers
+            return _get_snuba_pool(referrer).urlopen(
+                "POST",
+                f"/{request.dataset}/snql",
+                body=body,
+                headers=headers,
+                pool_timeout=settings.SENTRY_SNUBA_TIMEOUT,
             )
 
 
@@ -5,6 +5,7 @@ from django.utils import timezone
 
 from sentry.buffer.base import Buffer
 from sentry.models import Group, Organization, Project, Release, ReleaseProject, Team
+from sentry.signals import buffer_incr_complete
 from sentry.testutils import TestCase
 
 
@@ -69,3 +70,47 @@ class BufferTest(TestCase):
         self.buf.process(Group, columns, filters, {"last_seen": the_date}, signal_only=True)
         group.refresh_from_db()
         assert group.times_seen == prev_times_seen
+
+    def test_process_batch(self):
+        groups = [Group.objects.create(project=self.project) for _ in range(3)]
+        the_date = timezone.now() + timedelta(days=5)
+        rows = [
+            ({"times_seen": 2}, {"id": groups[0].id}, {"last_seen": the_date}),
+            ({"times_seen": 3}, {"id": groups[1].id}, {"last_seen": the_date}),
+            ({"times_seen": 1}, {"id": groups[2].id}, None),
+            ({"times_seen": 1}, {"id": groups[2].id}, None),
+            # deleted groups are skipped
+            ({"times_seen": 1}, {"id": 0}, None),
+        ]
+
+        receiver = mock.Mock()
+        buffer_incr_complete.connect(receiver, sender=Group, weak=False)
+        try:
+            self.buf.process_batch(Group, rows)
+        finally:
+            buffer_incr_complete.disconnect(receiver, sender=Group)
+
+        assert receiver.call_count == 4
+        for group, incr in zip(groups, (2, 3, 2)):
+            group_ = Group.objects.get(id=group.id)
+            assert group_.times_seen == group.times_seen + incr
+        assert Group.objects.get(id=groups[0].id).last_seen == the_date
+        assert Group.objects.get(id=groups[2].id).last_seen == groups[2].last_seen
+        # the cache is kept up to date
+        assert Group.objects.get_from_cache(id=groups[1].id).times_seen == groups[1].times_seen + 3
+
+    def test_process_batch_creates_missing_rows(self):
+        release_project = ReleaseProject.objects.create(project=self.project, release=self.release)
+        other_project = self.create_project()
+        release_id = self.release.id
+        rows = [
+            ({"new_groups": 1}, {"project_id": self.project.id, "release_id": release_id}, {}),
+            ({"new_groups": 2}, {"project_id": other_project.id, "release_id": release_id}, {}),
+        ]
+        self.buf.process_batch(ReleaseProject, rows)
+
+        release_project.refresh_from_db()
+        assert release_project.new_groups == 1
+        assert ReleaseProject.objects.filter(
+            project_id=other_project.id, release_id=self.release.id, new_groups=2
+        ).exists()
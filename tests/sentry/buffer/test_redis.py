@@ -9,6 +9,7 @@ from freezegun import freeze_time
 from sentry.buffer.redis import RedisBuffer
 from sentry.models import Group, Project
 from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
 
 
 class RedisBufferTest(TestCase):
@@ -46,6 +47,38 @@ class RedisBufferTest(TestCase):
         client = self.buf.cluster.get_routing_client()
         assert client.zrange("b:p", 0, -1) == []
 
+    @mock.patch("sentry.buffer.redis.process_incr")
+    def test_process_pending_drain(self, process_incr):
+        self.buf.drain_chunk_size = 2
+        with self.buf.cluster.map() as client:
+            client.zadd("b:p", {"foo": 1, "bar": 2, "baz": 3})
+        with override_options({"buffer.redis.drain-pending": True}):
+            self.buf.process_pending()
+        assert process_incr.apply_async.mock_calls == [
+            mock.call(kwargs={"batch_keys": ["foo", "bar"], "pipelined": True}),
+            mock.call(kwargs={"batch_keys": ["baz"], "pipelined": True}),
+        ]
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange("b:p", 0, -1) == []
+
+    @mock.patch("sentry.buffer.base.Buffer.process_batch")
+    def test_process_pipelined(self, process_batch):
+        client = self.buf.cluster.get_routing_client()
+        client.hmset(
+            "foo",
+            {"f": '{"pk": ["i","1"]}', "i+times_seen": "2", "m": "sentry.models.Group"},
+        )
+        client.hmset(
+            "bar",
+            {"f": '{"pk": ["i","2"]}', "i+times_seen": "3", "m": "sentry.models.Group"},
+        )
+        self.buf.process(batch_keys=["foo", "bar", "missing"], pipelined=True)
+        process_batch.assert_called_once_with(
+            Group, [({"times_seen": 2}, {"pk": 1}, {}), ({"times_seen": 3}, {"pk": 2}, {})]
+        )
+        assert not client.exists("foo")
+        assert not client.exists("bar")
+
     @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
     @mock.patch("sentry.buffer.base.Buffer.process")
     def test_process_does_bubble_up_json(self, process):
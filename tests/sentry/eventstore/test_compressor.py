@@ -52,3 +52,34 @@ def test_basic():
             }
         },
     )
+
+
+def test_subtrees():
+    sdk = {"name": "sentry.cocoa", "version": "8.0.0", "integrations": ["Crash"] * 30}
+    data = {
+        "sdk": sdk,
+        "contexts": {"os": {"name": "iOS"}, "device": {"model": "iPhone14,2" * 20}},
+        "request": {"headers": [["Accept", "*/*"]]},
+    }
+
+    new_data, extra_keys = deduplicate(data)
+
+    # the input is left untouched
+    assert data["sdk"] is sdk
+    assert data["contexts"]["device"]
+
+    assert "sdk" not in new_data
+    assert "device" not in new_data["contexts"]
+    # small sub-trees stay inline
+    assert new_data["contexts"]["os"] == {"name": "iOS"}
+    assert new_data["request"] == {"headers": [["Accept", "*/*"]]}
+    assert len(extra_keys) == 2
+
+    _assert_roundtrip(data)
+
+
+def test_missing_extra_keys():
+    data = {"foo": "bar", "sdk": {"name": "sentry.python", "packages": ["pip"] * 50}}
+    new_data, _ = deduplicate(data)
+
+    assert assemble(new_data, lambda checksums: {}) == {"foo": "bar"}
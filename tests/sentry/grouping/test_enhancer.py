@@ -1,7 +1,12 @@
 import pytest
 
 from sentry.grouping.component import GroupingComponent
-from sentry.grouping.enhancer import Enhancements, InvalidEnhancerConfig, create_match_frame
+from sentry.grouping.enhancer import (
+    Enhancements,
+    InvalidEnhancerConfig,
+    _build_frame_index,
+    create_match_frame,
+)
 
 
 def dump_obj(obj):
@@ -442,3 +447,45 @@ def test_app_no_matches(frame):
     enhancements = Enhancements.from_config_string("app:no +app")
     enhancements.apply_modifications_to_frame([frame], "native", None)
     assert frame.get("in_app")
+
+
+def test_frame_index():
+    enhancement = Enhancements.from_config_string(
+        """
+        function:foo                      +app
+        module:bar.baz function:foo*      -group
+        !function:foo                     category=other
+        function:foo | [ function:main ]  +group
+        function:f?o                      -app
+    """
+    )
+
+    frames = [
+        {"function": "main", "module": "bar.baz"},
+        {"function": "foo", "module": "bar.baz"},
+        {"function": "foobar", "module": "bar.baz"},
+        {"function": "foo"},
+    ]
+    match_frames = [create_match_frame(frame, "python") for frame in frames]
+    frame_index = _build_frame_index(match_frames)
+
+    assert [rule.index_key for rule in enhancement.rules] == [
+        ("function", b"foo"),
+        ("module", b"bar.baz"),
+        None,
+        ("function", b"foo"),
+        None,
+    ]
+
+    for rule in enhancement.rules:
+        assert rule.get_matching_frame_actions(
+            match_frames, "python", None, {}, frame_index
+        ) == rule.get_matching_frame_actions(match_frames, "python", None, {})
+
+    assert _get_matching_frame_actions(enhancement.rules[0], frames, "python") == [
+        (1, enhancement.rules[0].actions[0]),
+        (3, enhancement.rules[0].actions[0]),
+    ]
+    assert not enhancement.rules[0].get_matching_frame_actions(
+        match_frames[:1], "python", None, {}, _build_frame_index(match_frames[:1])
+    )
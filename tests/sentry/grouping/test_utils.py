@@ -0,0 +1,43 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from sentry.grouping.utils import get_cached_rules, get_rules_cache
+
+
+def test_get_cached_rules():
+    get_rules_cache.cache_clear()
+    try:
+        load = mock.Mock(side_effect=lambda: object())
+
+        with override_settings(SENTRY_GROUPING_RULES_CACHE_SIZE=2):
+            first = get_cached_rules("enhancements", "a", load)
+            assert get_cached_rules("enhancements", "a", load) is first
+            assert load.call_count == 1
+
+            # Kinds are cached separately
+            assert get_cached_rules("fingerprinting", "a", load) is not first
+            assert load.call_count == 2
+
+            # A changed config means a new hash, the oldest entry is evicted
+            get_cached_rules("enhancements", "b", load)
+            assert get_cached_rules("enhancements", "a", load) is not first
+            assert load.call_count == 4
+
+            assert get_rules_cache().stats()["hits"] == 1
+    finally:
+        get_rules_cache.cache_clear()
+
+
+def test_get_cached_rules_disabled():
+    get_rules_cache.cache_clear()
+    try:
+        load = mock.Mock(side_effect=lambda: object())
+
+        with override_settings(SENTRY_GROUPING_RULES_CACHE_SIZE=0):
+            assert get_cached_rules("enhancements", "a", load) is not get_cached_rules(
+                "enhancements", "a", load
+            )
+            assert load.call_count == 2
+    finally:
+        get_rules_cache.cache_clear()
@@ -8,13 +8,17 @@ from unittest.mock import Mock
 import pytest
 
 from sentry.event_manager import EventManager
+from sentry.eventstore.processing import event_processing_store
 from sentry.ingest.ingest_consumer import (
+    IngestConsumerWorker,
     process_attachment_chunk,
     process_event,
+    process_event_batch,
     process_individual_attachment,
     process_userreport,
 )
 from sentry.models import EventAttachment, EventUser, File, UserReport, create_files_from_dif_zip
+from sentry.testutils.factories import Factories
 from sentry.testutils.helpers.options import override_options
 from sentry.utils import json
 
@@ -82,6 +86,77 @@ def test_deduplication_works(default_project, task_runner, preprocess_event):
     }
 
 
+@pytest.mark.django_db
+def test_process_event_batch(default_project, task_runner, preprocess_event):
+    other_project = Factories.create_project(organization=default_project.organization)
+    projects = {default_project.id: default_project, other_project.id: other_project}
+    start_time = time.time() - 3600
+
+    def make_message(project):
+        payload = get_normalized_event({"message": "hello world"}, project)
+        return {
+            "payload": json.dumps(payload),
+            "start_time": start_time,
+            "event_id": payload["event_id"],
+            "project_id": project.id,
+            "remote_addr": "127.0.0.1",
+        }
+
+    first, second, third = (
+        make_message(default_project),
+        make_message(other_project),
+        make_message(default_project),
+    )
+
+    # Events already processed on their own are skipped
+    process_event(first, projects=projects)
+    assert len(preprocess_event) == 1
+
+    process_event_batch([first, second, third, second], projects)
+
+    # Events keep their order, and duplicates within the batch are skipped
+    assert [(kwargs["event_id"], kwargs["project"]) for kwargs in preprocess_event[1:]] == [
+        (second["event_id"], other_project),
+        (third["event_id"], default_project),
+    ]
+    for kwargs in preprocess_event[1:]:
+        assert kwargs["cache_key"] == f"e:{kwargs['event_id']}:{kwargs['project'].id}"
+        assert event_processing_store.get(kwargs["cache_key"]) == kwargs["data"]
+
+    # All events are marked as processed
+    process_event_batch([first, second, third], projects)
+    assert len(preprocess_event) == 3
+
+
+@pytest.mark.django_db
+def test_batch_events_keep_order(default_project, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "sentry.ingest.ingest_consumer.process_event_batch",
+        lambda messages, projects: calls.append([m["event_id"] for m in messages]),
+    )
+    monkeypatch.setattr(
+        "sentry.ingest.ingest_consumer.process_userreport",
+        lambda message, projects: calls.append(message["event_id"]),
+    )
+
+    def make_message(message_type, event_id):
+        return {"type": message_type, "event_id": event_id, "project_id": default_project.id}
+
+    with override_options({"store.ingest-consumer-batch-events": True}):
+        IngestConsumerWorker()._flush_batch(
+            [
+                make_message("event", "a"),
+                make_message("event", "b"),
+                make_message("user_report", "c"),
+                make_message("event", "d"),
+            ]
+        )
+
+    # Consecutive events are batched, but not moved ahead of other messages.
+    assert calls == [["a", "b"], "c", ["d"]]
+
+
 @pytest.mark.django_db
 def test_transactions_spawn_save_event_transaction(
     default_project,
@@ -0,0 +1,43 @@
+import msgpack
+
+from sentry.ingest.message_decoder import PARSED_PAYLOAD_KEY, MessageDecoder, decode_message
+from sentry.utils import json
+
+
+def _event_message(event_id):
+    return msgpack.packb(
+        {
+            "type": "event",
+            "event_id": event_id,
+            "project_id": 1,
+            "payload": json.dumps({"event_id": event_id, "message": "hello"}),
+        }
+    )
+
+
+def test_decode_message():
+    message = decode_message(_event_message("a" * 32))
+    assert message["event_id"] == "a" * 32
+    assert PARSED_PAYLOAD_KEY not in message
+
+    message = decode_message(_event_message("a" * 32), parse_payload=True)
+    assert message[PARSED_PAYLOAD_KEY] == {"event_id": "a" * 32, "message": "hello"}
+
+    message = decode_message(msgpack.packb({"type": "user_report", "payload": "{}"}), True)
+    assert PARSED_PAYLOAD_KEY not in message
+
+
+def test_message_decoder():
+    values = [_event_message(f"{i:032x}") for i in range(10)]
+
+    # Small enough that only some of the messages fit in shared memory.
+    decoder = MessageDecoder(2, block_size=len(values[0]) * 4)
+    try:
+        messages = decoder.decode(values)
+        assert decoder.decode([]) == []
+    finally:
+        decoder.close()
+
+    assert [m["event_id"] for m in messages] == [f"{i:032x}" for i in range(10)]
+    assert all(m[PARSED_PAYLOAD_KEY]["event_id"] == m["event_id"] for m in messages)
+    assert all(m["payload"] is None for m in messages)
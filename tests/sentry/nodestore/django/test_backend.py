@@ -5,7 +5,7 @@ from unittest import mock
 import pytest
 from django.utils import timezone
 
-from sentry.nodestore.base import json_dumps
+from sentry.nodestore.base import SUBDOCUMENT_KEY_PREFIX, json_dumps
 from sentry.nodestore.django.backend import DjangoNodeStorage
 from sentry.nodestore.django.models import Node
 from sentry.testutils.silo import region_silo_test
@@ -82,6 +82,16 @@ class TestDjangoNodeStorage:
         assert Node.objects.filter(id=node.id).exists()
         assert not Node.objects.filter(id=node2.id).exists()
 
+    def test_cleanup_subdocuments(self):
+        self.ns._set_bytes("a" * 32, b'{"foo": "bar"}')
+        self.ns._set_bytes(SUBDOCUMENT_KEY_PREFIX + "b" * 32, b'{"foo": "bar"}')
+
+        # Sub-documents outlive events written at the same time.
+        self.ns.cleanup(timezone.now())
+
+        assert not Node.objects.filter(id="a" * 32).exists()
+        assert Node.objects.filter(id=SUBDOCUMENT_KEY_PREFIX + "b" * 32).exists()
+
     def test_cache(self):
         node_1 = ("a" * 32, {"foo": "a"})
         node_2 = ("b" * 32, {"foo": "b"})
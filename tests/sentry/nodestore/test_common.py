@@ -3,10 +3,16 @@ Testsuite of backend-independent nodestore tests. Add your backend to the
 `ns` fixture to have it tested.
 """
 from contextlib import nullcontext
+from datetime import timedelta
+from unittest import mock
 
 import pytest
+from django.test import override_settings
 
+from sentry.nodestore.base import FRAMED_MAGIC, _written_subdocuments, get_lru_cache
+from sentry.nodestore.compression import HEADER_MAGIC
 from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.testutils.helpers.options import override_options
 from sentry.testutils.silo import region_silo_test
 from tests.sentry.nodestore.bigtable.test_backend import (
     MockedBigtableNodeStorage,
@@ -97,3 +103,103 @@ def test_set_subkeys(ns):
     ns.delete("node_1")
     assert ns.get("node_1") is None
     assert ns.get("node_1", subkey="other") is None
+
+
+@region_silo_test(stable=True)
+def test_set_subkeys_framed(ns):
+    with override_options({"nodestore.framed-subkeys": True}):
+        ns.set_subkeys("node_1", {None: {"foo": "a"}, "other": {"foo": "b"}})
+        assert ns._get_bytes("node_1").startswith(FRAMED_MAGIC)
+
+    assert ns.get("node_1") == {"foo": "a"}
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+    assert ns.get("node_1", subkey="missing") is None
+    assert ns.get_multi(["node_1"], subkey="other") == {"node_1": {"foo": "b"}}
+
+    # Blobs written in the legacy format remain readable once framing is on.
+    ns.set_subkeys("node_2", {None: {"foo": "c"}, "other": {"foo": "d"}})
+    with override_options({"nodestore.framed-subkeys": True}):
+        assert ns.get("node_2") == {"foo": "c"}
+        assert ns.get("node_2", subkey="other") == {"foo": "d"}
+
+
+@region_silo_test(stable=True)
+def test_set_compressed(ns):
+    with override_options({"nodestore.compression": "zstd", "nodestore.framed-subkeys": True}):
+        ns.set_subkeys("node_1", {None: {"foo": "a"}, "other": {"foo": "b"}})
+        assert ns._get_bytes("node_1").startswith(HEADER_MAGIC)
+
+    assert ns.get("node_1") == {"foo": "a"}
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+
+
+@region_silo_test(stable=True)
+def test_set_dedup_subtrees(ns):
+    sdk = {"name": "sentry.native", "version": "0.5.0", "integrations": ["crashpad"] * 20}
+    images = [{"debug_id": f"{i:032x}", "code_file": f"/usr/lib/lib{i}.so"} for i in range(10)]
+    nodes = {
+        "node_1": {"foo": "a", "sdk": sdk, "debug_meta": {"images": images}},
+        "node_2": {"foo": "b", "sdk": sdk, "debug_meta": {"images": images}},
+    }
+
+    with override_options({"nodestore.dedup-subtrees": True}):
+        for node_id, data in nodes.items():
+            ns.set(node_id, data)
+
+    assert nodes["node_1"]["sdk"] == sdk
+    assert "__nodestore_patchsets" in ns._decode(ns._get_bytes("node_1"), subkey=None)
+
+    ns._delete_cache_items(list(nodes))
+    assert ns.get("node_1") == nodes["node_1"]
+
+    ns._delete_cache_items(list(nodes))
+    result = ns.get_multi(list(nodes))
+    assert result == nodes
+
+    # Sub-documents are not shared between payloads.
+    result["node_1"]["sdk"]["name"] = "sentry.python"
+    assert result["node_2"]["sdk"] == sdk
+
+
+@region_silo_test(stable=True)
+def test_set_subdocuments_ttl(ns):
+    _written_subdocuments.clear()
+    with mock.patch.object(ns, "_set_bytes", wraps=ns._set_bytes) as set_bytes:
+        ns._set_subdocuments({"abc": {"foo": "a"}}, ttl=timedelta(days=2))
+        assert set_bytes.call_count == 1
+
+        # Sub-documents are not rewritten within the refresh interval...
+        ns._set_subdocuments({"abc": {"foo": "a"}}, ttl=timedelta(days=1))
+        assert set_bytes.call_count == 1
+
+        # ...unless the payload would outlive them.
+        ns._set_subdocuments({"abc": {"foo": "a"}}, ttl=timedelta(days=3))
+        assert set_bytes.call_count == 2
+    _written_subdocuments.clear()
+
+
+@region_silo_test(stable=True)
+def test_lru_cache(ns):
+    get_lru_cache.cache_clear()
+    try:
+        with override_settings(SENTRY_NODESTORE_LRU_CACHE_SIZE=1024 * 1024):
+            lru_cache = get_lru_cache()
+
+            ns.set("node_1", {"foo": "a"})
+            assert "node_1" not in lru_cache
+
+            assert ns.get("node_1") == {"foo": "a"}
+            assert "node_1" in lru_cache
+            # Every caller gets its own copy.
+            ns.get("node_1")["foo"] = "b"
+            assert ns.get("node_1") == {"foo": "a"}
+            assert lru_cache.stats()["hits"] == 2
+
+            assert ns.get_multi(["node_1"]) == {"node_1": {"foo": "a"}}
+            assert lru_cache.stats()["hits"] == 3
+
+            ns.delete("node_1")
+            assert "node_1" not in lru_cache
+            assert ns.get("node_1") is None
+    finally:
+        get_lru_cache.cache_clear()
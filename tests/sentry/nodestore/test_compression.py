@@ -0,0 +1,51 @@
+import pytest
+from django.test import override_settings
+
+from sentry.nodestore import compression
+
+
+def test_uncompressed_passthrough():
+    assert compression.decompress(b'{"foo":"bar"}') == b'{"foo":"bar"}'
+
+
+@pytest.mark.parametrize("codec_name", ["zlib", "zstd"])
+def test_roundtrip(codec_name):
+    value = b'{"foo":"bar"}' * 100
+    compressed = compression.compress(value, codec_name)
+    assert compressed.startswith(compression.HEADER_MAGIC)
+    assert len(compressed) < len(value)
+    assert compression.decompress(compressed) == value
+
+
+def test_unknown_codec_id():
+    with pytest.raises(ValueError):
+        compression.decompress(compression.HEADER_MAGIC + b"\xff\x00\x00\x00\x00payload")
+
+
+def test_dictionary(tmp_path):
+    samples = [
+        {
+            "platform": "python",
+            "event_id": f"{i:032x}",
+            "sdk": {"name": "sentry.python", "version": "1.9.0"},
+            "tags": [["level", "error"], ["server_name", f"web-{i % 7}"]],
+            "message": f"Something went wrong {i}",
+        }
+        for i in range(1000)
+    ]
+    dictionary = compression.train_dictionary(samples, dict_size=4096)
+    path = tmp_path / "python.dict"
+    path.write_bytes(dictionary)
+
+    value = b'{"platform":"python","sdk":{"name":"sentry.python","version":"1.9.0"}}'
+    compression._get_dictionaries.cache_clear()
+    try:
+        with override_settings(SENTRY_NODESTORE_ZSTD_DICTIONARIES={"python": str(path)}):
+            with_dictionary = compression.compress(value, "zstd", platform="python")
+            without_dictionary = compression.compress(value, "zstd", platform="javascript")
+
+            assert len(with_dictionary) < len(without_dictionary)
+            assert compression.decompress(with_dictionary) == value
+            assert compression.decompress(without_dictionary) == value
+    finally:
+        compression._get_dictionaries.cache_clear()
@@ -235,3 +235,41 @@ def test_regression_mixed_order(limiter: RedisCardinalityLimiter):
     # there used to be a bug where anything after 10 (i.e. 5) was dropped as
     # well (due to a wrong `break` somewhere in a loop)
     assert helper.add_values([0, 1, 2, 3, 4, 6, 7, 8, 9, 10, 5]) == [0, 1, 2, 3, 4, 6, 7, 8, 9, 5]
+
+
+def test_local_sync(limiter: RedisCardinalityLimiter):
+    """
+    With `local_sync_interval`, checks that are clearly within the limit are
+    answered locally and writes are batched.
+    """
+    remote_limiter = RedisCardinalityLimiter()
+    remote_limiter.backend = limiter.backend
+    remote_helper = LimiterHelper(remote_limiter)
+
+    def check_remote(values):
+        request = RequestedQuota(prefix="hello", unit_hashes=values, quota=remote_helper.quota)
+        _, (grant,) = remote_limiter.check_within_quotas([request], timestamp=3600)
+        return grant.granted_unit_hashes
+
+    limiter.local_sync_interval = 3600
+    limiter.local_error_margin = 0.5
+    helper = LimiterHelper(limiter)
+
+    # Nothing known locally yet, goes to Redis. The write is held back.
+    assert helper.add_value(1) == 1
+    assert check_remote(range(100, 120)) == list(range(100, 110))
+
+    # Well within the limit, admitted without asking Redis.
+    assert helper.add_values([1, 2, 3, 4]) == [1, 2, 3, 4]
+    assert check_remote(range(100, 120)) == list(range(100, 110))
+
+    # Close to the limit, pending writes are flushed and Redis is asked.
+    assert helper.add_values([5, 6]) == [5, 6]
+    assert check_remote(range(100, 120)) == list(range(100, 106))
+    assert helper.add_values(range(10, 20)) == list(range(10, 14))
+
+    # The last grant is still pending, and sent on close without another
+    # check or use.
+    assert check_remote(range(100, 120)) == list(range(100, 104))
+    limiter.close()
+    assert check_remote(range(100, 120)) == []
@@ -8,9 +8,9 @@ from sentry.ratelimits.sliding_windows import (
 )
 
 
-@pytest.fixture
-def limiter():
-    return RedisSlidingWindowRateLimiter()
+@pytest.fixture(params=[False, True], ids=["non-atomic", "atomic"])
+def limiter(request):
+    return RedisSlidingWindowRateLimiter(atomic=request.param)
 
 
 TIMESTAMP_OFFSET = 100
@@ -121,3 +121,29 @@ def test_conflicting_quotas(limiter):
         GrantedQuota(prefix="foo", granted=6, reached_quotas=[]),
         GrantedQuota(prefix="bar", granted=4, reached_quotas=quotas),
     ]
+
+
+def test_atomic_multiple_prefixes():
+    limiter = RedisSlidingWindowRateLimiter(atomic=True)
+    global_quota = Quota(window_seconds=10, granularity_seconds=1, limit=8, prefix_override="g")
+    org_quota = Quota(window_seconds=10, granularity_seconds=1, limit=5)
+
+    resp = limiter.check_and_use_quotas(
+        [
+            RequestedQuota(prefix="foo", requested=4, quotas=[org_quota, global_quota]),
+            RequestedQuota(prefix="bar", requested=6, quotas=[org_quota, global_quota]),
+        ],
+        timestamp=TIMESTAMP_OFFSET,
+    )
+    assert resp == [
+        GrantedQuota(prefix="foo", granted=4, reached_quotas=[]),
+        GrantedQuota(prefix="bar", granted=4, reached_quotas=[org_quota, global_quota]),
+    ]
+
+    # "bar" was granted 5 by its own quota at first, the unused unit has
+    # been given back.
+    timestamp, grants = limiter.check_within_quotas(
+        [RequestedQuota(prefix="bar", requested=5, quotas=[org_quota])],
+        timestamp=TIMESTAMP_OFFSET,
+    )
+    assert grants == [GrantedQuota(prefix="bar", granted=1, reached_quotas=[org_quota])]
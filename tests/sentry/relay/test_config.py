@@ -17,7 +17,7 @@ from sentry.dynamic_sampling import (
 )
 from sentry.models import ProjectKey, ProjectTeam
 from sentry.models.transaction_threshold import TransactionMetric
-from sentry.relay.config import ProjectConfig, get_project_config
+from sentry.relay.config import ProjectConfig, get_project_config, share_organization_results
 from sentry.testutils.factories import Factories
 from sentry.testutils.helpers import Feature
 from sentry.testutils.helpers.options import override_options
@@ -206,6 +206,31 @@ def test_project_config_exposed_features(default_project):
     assert cfg_features == ["projects:custom-inbound-filters"]
 
 
+@pytest.mark.django_db
+@region_silo_test(stable=True)
+@mock.patch("sentry.relay.config.EXPOSABLE_FEATURES", ["organizations:profiling"])
+def test_share_organization_results(default_project):
+    other_project = Factories.create_project(organization=default_project.organization)
+
+    def has_profiling(feature, *args, **kwargs):
+        return feature == "organizations:profiling"
+
+    with mock.patch("sentry.relay.config.features.has", side_effect=has_profiling) as has:
+        with share_organization_results():
+            get_project_config(default_project, full_config=True)
+            get_project_config(other_project, full_config=True)
+
+    profiling_calls = [c for c in has.call_args_list if c.args[0] == "organizations:profiling"]
+    assert len(profiling_calls) == 1
+
+    with mock.patch("sentry.relay.config.features.has", side_effect=has_profiling) as has:
+        get_project_config(default_project, full_config=True)
+        get_project_config(other_project, full_config=True)
+
+    profiling_calls = [c for c in has.call_args_list if c.args[0] == "organizations:profiling"]
+    assert len(profiling_calls) == 2
+
+
 @pytest.mark.django_db
 @region_silo_test(stable=True)
 @mock.patch("sentry.relay.config.EXPOSABLE_FEATURES", ["badprefix:custom-inbound-filters"])
@@ -24,3 +24,48 @@ def test_read_write():
     my_key = "fake-dsn-1"
     cache.set_many({my_key: "my-value"})
     assert cache.get(my_key) == "my-value"
+
+
+@pytest.mark.django_db
+def test_local_cache(monkeypatch):
+    cache = redis.RedisProjectConfigCache(local_cache_size=1024 * 1024)
+    cache.set_many({"a": {"foo": 1}})
+
+    loads = mock.Mock(wraps=redis.json.loads)
+    monkeypatch.setattr(redis.json, "loads", loads)
+
+    assert cache.get("a") == {"foo": 1}
+    assert cache.get("a") == {"foo": 1}
+    assert loads.call_count == 1
+
+    cache.set_many({"a": {"foo": 2}})
+    assert cache.get("a") == {"foo": 2}
+    assert loads.call_count == 2
+
+    cache.delete_many(["a"])
+    assert cache.get("a") is None
+
+
+@pytest.mark.django_db
+def test_changed_since():
+    redis.RedisProjectConfigCache().delete_many(["a", "b", "c"])
+    cache = redis.RedisProjectConfigCache(changes_retained=2)
+    cache.cluster.delete(redis.REVISION_KEY, redis.CHANGES_KEY, redis.TRIMMED_KEY)
+    assert cache.get_changed_since(0) == (0, [])
+
+    cache.set_many({"a": {"foo": 1}, "b": {"foo": 1}})
+    revision = cache.get_revision()
+    assert revision == 1
+    assert cache.get_changed_since(0) == (1, ["a", "b"])
+
+    # Unchanged configs are not recorded.
+    cache.set_many({"a": {"foo": 1}, "b": {"foo": 2}})
+    assert cache.get_changed_since(revision) == (2, ["b"])
+
+    cache.delete_many(["a", "c"])
+    assert cache.get_changed_since(revision) == (3, ["b", "a"])
+
+    # Changes from revision 1 have been trimmed.
+    cache.set_many({"c": {"foo": 1}})
+    assert cache.get_changed_since(0) is None
+    assert cache.get_changed_since(2) == (4, ["a", "c"])
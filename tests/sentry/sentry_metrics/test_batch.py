@@ -208,6 +208,33 @@ def test_extract_strings_with_rollout(should_index_tag_values, expected):
     assert batch.extract_strings() == expected
 
 
+def test_extract_strings_string_table():
+    """
+    Test that every distinct string of the batch is stored once, and that
+    messages refer to their strings by index.
+    """
+    outer_message = _construct_outer_message(
+        [
+            (counter_payload, []),
+            (distribution_payload, []),
+            (set_payload, []),
+        ]
+    )
+    batch = IndexerBatch(UseCaseKey.PERFORMANCE, outer_message, True, False)
+    batch.extract_strings()
+
+    assert sorted(batch.strings) == sorted(extracted_string_output[1])
+    encoded = batch.encoded_messages[PartitionIdxOffset(0, 0)]
+    assert encoded.org_id == 1
+    assert batch.strings[encoded.name] == counter_payload["name"]
+    assert [batch.strings[idx] for idx in encoded.tags] == [
+        "environment",
+        "production",
+        "session.status",
+        "init",
+    ]
+
+
 def test_all_resolved(caplog, settings):
     settings.SENTRY_METRICS_INDEXER_DEBUG_LOG_SAMPLE_RATE = 1.0
     outer_message = _construct_outer_message(
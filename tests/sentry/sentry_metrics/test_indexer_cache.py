@@ -1,8 +1,9 @@
 import pytest
 from django.conf import settings
+from django.test import override_settings
 
 from sentry.sentry_metrics.configuration import UseCaseKey
-from sentry.sentry_metrics.indexer.cache import StringIndexerCache
+from sentry.sentry_metrics.indexer.cache import StringIndexerCache, get_local_cache
 from sentry.utils.cache import cache
 from sentry.utils.hashlib import md5_text
 
@@ -71,3 +72,32 @@ def test_separate_namespacing() -> None:
     indexer_cache.set("a", 2, UseCaseKey.PERFORMANCE.value)
     assert indexer_cache.get("a", UseCaseKey.RELEASE_HEALTH.value) == 1
     assert indexer_cache.get("a", UseCaseKey.PERFORMANCE.value) == 2
+
+
+def test_local_cache(use_case_id: str) -> None:
+    cache.clear()
+    get_local_cache.cache_clear()
+    try:
+        with override_settings(SENTRY_METRICS_INDEXER_LOCAL_CACHE_SIZE=100):
+            local_cache = get_local_cache()
+
+            indexer_cache.set_many({"1:hello": 2}, use_case_id)
+            assert indexer_cache.reverse_get(1, 2, use_case_id) == "hello"
+            local_cache.clear()
+
+            # Filled from memcached hits, including the reverse mapping.
+            assert indexer_cache.get_many(["1:hello", "1:bye"], use_case_id) == {
+                "1:hello": 2,
+                "1:bye": None,
+            }
+            assert indexer_cache.reverse_get(1, 2, use_case_id) == "hello"
+
+            cache.clear()
+            assert indexer_cache.get_many(["1:hello"], use_case_id) == {"1:hello": 2}
+            assert indexer_cache.get("1:hello", use_case_id) == 2
+            assert indexer_cache.reverse_get(1, 3, use_case_id) is None
+
+            indexer_cache.delete("1:hello", use_case_id)
+            assert indexer_cache.get("1:hello", use_case_id) is None
+    finally:
+        get_local_cache.cache_clear()
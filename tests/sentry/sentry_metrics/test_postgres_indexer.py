@@ -6,6 +6,7 @@ from sentry.sentry_metrics.indexer.cache import CachingIndexer
 from sentry.sentry_metrics.indexer.postgres.models import StringIndexer
 from sentry.sentry_metrics.indexer.postgres.postgres_v2 import PGStringIndexerV2, indexer_cache
 from sentry.testutils.cases import TestCase
+from sentry.testutils.helpers.options import override_options
 from sentry.utils.cache import cache
 
 
@@ -41,3 +42,27 @@ class PostgresIndexerV2Test(TestCase):
 
         assert indexer_cache.get(string.id, self.cache_namespace) is None
         assert indexer_cache.get(key, self.cache_namespace) is None
+
+    def test_insert_returning(self):
+        existing = StringIndexer.objects.create(organization_id=self.org2.id, string="hey")
+
+        with override_options({"sentry-metrics.indexer.postgres.insert-returning": True}):
+            created = self.indexer.indexer._insert_returning(
+                StringIndexer, KeyCollection({self.org2.id: {"hello", "hey"}})
+            )
+            assert [(r.org_id, r.string) for r in created] == [(self.org2.id, "hello")]
+
+            results = self.indexer.indexer.bulk_record(
+                use_case_id=self.use_case_id, org_strings={self.org2.id: self.strings}
+            )
+
+        rows = {
+            obj.string: obj.id for obj in StringIndexer.objects.filter(organization_id=self.org2.id)
+        }
+        assert rows["hey"] == existing.id
+        assert rows["hello"] == created[0].id
+        assert results[self.org2.id] == rows
+
+        meta = results.get_fetch_metadata()[self.org2.id]
+        assert_fetch_type_for_tag_string_set(meta, FetchType.DB_READ, {"hello", "hey"})
+        assert_fetch_type_for_tag_string_set(meta, FetchType.FIRST_SEEN, {"hi"})
@@ -9,6 +9,7 @@ from sentry.models.transaction_threshold import TransactionMetric
 from sentry.snuba import discover
 from sentry.testutils import SnubaTestCase, TestCase
 from sentry.testutils.helpers.datetime import before_now, iso_format
+from sentry.testutils.helpers.options import override_options
 from sentry.utils.samples import load_data
 from sentry.utils.snuba import Dataset
 
@@ -369,6 +370,65 @@ class TimeseriesQueryTest(TimeseriesBase):
             val["count"] for val in result.data["data"] if "count" in val
         ], result.data["data"]
 
+    def test_timeseries_cache(self):
+        def query(hours):
+            result = discover.timeseries_query(
+                selected_columns=["count()"],
+                query="",
+                params={
+                    "start": self.day_ago,
+                    "end": self.day_ago + timedelta(hours=hours),
+                    "project_id": [self.project.id],
+                },
+                rollup=3600,
+            )
+            return [val.get("count", 0) for val in result.data["data"]]
+
+        with override_options({"discover.timeseries-cache": True}):
+            assert query(2) == [0, 2, 0]
+
+            self.store_event(
+                data={
+                    "event_id": "d" * 32,
+                    "message": "very bad",
+                    "timestamp": iso_format(self.day_ago + timedelta(hours=1, minutes=5)),
+                    "fingerprint": ["group1"],
+                },
+                project_id=self.project.id,
+            )
+
+            # The complete buckets are cached, only the new one is queried.
+            assert query(3) == [0, 2, 1, 0]
+
+        assert query(3) == [0, 3, 1, 0]
+
+    def test_timeseries_cache_comparison(self):
+        self.store_event(
+            data={"timestamp": iso_format(self.day_ago + timedelta(days=-1, hours=1))},
+            project_id=self.project.id,
+        )
+
+        def query():
+            result = discover.timeseries_query(
+                selected_columns=["count()"],
+                query="",
+                params={
+                    "start": self.day_ago,
+                    "end": self.day_ago + timedelta(hours=2),
+                    "project_id": [self.project.id],
+                },
+                rollup=3600,
+                comparison_delta=timedelta(days=1),
+            )
+            return [
+                (val.get("count", 0), val.get("comparisonCount", 0)) for val in result.data["data"]
+            ]
+
+        with override_options({"discover.timeseries-cache": True}):
+            # The comparison query has an entry of its own.
+            assert query() == [(0, 0), (3, 1), (0, 0)]
+            assert query() == [(0, 0), (3, 1), (0, 0)]
+
     def test_conditional_filter(self):
         project2 = self.create_project(organization=self.organization)
         project3 = self.create_project(organization=self.organization)
@@ -2,6 +2,7 @@ from unittest import mock
 
 from sentry.tasks.process_buffer import process_incr, process_pending
 from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
 
 
 class ProcessIncrTest(TestCase):
@@ -25,3 +26,11 @@ class ProcessPendingTest(TestCase):
         process_pending(partition=1)
         assert len(mock_process_pending.mock_calls) == 2
         mock_process_pending.assert_any_call(partition=1)
+
+    @mock.patch("sentry.locks.locks.get")
+    @mock.patch("sentry.buffer.backend.process_pending")
+    def test_drain_without_lock(self, mock_process_pending, mock_get_lock):
+        with override_options({"buffer.redis.drain-pending": True}):
+            process_pending()
+        mock_process_pending.assert_called_once_with(partition=None)
+        assert not mock_get_lock.called
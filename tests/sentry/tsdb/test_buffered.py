@@ -0,0 +1,95 @@
+import time
+from datetime import datetime, timedelta
+from unittest import TestCase, mock
+
+import pytz
+
+from sentry.tsdb.base import ONE_DAY, ONE_HOUR, ONE_MINUTE, TSDBModel
+from sentry.tsdb.buffered import BufferedTSDB
+from sentry.tsdb.inmemory import InMemoryTSDB
+
+ROLLUPS = (
+    (10, 30),
+    (ONE_MINUTE, 120),
+    (ONE_HOUR, 24),
+    (ONE_DAY, 30),
+)
+
+
+class BufferedTSDBTest(TestCase):
+    def create_tsdb(self, **options):
+        return BufferedTSDB(
+            backend="sentry.tsdb.inmemory.InMemoryTSDB",
+            backend_options={"rollups": ROLLUPS},
+            rollups=ROLLUPS,
+            # Only flush explicitly.
+            flush_interval=3600,
+            **options,
+        )
+
+    def test_incr(self):
+        tsdb = self.create_tsdb()
+        assert isinstance(tsdb.backend, InMemoryTSDB)
+        assert tsdb.bucket_size == 10
+
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        start = now - timedelta(hours=1)
+
+        tsdb.incr(TSDBModel.project, 1, now)
+        tsdb.incr(TSDBModel.project, 1, now, count=2, environment_id=1)
+        tsdb.incr_multi([(TSDBModel.project, 1), (TSDBModel.group, 2)], now)
+        tsdb.incr_many([([(TSDBModel.project, 1, {"count": 4})], now, None)])
+
+        # Nothing is written before a flush.
+        assert tsdb.get_sums(TSDBModel.project, [1], start, now) == {1: 0}
+
+        tsdb.flush_buffer()
+        assert tsdb.get_sums(TSDBModel.project, [1], start, now) == {1: 8}
+        assert tsdb.get_sums(TSDBModel.project, [1], start, now, environment_id=1) == {1: 2}
+        assert tsdb.get_sums(TSDBModel.group, [2], start, now) == {2: 1}
+
+        # Flushing again does not write the same increments twice.
+        tsdb.flush_buffer()
+        assert tsdb.get_sums(TSDBModel.project, [1], start, now) == {1: 8}
+
+    def test_overflow(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        start = now - timedelta(hours=1)
+
+        tsdb = self.create_tsdb(max_size=1, overflow="drop")
+        tsdb.incr(TSDBModel.project, 1, now)
+        tsdb.incr(TSDBModel.project, 1, now)
+        tsdb.incr(TSDBModel.project, 2, now)
+        tsdb.flush_buffer()
+        assert tsdb.get_sums(TSDBModel.project, [1, 2], start, now) == {1: 2, 2: 0}
+
+        tsdb = self.create_tsdb(max_size=1, overflow="flush")
+        tsdb.incr(TSDBModel.project, 1, now)
+        tsdb.incr(TSDBModel.project, 2, now)
+        assert tsdb.get_sums(TSDBModel.project, [1, 2], start, now) == {1: 1, 2: 1}
+
+    def test_background_flush(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        start = now - timedelta(hours=1)
+
+        # Reaching the flush size wakes up the flusher.
+        tsdb = self.create_tsdb(flush_size=1)
+        tsdb.incr(TSDBModel.project, 1, now)
+
+        deadline = time.time() + 5
+        while tsdb.get_sums(TSDBModel.project, [1], start, now) != {1: 1}:
+            assert time.time() < deadline, "buffer was not flushed"
+            time.sleep(0.01)
+
+    @mock.patch("sentry.tsdb.buffered.register_shutdown")
+    def test_shutdown_flush(self, register_shutdown):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        start = now - timedelta(hours=1)
+
+        tsdb = self.create_tsdb()
+        tsdb.incr(TSDBModel.project, 1, now)
+        tsdb.incr(TSDBModel.project, 1, now)
+        assert register_shutdown.call_args_list == [mock.call(tsdb.flush_buffer)]
+
+        register_shutdown.call_args[0][0]()
+        assert tsdb.get_sums(TSDBModel.project, [1], start, now) == {1: 2}
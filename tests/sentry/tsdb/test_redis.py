@@ -6,6 +6,7 @@ import pytz
 from django.test import override_settings
 
 from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
 from sentry.tsdb.base import ONE_DAY, ONE_HOUR, ONE_MINUTE, TSDBModel
 from sentry.tsdb.redis import CountMinScript, RedisTSDB, SuppressionWrapper
 from sentry.utils.dates import to_datetime, to_timestamp
@@ -188,6 +189,84 @@ class RedisTSDBTest(TestCase):
         results = self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1)
         assert results == {1: 0, 2: 0}
 
+    def test_incr_many(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(2)]
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        # Write the same increments twice, once with each implementation.
+        for n, use_script in enumerate((False, True), 1):
+            with override_options({"tsdb.redis.incr-script": use_script}):
+                self.db.incr_many(
+                    [
+                        ([(TSDBModel.project, 1), (TSDBModel.project, 2)], dts[0], 1),
+                        ([(TSDBModel.project, 1)], dts[0], 1),
+                        ([(TSDBModel.project, 1, {"count": 3})], dts[1], None),
+                    ]
+                )
+
+            results = self.db.get_range(TSDBModel.project, [1, 2], dts[0], dts[-1])
+            assert results == {
+                1: [(timestamp(dts[0]), 2 * n), (timestamp(dts[1]), 3 * n)],
+                2: [(timestamp(dts[0]), n), (timestamp(dts[1]), 0)],
+            }
+
+            results = self.db.get_range(
+                TSDBModel.project, [1, 2], dts[0], dts[-1], environment_ids=[1]
+            )
+            assert results == {
+                1: [(timestamp(dts[0]), 2 * n), (timestamp(dts[1]), 0)],
+                2: [(timestamp(dts[0]), n), (timestamp(dts[1]), 0)],
+            }
+
+        # Both ways of writing set an expiration on every hash.
+        with self.db.cluster.all() as client:
+            keys = client.keys("ts:*")
+        for host, host_keys in keys.value.items():
+            client = self.db.cluster.get_local_client(host)
+            for key in host_keys:
+                assert client.ttl(key) > 0
+
+    def test_get_range_many(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(2)]
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        self.db.incr(TSDBModel.project, 1, dts[0], environment_id=1)
+        self.db.incr(TSDBModel.project, 1, dts[1], count=2, environment_id=2)
+        self.db.incr(TSDBModel.group, 5, dts[1], count=3)
+
+        results = self.db.get_range_many(
+            [
+                (TSDBModel.project, [1, 2], None),
+                (TSDBModel.project, [1], [1, 2]),
+                (TSDBModel.project, [1], [2]),
+                (TSDBModel.group, [5], None),
+            ],
+            dts[0],
+            dts[-1],
+        )
+        assert results == [
+            {
+                1: [(timestamp(dts[0]), 1), (timestamp(dts[1]), 2)],
+                2: [(timestamp(dts[0]), 0), (timestamp(dts[1]), 0)],
+            },
+            {1: [(timestamp(dts[0]), 1), (timestamp(dts[1]), 2)]},
+            {1: [(timestamp(dts[0]), 0), (timestamp(dts[1]), 2)]},
+            {5: [(timestamp(dts[0]), 0), (timestamp(dts[1]), 3)]},
+        ]
+
+        assert results[0] == self.db.get_range(TSDBModel.project, [1, 2], dts[0], dts[-1])
+        assert self.db.get_sums(TSDBModel.project, [1], dts[0], dts[-1], environment_id=2) == {
+            1: 2
+        }
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
@@ -12,6 +12,8 @@ def get_callargs(model):
         "models": [model],
         "items": [(model, "key", ["values"])],
         "requests": [(model, "data")],
+        "increments": [([(model, "key")], None, None)],
+        "queries": [(model, ["key"], None)],
     }
 
 
@@ -125,3 +125,18 @@ def test_multiple_key_operations(properties: Properties) -> None:
     store.delete_many(all_keys)
 
     assert dict(store.get_many(all_keys)) == {}
+
+
+def test_set_many(properties: Properties) -> None:
+    store = properties.store
+
+    items = dict(itertools.islice(properties.items, 10))
+    store.set_many(items)
+    assert dict(store.get_many(list(items))) == items
+
+    # Test overwriting keys with a TTL.
+    new_items = {key: next(properties.values) for key in items}
+    store.set_many(new_items, ttl=timedelta(seconds=30))
+    assert dict(store.get_many(list(items))) == new_items
+
+    store.delete_many(list(items))
@@ -0,0 +1,49 @@
+import pytest
+
+from sentry.testutils.performance_issues.event_generators import get_event
+from sentry.utils.performance_issues.benchmark import (
+    SPAN_TABLE,
+    TOTAL,
+    benchmark_detectors,
+    compare_results,
+    percentile,
+)
+from sentry.utils.performance_issues.performance_detection import (
+    NPlusOneDBSpanDetector,
+    SlowDBQueryDetector,
+)
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert percentile([1.0], 99) == 1.0
+
+
+@pytest.mark.django_db
+def test_benchmark_detectors():
+    events = [get_event("n-plus-one-in-django-index-view")]
+    results = benchmark_detectors(
+        events,
+        iterations=3,
+        allocations=True,
+        detector_classes=[NPlusOneDBSpanDetector, SlowDBQueryDetector],
+    )
+
+    assert set(results) == {SPAN_TABLE, "NPlusOneDBSpanDetector", "SlowDBQueryDetector", TOTAL}
+    assert results["NPlusOneDBSpanDetector"]["problems"] == 1
+    assert results["SlowDBQueryDetector"]["problems"] == 0
+    assert results[TOTAL]["problems"] == 1
+    for values in results.values():
+        assert values["p99_ms"] >= values["p50_ms"] > 0
+    assert results[SPAN_TABLE]["peak_alloc_kb"] > 0
+
+
+def test_compare_results():
+    baseline = {"a": {"p50_ms": 2.0, "problems": 0}}
+    current = {"a": {"p50_ms": 3.0, "problems": 1}, "b": {"p50_ms": 1.0}}
+    assert compare_results(baseline, current) == {
+        "a": {"p50_ms": 50.0, "problems": None},
+        "b": {"p50_ms": None},
+    }
@@ -0,0 +1,46 @@
+from datetime import timedelta
+from unittest import mock
+
+from sentry.testutils.performance_issues.event_generators import create_event, create_span
+from sentry.testutils.performance_issues.span_builder import SpanBuilder
+from sentry.utils.performance_issues.performance_detection import (
+    SlowDBQueryDetector,
+    get_detection_settings,
+    run_detector_on_data,
+)
+from sentry.utils.performance_issues.span_table import SpanTable
+
+
+def test_span_table():
+    root = SpanBuilder().with_op("http.server").with_span_id("a" * 16).build()
+    root["parent_span_id"] = None
+    db_span = create_span("db", 50.0)
+    http_span = create_span("http.client", 20.0, "GET /")
+    spans = [root, db_span, http_span]
+
+    table = SpanTable(spans)
+
+    assert len(table) == 3
+    assert [table.ops[op_id] for op_id in table.op_id] == ["http.server", "db", "http.client"]
+    assert table.get_duration(db_span) == timedelta(milliseconds=50)
+
+    # Spans that are not part of the table are not looked up
+    assert table.get_duration(create_span("db")) is None
+
+    assert table.find_span_prefix(db_span, ["http", "db"]) == "db"
+    assert table.find_span_prefix(http_span, ["db"]) is False
+
+
+def test_span_table_shared_by_detectors():
+    event = create_event([create_span("db", 1001.0)])
+    settings = get_detection_settings()
+    table = SpanTable(event["spans"])
+
+    detectors = [SlowDBQueryDetector(settings, event), SlowDBQueryDetector(settings, event)]
+    with mock.patch("sentry.utils.performance_issues.base.get_span_duration") as get_span_duration:
+        for detector in detectors:
+            run_detector_on_data(detector, event, table)
+
+    # Durations come from the table instead of being recomputed per detector.
+    assert get_span_duration.call_count == 0
+    assert [len(detector.stored_problems) for detector in detectors] == [1, 1]
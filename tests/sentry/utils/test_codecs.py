@@ -1,4 +1,5 @@
 import pytest
+import zstandard
 
 from sentry.utils.codecs import BytesCodec, JSONCodec, ZlibCodec, ZstdCodec
 
@@ -22,3 +23,16 @@ def test_codec_chaining() -> None:
 
     assert codec.encode([1, 2, 3]) == b"[1,2,3]"
     assert codec.decode(b"[1,2,3]") == [1, 2, 3]
+
+
+def test_zstd_dictionary() -> None:
+    samples = [b'{"sdk":{"name":"sentry.python"},"id":%d}' % i for i in range(1000)]
+    codec = ZstdCodec(dictionary=zstandard.train_dictionary(1024, samples).as_bytes())
+
+    assert codec.dictionary_id != 0
+    assert ZstdCodec().dictionary_id == 0
+
+    value = b'{"sdk":{"name":"sentry.python"},"id":1001}'
+    encoded = codec.encode(value)
+    assert len(encoded) < len(ZstdCodec().encode(value))
+    assert codec.decode(encoded) == value
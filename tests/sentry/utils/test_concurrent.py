@@ -1,4 +1,5 @@
 import _thread
+import multiprocessing
 from concurrent.futures import CancelledError, Future
 from contextlib import contextmanager
 from queue import Full
@@ -9,10 +10,12 @@ import pytest
 
 from sentry.utils.concurrent import (
     FutureSet,
+    SingleFlight,
     SynchronousExecutor,
     ThreadedExecutor,
     TimedFuture,
     execute,
+    register_shutdown,
 )
 
 
@@ -282,3 +285,67 @@ def test_threaded_executor():
     low_priority_waiting.set()  # let the task finish
     assert low_priority_future.result(timeout=1) == 2
     assert low_priority_future.done()
+
+
+def test_single_flight():
+    single_flight = SingleFlight()
+    started = Event()
+    release = Event()
+    calls = []
+
+    def function():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "result"
+
+    leader = execute(lambda: single_flight.do("key", function))
+    assert started.wait(timeout=1)
+
+    follower = execute(lambda: single_flight.do("key", mock.Mock(return_value="other")))
+    release.set()
+
+    assert leader.result(timeout=1) == "result"
+    assert follower.result(timeout=1) in ("result", "other")
+    assert len(calls) == 1
+
+    # the key is released once the call finished
+    assert single_flight.do("key", lambda: "again") == "again"
+
+
+def test_single_flight_exception():
+    single_flight = SingleFlight()
+
+    with pytest.raises(ValueError):
+        single_flight.do("key", mock.Mock(side_effect=ValueError("Boom!")))
+
+    assert single_flight.do("key", lambda: 1) == 1
+
+
+def test_single_flight_join():
+    single_flight = SingleFlight()
+
+    future, leader = single_flight.join("key")
+    assert leader
+    other, leader = single_flight.join("key")
+    assert other is future and not leader
+
+    future.set_result(1)
+    single_flight.leave("key")
+    assert other.result() == 1
+
+    future, leader = single_flight.join("key")
+    assert leader and not future.done()
+
+
+def test_register_shutdown():
+    context = multiprocessing.get_context("fork")
+    queue = context.SimpleQueue()
+
+    # Children exit through `os._exit`, without running atexit handlers.
+    process = context.Process(target=register_shutdown, args=(lambda: queue.put("done"),))
+    process.start()
+    process.join()
+
+    assert process.exitcode == 0
+    assert queue.get() == "done"
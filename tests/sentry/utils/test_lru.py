@@ -0,0 +1,47 @@
+from sentry.utils.lru import LRUCache
+
+
+def test_get_set():
+    cache = LRUCache(max_weight=10)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get_many(["a", "b"]) == {"a": 1}
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_weight=10, weigh=len)
+    cache.set("a", b"x" * 4)
+    cache.set("b", b"x" * 4)
+    cache.get("a")
+    cache.set("c", b"x" * 4)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.weight == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_oversized_entry():
+    cache = LRUCache(max_weight=10)
+    cache.set("a", "small")
+    cache.set("b", "large", weight=11)
+
+    assert "a" in cache
+    assert "b" not in cache
+
+
+def test_replace_and_delete():
+    cache = LRUCache(max_weight=10)
+    cache.set("a", "x", weight=5)
+    cache.set("a", "y", weight=3)
+    assert cache.weight == 3
+    assert cache.get("a") == "y"
+
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.weight == 0
+    assert len(cache) == 0
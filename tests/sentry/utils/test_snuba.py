@@ -4,6 +4,7 @@ from unittest import mock
 
 import pytest
 import pytz
+from django.test import override_settings
 from django.utils import timezone
 
 from sentry.models import GroupRelease, Project, Release
@@ -12,7 +13,14 @@ from sentry.utils.snuba import (
     Dataset,
     SnubaQueryParams,
     UnqualifiedQueryError,
+    _coalesced_bulk_snuba_query,
+    _get_query_thread_pool,
+    _get_snuba_pool,
     _prepare_query_params,
+    _query_thread_pool,
+    _referrer_pools,
+    _referrer_thread_pools,
+    _snuba_pool,
     get_json_type,
     get_query_params_to_update_for_projects,
     get_snuba_column_name,
@@ -374,3 +382,51 @@ class QuantizeTimeTest(unittest.TestCase):
                 break
 
         assert i != j
+
+
+@override_settings(SENTRY_SNUBA_REFERRER_POOLS={"data_export": 2, "data_export.slow": 1})
+def test_get_snuba_pool():
+    try:
+        assert _get_snuba_pool("api.discover") is _snuba_pool
+        assert _get_query_thread_pool("api.discover") is _query_thread_pool
+
+        export_pool = _get_snuba_pool("data_export.discover")
+        assert export_pool is not _snuba_pool
+        assert export_pool.pool.maxsize == 2
+        assert export_pool.block
+        assert _get_snuba_pool("data_export.issues") is export_pool
+
+        export_thread_pool = _get_query_thread_pool("data_export.discover")
+        assert export_thread_pool is not _query_thread_pool
+        assert export_thread_pool._max_workers == 2
+        assert _get_query_thread_pool("data_export.issues") is export_thread_pool
+
+        assert _get_snuba_pool("data_export.slow.query").pool.maxsize == 1
+        assert _get_query_thread_pool("data_export.slow.query")._max_workers == 1
+    finally:
+        _referrer_pools.clear()
+        for thread_pool in _referrer_thread_pools.values():
+            thread_pool.shutdown()
+        _referrer_thread_pools.clear()
+
+
+@pytest.mark.django_db
+@mock.patch("sentry.utils.snuba._bulk_snuba_query")
+def test_coalesced_bulk_snuba_query(bulk_snuba_query):
+    bulk_snuba_query.side_effect = lambda params, headers: [{"data": [p]} for p in params]
+
+    # Identical queries are only sent once.
+    results = _coalesced_bulk_snuba_query(["a", "b", "a"], {}, ["sqc:a", "sqc:b", "sqc:a"])
+    assert results == [
+        {"data": ["a"]},
+        {"data": ["b"]},
+        {"data": ["a"]},
+    ]
+    assert bulk_snuba_query.call_args_list == [mock.call(["a", "b"], {})]
+    # Every caller gets its own copy of a shared result.
+    assert results[0] is not results[2]
+
+    # Leases are released once the queries finished.
+    bulk_snuba_query.reset_mock()
+    assert _coalesced_bulk_snuba_query(["a"], {}, ["sqc:a"]) == [{"data": ["a"]}]
+    assert bulk_snuba_query.call_args_list == [mock.call(["a"], {})]